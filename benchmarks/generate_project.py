@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+#  Gerador de projetos C sintéticos (firmware de microcontrolador) para os benchmarks.
+#
+#  Cria em OUT_DIR:
+#    original/   projeto "firmware": módulos .c/.h com densidades configuráveis de macros,
+#                structs, enums, variáveis e funções, e headers grandes de registradores
+#    shadow/     projeto mockshadow (.mockshadow/env.json e config.json) com um MOCK_TREE
+#                contendo arquivos __mock__ com a quantidade de diretivas desejada
+#    generator.json  parâmetros usados na geração (registrados nos resultados dos benchmarks)
+#
+#  A geração é determinística para uma mesma semente.
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+
+GENERATOR_VERSION = 1
+
+def vary(rng: random.Random, mean: int) -> int:
+    """Valor em torno de 'mean' (de 50% a 150%), para que os módulos não sejam todos iguais."""
+    if mean <= 0:
+        return 0
+    return max(1, rng.randint(mean // 2, mean + mean // 2))
+
+def register_header(index: int, register_lines: int, rng: random.Random) -> str:
+    """Header de definição de registradores, no estilo dos headers de fabricantes (CMSIS)."""
+    name = f"REGS_{index}"
+    lines = [f"#ifndef {name}_H", f"#define {name}_H", "", "#include <stdint.h>", ""]
+    peripherals = max(1, register_lines // 40)
+    regs_per_peripheral = max(1, register_lines // peripherals)
+    for p in range(peripherals):
+        base = 0x40000000 + (index << 16) + (p << 10)
+        periph = f"P{index}_{p}"
+        lines.append("typedef struct {")
+        for r in range(min(regs_per_peripheral, 16)):
+            lines.append(f"    volatile uint32_t R{r};")
+        lines.append(f"}} {periph}_TypeDef;")
+        lines.append(f"#define {periph}_BASE (0x{base:08X}UL)")
+        lines.append(f"#define {periph} (({periph}_TypeDef *) {periph}_BASE)")
+        for r in range(regs_per_peripheral):
+            lines.append(f"#define {periph}_REG{r} (*(volatile uint32_t *)({periph}_BASE + 0x{r * 4:03X}UL))")
+            if rng.random() < 0.5:
+                lines.append(f"#define {periph}_REG{r}_EN_Pos ({r % 32}U)")
+                lines.append(f"#define {periph}_REG{r}_EN_Msk (0x1UL << {periph}_REG{r}_EN_Pos)")
+        lines.append("")
+    lines += [f"#endif /* {name}_H */", ""]
+    return "\n".join(lines)
+
+def module_files(module: str, reg_header: str, reg_prefix: str, counts: dict) -> tuple:
+    """
+    Retorna (header, fonte, símbolos) de um módulo. 'símbolos' lista os nomes gerados
+    por tipo ("macro", "variable", "function"), usados para criar as diretivas de mock.
+    """
+    upper = module.upper()
+    symbols = {"macro": [], "variable": [], "function": []}
+
+    header = [f"#ifndef {upper}_H", f"#define {upper}_H", "", "#include <stdint.h>", ""]
+    for i in range(counts["enums"]):
+        header.append("typedef enum {")
+        header += [f"    {upper}_E{i}_V{v}," for v in range(6)]
+        header.append(f"}} {module}_e{i}_t;")
+        header.append("")
+    for i in range(counts["structs"]):
+        header.append("typedef struct {")
+        header += [f"    uint32_t field{f};" for f in range(5)]
+        header.append(f"    {module}_e{i % max(1, counts['enums'])}_t state;" if counts["enums"] else "    int state;")
+        header.append(f"}} {module}_s{i}_t;")
+        header.append("")
+    header += [f"int {module}_fn{i}(int value);" for i in range(counts["functions"])]
+    header += ["", f"#endif /* {upper}_H */", ""]
+
+    source = [f'#include "{module}.h"', f'#include "{reg_header}"', ""]
+    for i in range(counts["macros"]):
+        name = f"{upper}_M{i}"
+        source.append(f"#define {name} ({reg_prefix}_REG{i % 8} + {i}u)")
+        symbols["macro"].append(name)
+    source.append("")
+    for i in range(counts["variables"]):
+        name = f"{module}_var{i}"
+        source.append(f"static volatile uint32_t {name};")
+        symbols["variable"].append(name)
+    source.append("")
+    for i in range(counts["functions"]):
+        name = f"{module}_fn{i}"
+        source += [
+            f"int {name}(int value)",
+            "{",
+            "    int acc = value;",
+            f"    for (int i = 0; i < {4 + i % 5}; i++) {{",
+            f"        acc += (int)({reg_prefix}_REG{i % 8} & 0xFFu);",
+            "        __asm volatile (\"nop\");",
+            "    }",
+            f"    if (acc > {100 + i}) {{",
+            f"        {reg_prefix}_REG{(i + 1) % 8} = (uint32_t)acc;",
+            "    }",
+            "    return acc;",
+            "}",
+            "",
+        ]
+        symbols["function"].append(name)
+    return "\n".join(header), "\n".join(source), symbols
+
+def mock_directives(symbols: dict, count: int) -> tuple:
+    """
+    Até 'count' diretivas variadas sobre símbolos distintos do arquivo (as faixas nunca se sobrepõem).
+    Para quando não houver mais símbolos livres. Retorna (linhas do __mock__, diretivas criadas).
+    """
+    functions = list(symbols["function"])
+    variables = list(symbols["variable"])
+    macros = list(symbols["macro"])
+    lines = ["//__MOCK_COPY_FILE_CONTENT__"]
+    made = 0
+
+    def replace_function():
+        name = functions.pop()
+        return [f"//__MOCK_REPLACE_CODE_START: function {name}", f"int {name}(int value)",
+                "{", "    return value;", "}", "//__MOCK_REPLACE_CODE_END"]
+
+    def add_after_function():
+        name = functions.pop()
+        return [f"//__MOCK_ADD_AFTER_LINE: function {name}", f"int {name}_spy;"]
+
+    def remove_variable():
+        return [f"//__MOCK_REMOVE: variable {variables.pop()}"]
+
+    def replace_macro():
+        name = macros.pop()
+        return [f"//__MOCK_REPLACE_CODE_LINE: macro {name}", f"#define {name} (0u)"]
+
+    generators = [(replace_function, functions), (remove_variable, variables),
+                  (replace_macro, macros), (add_after_function, functions)]
+    while made < count:
+        progress = False
+        for generator, pool in generators:
+            if made >= count:
+                break
+            if pool:
+                lines += generator()
+                made += 1
+                progress = True
+        if not progress:
+            break
+    lines += ["//__MOCK_TOP_START", "#include \"../__additional__sim_hal.h\"", "//__MOCK_TOP_END"]
+    return lines, made
+
+def register_mock_directives(index: int, register_lines: int, count: int) -> tuple:
+    """Diretivas de um __mock__ de header de registradores: substitui endereços por variáveis do simulador."""
+    lines = ["//__MOCK_COPY_FILE_CONTENT__"]
+    periph = f"P{index}_0"
+    regs = min(count, max(1, register_lines // max(1, register_lines // 40)))
+    for r in range(regs):
+        lines += [f"//__MOCK_REPLACE_CODE_LINE: macro {periph}_REG{r}", f"#define {periph}_REG{r} (sim_regs[{r}])"]
+    return lines, regs
+
+def write_file(path: str, content: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="latin-1", newline="\n") as f:
+        f.write(content if content.endswith("\n") else content + "\n")
+
+def init_git(project_dir: str):
+    """Versiona o projeto original, para medir a detecção de mudanças pelo git."""
+    if shutil.which("git") is None:
+        print("Warning: git not found, the original project will not be a repository")
+        return
+    git = ["git", "-c", "user.name=bench", "-c", "user.email=bench@example.com", "-c", "commit.gpgsign=false"]
+    subprocess.run(git + ["init", "-q"], cwd=project_dir, check=True)
+    subprocess.run(git + ["add", "-A"], cwd=project_dir, check=True)
+    subprocess.run(git + ["commit", "-q", "-m", "synthetic firmware"], cwd=project_dir, check=True)
+
+def generate(out_dir: str, params: dict) -> dict:
+    """Gera o projeto sintético em 'out_dir' e retorna um resumo (também gravado em generator.json)."""
+    rng = random.Random(params["seed"])
+    original_dir = os.path.join(out_dir, "original")
+    shadow_dir = os.path.join(out_dir, "shadow")
+    if os.path.exists(out_dir):
+        shutil.rmtree(out_dir)
+
+    # Headers de registradores
+    reg_headers = []
+    for r in range(params["register_headers"]):
+        rel = f"drivers/regs/regs_{r}.h"
+        write_file(os.path.join(original_dir, rel), register_header(r, params["register_lines"], rng))
+        reg_headers.append(rel)
+
+    # Módulos: cada módulo tem um .c e um .h, distribuídos em 'dirs' diretórios
+    modules = []
+    stats = {"files": len(reg_headers), "lines": 0, "directives": 0, "mock_files": 0}
+    for m in range(params["modules"]):
+        group = f"app/group_{m % params['dirs']}"
+        module = f"mod_{m}"
+        reg_index = m % max(1, params["register_headers"])
+        counts = {key: vary(rng, params[key]) for key in ("macros", "structs", "enums", "variables", "functions")}
+        header, source, symbols = module_files(module, os.path.basename(reg_headers[reg_index]) if reg_headers else "stdint.h",
+                                               f"P{reg_index}_0", counts)
+        write_file(os.path.join(original_dir, group, module + ".h"), header)
+        write_file(os.path.join(original_dir, group, module + ".c"), source)
+        stats["files"] += 2
+        stats["lines"] += header.count("\n") + source.count("\n")
+        modules.append((group, module, symbols))
+    write_file(os.path.join(original_dir, "README.md"), "# Synthetic firmware\n")
+
+    # Projeto mockshadow
+    mock_tree = os.path.join(shadow_dir, "MOCK_TREE")
+    os.makedirs(mock_tree, exist_ok=True)
+    write_file(os.path.join(shadow_dir, ".mockshadow", "env.json"),
+               json.dumps({"originalProject": os.path.abspath(original_dir)}, indent=4))
+    write_file(os.path.join(shadow_dir, ".mockshadow", "config.json"),
+               json.dumps({"extractorCFlags": [f"-I{os.path.abspath(os.path.join(original_dir, 'drivers/regs'))}"],
+                           "excludeFromCopy": [], "addToCopy": []}, indent=4))
+
+    mocked = rng.sample(modules, min(params["mock_files"], len(modules)))
+    for group, module, symbols in sorted(mocked, key=lambda m: m[1]):
+        lines, made = mock_directives(symbols, params["directives"])
+        write_file(os.path.join(mock_tree, group, f"__mock__{module}.c"), "\n".join(lines))
+        stats["directives"] += made
+        stats["mock_files"] += 1
+    for r, rel in enumerate(reg_headers[:params["register_mocks"]]):
+        lines, made = register_mock_directives(r, params["register_lines"], params["directives"])
+        write_file(os.path.join(mock_tree, os.path.dirname(rel), "__mock__" + os.path.basename(rel)), "\n".join(lines))
+        stats["directives"] += made
+        stats["mock_files"] += 1
+    write_file(os.path.join(mock_tree, "app", "__additional__sim_hal.h"),
+               "#ifndef SIM_HAL_H\n#define SIM_HAL_H\n#include <stdint.h>\nextern uint32_t sim_regs[64];\n#endif\n")
+
+    if params["git"]:
+        init_git(original_dir)
+
+    summary = {"version": GENERATOR_VERSION, "params": params, "stats": stats,
+               "original": os.path.abspath(original_dir), "shadow": os.path.abspath(shadow_dir)}
+    write_file(os.path.join(out_dir, "generator.json"), json.dumps(summary, indent=4))
+    return summary
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--modules", type=int, default=1000, help="number of .c/.h module pairs (default: 1000)")
+    parser.add_argument("--dirs", type=int, default=20, help="directories the modules are spread across")
+    parser.add_argument("--register-headers", type=int, default=4, help="number of register-definition headers")
+    parser.add_argument("--register-lines", type=int, default=5000, help="register definitions per header")
+    parser.add_argument("--macros", type=int, default=8, help="mean macros per module")
+    parser.add_argument("--structs", type=int, default=3, help="mean structs per module")
+    parser.add_argument("--enums", type=int, default=2, help="mean enums per module")
+    parser.add_argument("--variables", type=int, default=6, help="mean variables per module")
+    parser.add_argument("--functions", type=int, default=10, help="mean functions per module")
+    parser.add_argument("--mock-files", type=int, default=50, help="modules with a __mock__ file")
+    parser.add_argument("--register-mocks", type=int, default=1, help="register headers with a __mock__ file")
+    parser.add_argument("--directives", type=int, default=8, help="directives per __mock__ file")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-git", dest="git", action="store_false", help="do not make the original project a git repository")
+
+def params_from_args(args) -> dict:
+    params = {key: getattr(args, key) for key in ("modules", "dirs", "register_headers", "register_lines", "macros",
+                                                  "structs", "enums", "variables", "functions", "mock_files",
+                                                  "register_mocks", "directives", "seed", "git")}
+    if params["modules"] < 1 or params["dirs"] < 1:
+        sys.exit("Error: --modules and --dirs must be at least 1")
+    return params
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic C firmware project and its MOCK_TREE.")
+    parser.add_argument("out_dir", help="directory to create (removed first if it exists)")
+    add_arguments(parser)
+    args = parser.parse_args()
+    summary = generate(args.out_dir, params_from_args(args))
+    stats = summary["stats"]
+    print(f"Generated {stats['files']} files ({stats['lines']} module lines), "
+          f"{stats['mock_files']} mock files with {stats['directives']} directives in {args.out_dir}")
+
+if __name__ == "__main__":
+    main()
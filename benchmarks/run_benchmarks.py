@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+#  Benchmarks do mockshadow sobre um projeto sintético (ver generate_project.py).
+#
+#  Cada fase roda em um processo novo, dentro do projeto mockshadow (o runtime lê o diretório
+#  corrente), e chama diretamente as funções do mock_utils:
+#    clone_cold                 clone_project() sem TEMP_PROJECT e sem manifesto
+#    clone_warm                 clone_project() sem nenhuma mudança
+#    mock_cold                  mock_project() sem TEMP_PROJECT, sem mocks gerados e sem cache
+#    mock_warm                  mock_project() sem nenhuma mudança
+#    mock_incremental_mock      mock_project() após editar um arquivo __mock__
+#    mock_incremental_original  mock_project() após editar o original de um arquivo mockado
+#  As chamadas ao extractor são cronometradas (latência por diretiva).
+#  O resultado é gravado em JSON; '--compare' compara com um resultado anterior.
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+package_dir = os.path.dirname(script_dir)
+sys.path.insert(0, script_dir)
+import generate_project
+
+RESULTS_VERSION = 1
+PHASES = ["clone_cold", "clone_warm", "mock_cold", "mock_warm", "mock_incremental_mock", "mock_incremental_original"]
+
+def run_phase(phase: str, jobs: int, latency_file: str) -> dict:
+    """Executa uma fase no processo atual (chamado com o diretório corrente no projeto mockshadow)."""
+    sys.path.insert(0, package_dir)
+    import extractor_service
+    import mock_utils
+
+    # Cronometra cada chamada ao extractor. Os processos do pool (fork) herdam o wrapper
+    # e acrescentam as suas medições ao mesmo arquivo.
+    run_extractor = extractor_service.run_extractor
+
+    def timed_run_extractor(args):
+        started = time.perf_counter()
+        result = run_extractor(args)
+        elapsed = time.perf_counter() - started
+        with open(latency_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"kind": args[0], "seconds": elapsed}) + "\n")
+        return result
+
+    extractor_service.run_extractor = timed_run_extractor
+
+    started = time.perf_counter()
+    status = 0
+    try:
+        if phase.startswith("clone"):
+            mock_utils.clone_project(True)
+        else:
+            mock_utils.mock_project(jobs=jobs)
+    except SystemExit as e:
+        status = e.code if isinstance(e.code, int) else 1
+    return {"seconds": time.perf_counter() - started, "status": status}
+
+def prepare_phase(phase: str, shadow_dir: str, edits: dict):
+    """Deixa o projeto no estado de partida da fase."""
+    cache_dir = os.path.join(shadow_dir, ".mockshadow", "cache")
+    if phase in ("clone_cold", "mock_cold"):
+        shutil.rmtree(os.path.join(shadow_dir, "TEMP_PROJECT"), ignore_errors=True)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    if phase == "mock_cold":
+        # Remove os mocks gerados (arquivos sem prefixo em MOCK_TREE)
+        for root, dirs, files in os.walk(os.path.join(shadow_dir, "MOCK_TREE")):
+            for filename in files:
+                if not filename.startswith(("__mock__", "__additional__")):
+                    os.remove(os.path.join(root, filename))
+    if phase in edits:
+        # Acrescenta um comentário diferente a cada repetição, para que a chave de cache mude
+        with open(edits[phase], "a", encoding="latin-1") as f:
+            f.write(f"/* benchmark edit {time.time_ns()} */\n")
+
+def pick_edits(shadow_dir: str, original_dir: str) -> dict:
+    """Arquivos editados pelas fases incrementais: o primeiro __mock__ de módulo e o seu original."""
+    mock_tree = os.path.join(shadow_dir, "MOCK_TREE")
+    mock_files = sorted(os.path.join(root, f) for root, dirs, files in os.walk(mock_tree)
+                        for f in files if f.startswith("__mock__") and f.endswith(".c"))
+    if not mock_files:
+        return {}
+    rel = os.path.relpath(mock_files[0], mock_tree)
+    original = os.path.join(original_dir, os.path.dirname(rel), os.path.basename(rel).replace("__mock__", "", 1))
+    return {"mock_incremental_mock": mock_files[0], "mock_incremental_original": original}
+
+def summarize(values: list) -> dict:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    return {
+        "count": len(values),
+        "min": ordered[0],
+        "median": statistics.median(ordered),
+        "mean": statistics.fmean(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+        "max": ordered[-1],
+    }
+
+def read_latencies(latency_file: str) -> list:
+    if not os.path.isfile(latency_file):
+        return []
+    with open(latency_file, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def run_benchmarks(shadow_dir: str, original_dir: str, phases: list, repeat: int, jobs: int, log) -> dict:
+    edits = pick_edits(shadow_dir, original_dir)
+    backups = {}
+    for path in edits.values():
+        with open(path, "rb") as f:
+            backups[path] = f.read()
+
+    results = {phase: {"runs": [], "extractor": []} for phase in phases}
+    try:
+        for iteration in range(repeat):
+            for phase in phases:
+                prepare_phase(phase, shadow_dir, edits)
+                with tempfile.TemporaryDirectory() as tmp:
+                    latency_file = os.path.join(tmp, "latency.jsonl")
+                    out_file = os.path.join(tmp, "result.json")
+                    cmd = [sys.executable, os.path.abspath(__file__), "--run-phase", phase,
+                           "--jobs", str(jobs), "--latency-file", latency_file, "--result-file", out_file]
+                    proc = subprocess.run(cmd, cwd=shadow_dir, stdout=log, stderr=subprocess.STDOUT)
+                    if proc.returncode != 0 or not os.path.isfile(out_file):
+                        sys.exit(f"Error: benchmark phase '{phase}' crashed (exit code {proc.returncode})")
+                    with open(out_file, encoding="utf-8") as f:
+                        result = json.load(f)
+                    if result["status"] != 0:
+                        sys.exit(f"Error: benchmark phase '{phase}' failed (exit code {result['status']}), see the log")
+                    results[phase]["runs"].append(result["seconds"])
+                    results[phase]["extractor"] += read_latencies(latency_file)
+                print(f"  [{iteration + 1}/{repeat}] {phase}: {result['seconds']:.3f} s")
+    finally:
+        # Desfaz as edições das fases incrementais
+        for path, content in backups.items():
+            with open(path, "wb") as f:
+                f.write(content)
+
+    phase_results = {}
+    for phase, data in results.items():
+        latencies = data["extractor"]
+        by_kind = {}
+        for item in latencies:
+            by_kind.setdefault(item["kind"], []).append(item["seconds"])
+        phase_results[phase] = {
+            "runs": data["runs"],
+            "seconds": summarize(data["runs"]),
+            "extractor_calls": len(latencies) // max(1, len(data["runs"])),
+            "extractor_latency": summarize([item["seconds"] for item in latencies]),
+            "extractor_latency_by_kind": {kind: summarize(values) for kind, values in sorted(by_kind.items())},
+        }
+    return phase_results
+
+def environment_info(jobs: int) -> dict:
+    sys.path.insert(0, package_dir)
+    import mock_utils
+    info = {
+        "mockshadow_version": mock_utils.MOCKSHADOW_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "jobs": jobs,
+    }
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=package_dir, capture_output=True, text=True)
+        if commit.returncode == 0:
+            info["commit"] = commit.stdout.strip()
+    except OSError:
+        pass
+    return info
+
+def compare(results: dict, baseline: dict):
+    """Exibe a variação da mediana de cada fase em relação a um resultado anterior."""
+    print(f"{'phase':<28}{'baseline':>12}{'current':>12}{'change':>10}")
+    for phase, data in results["phases"].items():
+        before = baseline.get("phases", {}).get(phase, {}).get("seconds", {}).get("median")
+        after = data["seconds"].get("median")
+        if before is None or after is None:
+            print(f"{phase:<28}{'-':>12}{after if after is not None else '-':>12}")
+            continue
+        change = (after - before) / before * 100 if before else 0.0
+        print(f"{phase:<28}{before:>11.3f}s{after:>11.3f}s{change:>+9.1f}%")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark mockshadow on a synthetic firmware project.")
+    parser.add_argument("--project", help="existing directory created by generate_project.py "
+                                          "(default: generate one in a temporary directory)")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON results file")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON results of a previous run to compare with")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each phase (default: 3)")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="mock generation processes (default: 1)")
+    parser.add_argument("--phases", default=",".join(PHASES), help="comma-separated phases to run")
+    parser.add_argument("--log", help="file receiving the mockshadow output (default: discarded)")
+    parser.add_argument("--run-phase", help=argparse.SUPPRESS)
+    parser.add_argument("--latency-file", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    generate_project.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.run_phase:
+        # Processo filho: executa uma única fase
+        result = run_phase(args.run_phase, args.jobs, args.latency_file)
+        with open(args.result_file, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        return
+
+    phases = [p for p in args.phases.split(",") if p]
+    unknown = [p for p in phases if p not in PHASES]
+    if unknown:
+        sys.exit(f"Error: unknown phase(s): {', '.join(unknown)}")
+    if args.repeat < 1 or args.jobs < 1:
+        sys.exit("Error: --repeat and --jobs must be at least 1")
+
+    tmp_dir = None
+    if args.project:
+        with open(os.path.join(args.project, "generator.json"), encoding="utf-8") as f:
+            generator = json.load(f)
+    else:
+        tmp_dir = tempfile.mkdtemp(prefix="mockshadow-bench-")
+        print(f"Generating synthetic project in {tmp_dir} ...")
+        generator = generate_project.generate(os.path.join(tmp_dir, "project"), generate_project.params_from_args(args))
+
+    log = open(args.log, "w", encoding="utf-8") if args.log else subprocess.DEVNULL
+    try:
+        print(f"Running {len(phases)} phase(s) x {args.repeat} ...")
+        phase_results = run_benchmarks(generator["shadow"], generator["original"], phases, args.repeat, args.jobs, log)
+    finally:
+        if args.log:
+            log.close()
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    results = {
+        "version": RESULTS_VERSION,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": environment_info(args.jobs),
+        "generator": {"params": generator["params"], "stats": generator["stats"]},
+        "repeat": args.repeat,
+        "phases": phase_results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(results, json.load(f))
+
+if __name__ == "__main__":
+    main()
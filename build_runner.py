@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+#  Compilação do projeto mockshadow ('build' / 'rebuild') com CMake.
+#
+#  Configurado pela seção "build" do .mockshadow/config.json:
+#    "generator"   "auto" (Ninja se disponível, senão Make), "ninja", "make" ou o nome de um gerador do CMake
+#    "jobs"        processos de compilação (padrão: número de núcleos; '--jobs' na linha de comando tem prioridade)
+#    "launcher"    "auto" (ccache ou sccache, se instalados), "ccache", "sccache" ou "none"
+#    "sourceDir"   diretório com o CMakeLists.txt, relativo ao projeto mockshadow (padrão: ".")
+#    "buildDir"    diretório de build, relativo ao projeto mockshadow (padrão: "build")
+#    "cmakeArgs"   argumentos extras para a configuração do CMake
+#    "target"      alvo a compilar (padrão: todos)
+#
+#  O diretório de build é mantido entre as execuções de 'mock': como os arquivos inalterados do
+#  TEMP_PROJECT não são reescritos, a compilação incremental só refaz o que mudou. O CMake só é
+#  configurado novamente quando os argumentos de configuração mudam; 'rebuild' recomeça do zero.
+#  Os tempos de configuração, compilação e link são exibidos separadamente.
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+import tracing
+
+GENERATORS = {"ninja": "Ninja", "make": "Unix Makefiles"}
+LAUNCHERS = ("ccache", "sccache")
+# Registro da última configuração, dentro do diretório de build
+BUILD_STATE_FILE = "mockshadow_build.json"
+
+# Saídas de compilação (o restante é link: executáveis e bibliotecas)
+OBJECT_EXTENSIONS = (".o", ".obj")
+# Mensagens do gerador Makefile do CMake
+RE_MAKE_COMPILE = re.compile(r"Building (C|CXX|ASM\S*) object ")
+RE_MAKE_LINK = re.compile(r"Linking \S+ (executable|static library|shared library|shared module) ")
+RE_MAKE_BUILT = re.compile(r"Built target ")
+
+class BuildTimings:
+    def __init__(self):
+        self.configure = 0.0
+        self.compile = 0.0
+        self.link = 0.0
+        self.total = 0.0
+        self.objects = 0
+        self.links = 0
+        # False quando os tempos de compilação e link não puderam ser separados
+        self.detailed = True
+        # True quando foram estimados a partir da saída do make
+        self.estimated = False
+
+def get_build_config() -> dict:
+    import runtime
+    config = runtime.USER_CONFIGS.get("build", {})
+    if not isinstance(config, dict):
+        sys.exit("fatal: invalid 'build' section in .mockshadow/config.json")
+    return config
+
+def get_generator(config: dict) -> str:
+    generator = config.get("generator", "auto")
+    if generator == "auto":
+        return GENERATORS["ninja"] if shutil.which("ninja") else GENERATORS["make"]
+    if not isinstance(generator, str) or not generator:
+        sys.exit(f"fatal: invalid 'build.generator' in .mockshadow/config.json: {generator}")
+    return GENERATORS.get(generator.lower(), generator)
+
+def get_launcher(config: dict):
+    """Programa usado como launcher do compilador (ccache/sccache), ou None."""
+    launcher = config.get("launcher", "auto")
+    if launcher in (None, "none"):
+        return None
+    if launcher == "auto":
+        return next((name for name in LAUNCHERS if shutil.which(name)), None)
+    if launcher not in LAUNCHERS:
+        sys.exit(f"fatal: invalid 'build.launcher' in .mockshadow/config.json: {launcher}")
+    if shutil.which(launcher) is None:
+        print(f"Warning: '{launcher}' not found, building without a compiler launcher")
+        return None
+    return launcher
+
+def get_jobs(config: dict, jobs: int = None) -> int:
+    if jobs is not None:
+        return jobs
+    jobs = config.get("jobs")
+    if jobs is None:
+        return os.cpu_count() or 1
+    if not isinstance(jobs, int) or jobs < 1:
+        sys.exit(f"fatal: invalid 'build.jobs' in .mockshadow/config.json: {jobs}")
+    return jobs
+
+def configure_args(config: dict, source_dir: str, build_dir: str, generator: str, launcher) -> list:
+    args = ["cmake", "-S", source_dir, "-B", build_dir, "-G", generator]
+    if launcher:
+        for lang in ("C", "CXX"):
+            args.append(f"-DCMAKE_{lang}_COMPILER_LAUNCHER={launcher}")
+    extra_args = config.get("cmakeArgs", [])
+    if not isinstance(extra_args, list) or not all(isinstance(arg, str) for arg in extra_args):
+        sys.exit("fatal: invalid 'build.cmakeArgs' in .mockshadow/config.json")
+    return args + extra_args
+
+def load_build_state(build_dir: str) -> dict:
+    try:
+        with open(os.path.join(build_dir, BUILD_STATE_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+def save_build_state(build_dir: str, state: dict):
+    with open(os.path.join(build_dir, BUILD_STATE_FILE), "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=4)
+
+def run_command(args: list, cwd: str = None, on_line=None) -> int:
+    """Executa 'args' exibindo a saída linha a linha; 'on_line(linha, instante)' recebe cada linha."""
+    try:
+        process = subprocess.Popen(args, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   text=True, errors="replace")
+    except OSError as e:
+        print(f"Error: cannot run '{args[0]}': {e}")
+        sys.exit(1)
+    for line in process.stdout:
+        if on_line is not None:
+            on_line(line, time.perf_counter())
+        print(line, end="")
+    return process.wait()
+
+def read_ninja_log(build_dir: str, offset: int):
+    """
+    Lê as entradas do .ninja_log gravadas a partir de 'offset' (ou seja, na última execução).
+    Retorna uma lista de (início_ms, fim_ms, saída), ou None se o log foi recompactado pelo ninja.
+    """
+    log_path = os.path.join(build_dir, ".ninja_log")
+    try:
+        with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() < offset:
+                return None
+            f.seek(offset)
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    entries = []
+    for line in lines:
+        fields = line.split("\t")
+        if line.startswith("#") or len(fields) < 4:
+            continue
+        try:
+            entries.append((int(fields[0]), int(fields[1]), fields[3]))
+        except ValueError:
+            continue
+    return entries
+
+def wall_time(entries: list) -> float:
+    """Tempo de relógio (s) em que ao menos uma das etapas estava rodando."""
+    total = 0
+    current_start = current_end = None
+    for start, end, _ in sorted(entries):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total / 1000.0
+
+def ninja_timings(timings: BuildTimings, entries):
+    if entries is None:
+        timings.detailed = False
+        return
+    compile_entries = [e for e in entries if e[2].endswith(OBJECT_EXTENSIONS)]
+    link_entries = [e for e in entries if not e[2].endswith(OBJECT_EXTENSIONS) and not e[2].endswith(".ninja")]
+    timings.objects = len(compile_entries)
+    timings.links = len(link_entries)
+    timings.compile = wall_time(compile_entries)
+    timings.link = wall_time(link_entries)
+
+class MakeOutputTimer:
+    """Estima os tempos de compilação e link a partir das mensagens do make (início de cada link até o 'Built target')."""
+    def __init__(self):
+        self.objects = 0
+        self.links = 0
+        self.link_time = 0.0
+        self.link_started = None
+
+    def on_line(self, line: str, now: float):
+        if RE_MAKE_COMPILE.search(line):
+            self.objects += 1
+        elif RE_MAKE_LINK.search(line):
+            self.links += 1
+            if self.link_started is None:
+                self.link_started = now
+        elif RE_MAKE_BUILT.search(line) and self.link_started is not None:
+            self.link_time += now - self.link_started
+            self.link_started = None
+
+def print_timings(timings: BuildTimings):
+    print(f"Build Complete! ({timings.total:.2f} s)")
+    print(f"  configure {timings.configure:8.2f} s")
+    if not timings.detailed:
+        print(f"  build     {timings.total - timings.configure:8.2f} s (compile and link not available)")
+        return
+    note = " (estimated from make output)" if timings.estimated else ""
+    print(f"  compile   {timings.compile:8.2f} s ({timings.objects} objects){note}")
+    print(f"  link      {timings.link:8.2f} s ({timings.links} targets){note}")
+
+def build_project(rebuild: bool = False, jobs: int = None) -> BuildTimings:
+    import runtime
+    config = get_build_config()
+    source_dir = os.path.join(runtime.DIR_MOCK_SHADOW_PROJECT, config.get("sourceDir", "."))
+    build_dir = os.path.join(runtime.DIR_MOCK_SHADOW_PROJECT, config.get("buildDir", "build"))
+    if not os.path.isfile(os.path.join(source_dir, "CMakeLists.txt")):
+        print(f"Error: no CMakeLists.txt in '{source_dir}'. Set 'build.sourceDir' in .mockshadow/config.json.")
+        sys.exit(1)
+    if shutil.which("cmake") is None:
+        print("Error: cmake not found")
+        sys.exit(1)
+
+    generator = get_generator(config)
+    launcher = get_launcher(config)
+    jobs = get_jobs(config, jobs)
+    args = configure_args(config, source_dir, build_dir, generator, launcher)
+    state = load_build_state(build_dir)
+    timings = BuildTimings()
+    started = time.perf_counter()
+
+    # Um diretório de build de outro gerador não pode ser reaproveitado pelo CMake
+    if rebuild or (state and state.get("generator") != generator):
+        if os.path.isdir(build_dir):
+            print(f"Removing {os.path.relpath(build_dir, runtime.DIR_MOCK_SHADOW_PROJECT)} ...")
+            shutil.rmtree(build_dir)
+        state = {}
+
+    if state.get("configureArgs") != args or not os.path.isfile(os.path.join(build_dir, "CMakeCache.txt")):
+        print(f"Configuring ({generator}{', ' + launcher if launcher else ''}) ...")
+        with tracing.span("configure", tracing.CATEGORY_PHASE):
+            status = run_command(args)
+        if status != 0:
+            print("Error: CMake configuration failed")
+            sys.exit(status)
+        save_build_state(build_dir, {"generator": generator, "configureArgs": args})
+    timings.configure = time.perf_counter() - started
+
+    print(f"Building with {jobs} job(s) ...")
+    build_args = ["cmake", "--build", build_dir, "--parallel", str(jobs)]
+    if config.get("target"):
+        build_args += ["--target", str(config["target"])]
+    ninja_log = os.path.join(build_dir, ".ninja_log")
+    log_offset = os.path.getsize(ninja_log) if os.path.isfile(ninja_log) else 0
+    make_timer = MakeOutputTimer() if generator != GENERATORS["ninja"] else None
+    build_started = time.perf_counter()
+    with tracing.span("compile and link", tracing.CATEGORY_PHASE):
+        status = run_command(build_args, on_line=make_timer.on_line if make_timer else None)
+    build_time = time.perf_counter() - build_started
+    timings.total = time.perf_counter() - started
+    if status != 0:
+        print("Error: build failed")
+        sys.exit(status)
+
+    if generator == GENERATORS["ninja"]:
+        ninja_timings(timings, read_ninja_log(build_dir, log_offset))
+    elif "Makefiles" in generator:
+        timings.estimated = True
+        timings.objects = make_timer.objects
+        timings.links = make_timer.links
+        timings.link = make_timer.link_time
+        timings.compile = max(0.0, build_time - timings.link)
+    else:
+        timings.detailed = False
+    print_timings(timings)
+    return timings
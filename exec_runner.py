@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+#  Execução do firmware simulado ('exec' / 'debug').
+#
+#  'exec' executa o binário gerado pelo 'build' como um processo nativo e mede o seu consumo
+#  de recursos com wait4(): tempo de relógio, tempo de CPU (usuário e sistema), pico de memória
+#  residente, trocas de contexto e page faults. Cada execução é acrescentada ao histórico
+#  .mockshadow/exec_history.jsonl (uma linha JSON por execução); com '--diff', as medições são
+#  comparadas com as da execução anterior do mesmo binário.
+#  'debug' executa o binário dentro do depurador (gdb, por padrão).
+#
+#  Configurado pela seção "exec" do .mockshadow/config.json:
+#    "binary"     caminho do executável, relativo ao projeto mockshadow
+#                 (padrão: <build.buildDir>/<build.target ou "executable">)
+#    "args"       argumentos passados ao executável
+#    "debugger"   comando do depurador (padrão: ["gdb", "-q", "--args"])
+
+import datetime
+import hashlib
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+HISTORY_FILE = "exec_history.jsonl"
+DEFAULT_DEBUGGER = ["gdb", "-q", "--args"]
+
+# Métricas exibidas: (chave, descrição, unidade)
+METRICS = [
+    ("wall_s", "wall time", "s"),
+    ("cpu_s", "cpu time", "s"),
+    ("user_s", "  user", "s"),
+    ("system_s", "  system", "s"),
+    ("max_rss_kb", "peak RSS", "KB"),
+    ("voluntary_ctx_switches", "voluntary context switches", ""),
+    ("involuntary_ctx_switches", "involuntary context switches", ""),
+    ("minor_page_faults", "minor page faults", ""),
+    ("major_page_faults", "major page faults", ""),
+]
+
+def get_exec_config() -> dict:
+    import runtime
+    config = runtime.USER_CONFIGS.get("exec", {})
+    if not isinstance(config, dict):
+        sys.exit("fatal: invalid 'exec' section in .mockshadow/config.json")
+    return config
+
+def resolve_binary(binary) -> str:
+    """Caminho absoluto do executável 'binary' (padrão: o alvo do build), aceitando o sufixo .exe."""
+    import runtime
+    if binary is None:
+        build_config = runtime.USER_CONFIGS.get("build", {})
+        if not isinstance(build_config, dict):
+            build_config = {}
+        binary = os.path.join(build_config.get("buildDir", "build"), build_config.get("target") or "executable")
+    binary = os.path.join(runtime.DIR_MOCK_SHADOW_PROJECT, binary)
+    if not os.path.isfile(binary) and os.path.isfile(binary + ".exe"):
+        binary += ".exe"
+    return binary
+
+def get_binary(config: dict) -> str:
+    import runtime
+    binary = resolve_binary(config.get("binary"))
+    if not os.path.isfile(binary):
+        print(f"Error: executable '{os.path.relpath(binary, runtime.DIR_MOCK_SHADOW_PROJECT)}' not found. "
+              "Run 'mockshadow build' or set 'exec.binary' in .mockshadow/config.json.")
+        sys.exit(1)
+    return binary
+
+def get_program_args(config: dict, extra_args: list) -> list:
+    args = config.get("args", [])
+    if not isinstance(args, list) or not all(isinstance(arg, str) for arg in args):
+        sys.exit("fatal: invalid 'exec.args' in .mockshadow/config.json")
+    return args + list(extra_args)
+
+def get_history_path() -> str:
+    import runtime
+    return os.path.join(runtime.DIR_MOCK_SHADOW_PROJECT, ".mockshadow", HISTORY_FILE)
+
+def binary_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+def rusage_metrics(rusage) -> dict:
+    # ru_maxrss é em kilobytes no Linux e em bytes no macOS
+    max_rss_kb = rusage.ru_maxrss // 1024 if sys.platform == "darwin" else rusage.ru_maxrss
+    return {
+        "cpu_s": rusage.ru_utime + rusage.ru_stime,
+        "user_s": rusage.ru_utime,
+        "system_s": rusage.ru_stime,
+        "max_rss_kb": max_rss_kb,
+        "voluntary_ctx_switches": rusage.ru_nvcsw,
+        "involuntary_ctx_switches": rusage.ru_nivcsw,
+        "minor_page_faults": rusage.ru_minflt,
+        "major_page_faults": rusage.ru_majflt,
+    }
+
+def run_measured(command: list, cwd: str = None) -> tuple:
+    """
+    Executa 'command' (com stdin/stdout/stderr herdados) e retorna (código de saída, métricas).
+    Sem wait4() (Windows), somente o tempo de relógio é medido.
+    """
+    started = time.perf_counter()
+    try:
+        process = subprocess.Popen(command, cwd=cwd)
+    except OSError as e:
+        print(f"Error: cannot execute '{command[0]}': {e}")
+        sys.exit(1)
+    # Um Ctrl+C encerra o firmware (mesmo grupo de processos), mas não o mockshadow, que ainda
+    # registra as medições da execução interrompida. O SIGINT só é ignorado depois de criar o
+    # processo, pois um sinal ignorado continua ignorado após o exec.
+    previous_handler = signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        if hasattr(os, "wait4"):
+            _, wait_status, rusage = os.wait4(process.pid, 0)
+            wall = time.perf_counter() - started
+            # Evita que o Popen tente aguardar um processo que já foi coletado
+            process.returncode = os.waitstatus_to_exitcode(wait_status)
+            metrics = rusage_metrics(rusage)
+        else:
+            process.wait()
+            wall = time.perf_counter() - started
+            metrics = {}
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+    metrics["wall_s"] = wall
+    return process.returncode, metrics
+
+def load_history() -> list:
+    try:
+        with open(get_history_path(), "r", encoding="utf-8") as f:
+            lines = f.readlines()
+    except OSError:
+        return []
+    history = []
+    for line in lines:
+        try:
+            history.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return history
+
+def append_history(record: dict):
+    history_path = get_history_path()
+    os.makedirs(os.path.dirname(history_path), exist_ok=True)
+    with open(history_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, sort_keys=True) + "\n")
+
+def previous_run(history: list, record: dict):
+    """Última execução registrada do mesmo binário (mesmo caminho e argumentos)."""
+    for entry in reversed(history):
+        if entry.get("binary") == record["binary"] and entry.get("args") == record["args"]:
+            return entry
+    return None
+
+def format_value(value, unit: str) -> str:
+    if unit == "s":
+        return f"{value:.3f} s"
+    if unit == "KB":
+        return f"{value / 1024:.1f} MB"
+    return str(value)
+
+def print_metrics(metrics: dict, previous: dict = None):
+    for key, label, unit in METRICS:
+        if key not in metrics:
+            continue
+        line = f"  {label:<30}{format_value(metrics[key], unit):>14}"
+        if previous is not None and key in previous.get("metrics", {}):
+            before = previous["metrics"][key]
+            change = f", {(metrics[key] - before) / before * 100:+.1f}%" if before else ""
+            line += f"   (previous {format_value(before, unit)}{change})"
+        print(line)
+
+def exec_project(extra_args: list = (), show_diff: bool = False):
+    import runtime
+    config = get_exec_config()
+    binary = get_binary(config)
+    args = get_program_args(config, extra_args)
+    rel_binary = os.path.relpath(binary, runtime.DIR_MOCK_SHADOW_PROJECT).replace("\\", "/")
+
+    print(f"Executing {rel_binary} ...")
+    exit_code, metrics = run_measured([binary] + args, cwd=runtime.DIR_MOCK_SHADOW_PROJECT)
+    if exit_code < 0:
+        print(f"Execution finished (killed by signal {-exit_code})")
+    else:
+        print(f"Execution finished (exit code {exit_code})")
+
+    record = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "binary": rel_binary,
+        "binary_sha256": binary_digest(binary),
+        "args": args,
+        "exit_code": exit_code,
+        "metrics": metrics,
+    }
+    previous = previous_run(load_history(), record) if show_diff else None
+    if show_diff:
+        if previous is None:
+            print("  No previous run of this binary to compare with")
+        else:
+            same_binary = "" if previous.get("binary_sha256") == record["binary_sha256"] else ", different binary"
+            print(f"  Compared with the run of {previous.get('timestamp')}{same_binary}:")
+    print_metrics(metrics, previous)
+    append_history(record)
+
+    if exit_code != 0:
+        sys.exit(exit_code if exit_code > 0 else 128 - exit_code)
+
+def debug_project(extra_args: list = ()):
+    import runtime
+    config = get_exec_config()
+    binary = get_binary(config)
+    args = get_program_args(config, extra_args)
+    debugger = config.get("debugger", DEFAULT_DEBUGGER)
+    if isinstance(debugger, str):
+        debugger = [debugger]
+    if not isinstance(debugger, list) or not debugger or not all(isinstance(arg, str) for arg in debugger):
+        sys.exit("fatal: invalid 'exec.debugger' in .mockshadow/config.json")
+
+    print(f"Debugging {binary} ...")
+    try:
+        process = subprocess.Popen(debugger + [binary] + args, cwd=runtime.DIR_MOCK_SHADOW_PROJECT)
+    except OSError as e:
+        print(f"Error: cannot execute '{debugger[0]}': {e}")
+        sys.exit(1)
+    # O depurador trata o Ctrl+C (interrompe o programa depurado)
+    previous_handler = signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        status = process.wait()
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+    if status != 0:
+        sys.exit(status)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+#  Cache persistente dos resultados do extractor.
+#
+#  Cada chamada ao extractor é identificada pelo hash do conteúdo do arquivo analisado, pelo seu
+#  caminho, pelos argumentos (tipo e nome do símbolo, argumentos extras e extractorCFlags) e pelas
+#  versões do mockshadow e do gerador. O resultado ("<início>;<fim>") fica guardado em um banco
+#  SQLite em .mockshadow/cache/extractor_results.sqlite e é reaproveitado sem chamar a libclang,
+#  inclusive em 'remock' e em arquivos cujo __mock__ mudou apenas em parte das diretivas.
+#
+#  Os headers incluídos pelo parse são guardados com os seus hashes: se algum deles mudou, o
+#  resultado é descartado. Resultados cujos headers incluídos não são conhecidos (extractor em
+#  subprocesso ou worker sem libclang) não são guardados. O banco tem tamanho limitado
+#  ("extractorCacheMaxMB", padrão 64 MB); ao ultrapassá-lo, os resultados usados há mais tempo
+#  são removidos. Com "extractorCache": false no config.json o cache não é usado.
+#
+#  Os processos do pool de geração usam o mesmo banco (cada um com a sua conexão). Qualquer
+#  erro do SQLite apenas faz a chamada ir para o extractor: o cache é somente uma otimização.
+
+import contextlib
+import hashlib
+import json
+import os
+import sys
+import time
+
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+
+import mock_cache
+
+SCHEMA_VERSION = 1
+DB_FILE = "extractor_results.sqlite"
+DEFAULT_MAX_MB = 64
+# Após a remoção por tamanho, o banco fica com esta fração do limite
+EVICT_TARGET = 0.9
+# Quantidade de resultados gravados por um processo entre duas verificações de tamanho
+EVICT_CHECK_INTERVAL = 100
+
+# Conexões do processo atual, por banco (uma por processo: conexões não sobrevivem a um fork)
+_connections = {}
+_connection_pid = None
+_stores_since_check = 0
+# Hash de cada arquivo já lido neste processo, por (caminho, mtime, tamanho)
+_digests = {}
+
+def get_db_path() -> str:
+    return os.path.join(mock_cache.get_cache_dir(), DB_FILE)
+
+def cache_enabled() -> bool:
+    import runtime
+    return sqlite3 is not None and bool(runtime.USER_CONFIGS.get("extractorCache", True))
+
+def get_max_bytes() -> int:
+    import runtime
+    max_mb = runtime.USER_CONFIGS.get("extractorCacheMaxMB", DEFAULT_MAX_MB)
+    if not isinstance(max_mb, (int, float)) or max_mb <= 0:
+        sys.exit(f"fatal: invalid 'extractorCacheMaxMB' in .mockshadow/config.json: {max_mb}")
+    return int(max_mb * 1024 * 1024)
+
+def connect(create: bool = True):
+    """Conexão com o banco do projeto atual (ou None se o banco não existe e 'create' é False)."""
+    global _connections, _connection_pid
+    if _connection_pid != os.getpid():
+        _connections, _connection_pid = {}, os.getpid()
+    db_path = get_db_path()
+    if db_path in _connections:
+        return _connections[db_path]
+    if not create and not os.path.isfile(db_path):
+        return None
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    connection = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        connection.executescript(f"""
+            BEGIN IMMEDIATE;
+            DROP TABLE IF EXISTS results;
+            DROP TABLE IF EXISTS counters;
+            CREATE TABLE results (key TEXT PRIMARY KEY, status INTEGER, output TEXT, includes TEXT,
+                                  size INTEGER, last_used REAL, hits INTEGER DEFAULT 0);
+            CREATE INDEX results_last_used ON results (last_used);
+            CREATE TABLE counters (name TEXT PRIMARY KEY, value INTEGER);
+            PRAGMA user_version = {SCHEMA_VERSION};
+            COMMIT;
+        """)
+    _connections[db_path] = connection
+    return connection
+
+def close():
+    """Fecha a conexão do processo atual com o banco do projeto atual."""
+    if _connection_pid == os.getpid():
+        connection = _connections.pop(get_db_path(), None)
+        if connection is not None:
+            connection.close()
+
+def current_digest(path: str):
+    """Hash de um arquivo, calculado no máximo uma vez enquanto ele não for modificado."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    memo_key = (path, st.st_mtime_ns, st.st_size)
+    if memo_key not in _digests:
+        _digests[memo_key] = mock_cache.include_digest(path)
+    return _digests[memo_key]
+
+def result_key(args: list):
+    """Chave de uma chamada ao extractor, ou None se o arquivo analisado não puder ser lido."""
+    import mock_utils
+    digest = current_digest(args[2])
+    if digest is None:
+        return None
+    h = hashlib.sha256()
+    for part in (mock_utils.MOCKSHADOW_VERSION, str(mock_utils.GENERATOR_VERSION), os.path.abspath(args[2]), digest,
+                 json.dumps(args[:2] + args[3:])):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+@contextlib.contextmanager
+def transaction(connection):
+    """Executa o bloco em uma transação de escrita (a conexão está em modo autocommit)."""
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    connection.execute("COMMIT")
+
+def add_counter(connection, name: str, amount: int = 1):
+    connection.execute("INSERT INTO counters (name, value) VALUES (?, ?) "
+                       "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value", (name, amount))
+
+def lookup(args: list):
+    """
+    Resultado guardado de uma chamada ao extractor: (chave, (status, saída, headers incluídos)).
+    O resultado é None quando não há resultado válido; a chave (ou None) é usada em store().
+    Um resultado sem os headers incluídos não pode ser validado e nunca é reaproveitado.
+    """
+    if not cache_enabled():
+        return None, None
+    try:
+        key = result_key(args)
+        if key is None:
+            return None, None
+        connection = connect()
+        row = connection.execute("SELECT status, output, includes FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return key, None
+        status, output, includes = row
+        if includes is None:
+            return key, None
+        includes = json.loads(includes)
+        if any(current_digest(path) != digest for path, digest in includes.items()):
+            return key, None
+        with transaction(connection):
+            connection.execute("UPDATE results SET last_used = ?, hits = hits + 1 WHERE key = ?", (time.time(), key))
+            add_counter(connection, "hits")
+        return key, (status, output, list(includes))
+    except (sqlite3.Error, OSError, ValueError):
+        return None, None
+
+def store(key: str, status: int, output: str, includes):
+    """
+    Guarda o resultado de uma chamada ao extractor: somente chamadas bem-sucedidas e com os
+    headers incluídos conhecidos (sem eles, uma mudança em um header não invalidaria o resultado).
+    """
+    global _stores_since_check
+    if key is None or status != 0 or includes is None:
+        return
+    try:
+        includes = {path: current_digest(path) for path in includes}
+        includes = json.dumps(includes, sort_keys=True)
+        size = len(key) + len(output) + len(includes)
+        connection = connect()
+        with transaction(connection):
+            connection.execute("INSERT OR REPLACE INTO results (key, status, output, includes, size, last_used, hits) "
+                               "VALUES (?, ?, ?, ?, ?, ?, 0)", (key, status, output, includes, size, time.time()))
+            add_counter(connection, "misses")
+        _stores_since_check += 1
+        if _stores_since_check >= EVICT_CHECK_INTERVAL:
+            _stores_since_check = 0
+            evict(connection, get_max_bytes())
+    except (sqlite3.Error, OSError):
+        pass
+
+def evict(connection, max_bytes: int) -> int:
+    """Remove os resultados usados há mais tempo até o banco caber no limite. Retorna quantos removeu."""
+    total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+    if total <= max_bytes:
+        return 0
+    excess = total - int(max_bytes * EVICT_TARGET)
+    removed = []
+    for key, size in connection.execute("SELECT key, size FROM results ORDER BY last_used"):
+        if excess <= 0:
+            break
+        removed.append((key,))
+        excess -= size
+    with transaction(connection):
+        connection.executemany("DELETE FROM results WHERE key = ?", removed)
+        add_counter(connection, "evictions", len(removed))
+    return len(removed)
+
+def stats():
+    """Estatísticas do banco, ou None se ele não existe."""
+    if sqlite3 is None:
+        return None
+    connection = connect(create=False)
+    if connection is None:
+        return None
+    entries, size = connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+    counters = dict(connection.execute("SELECT name, value FROM counters"))
+    return {
+        "entries": entries,
+        "bytes": size,
+        "file_bytes": os.path.getsize(get_db_path()),
+        "max_bytes": get_max_bytes(),
+        "hits": counters.get("hits", 0),
+        "misses": counters.get("misses", 0),
+        "evictions": counters.get("evictions", 0),
+    }
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+#  Serviço de acesso ao clang-code-extractor.
+#
+#  Em vez de iniciar um "python extract.py ..." por diretiva de mock, mantém um
+#  processo worker (extractor_worker.py) por projeto vivo durante toda a execução,
+#  com a libclang já carregada. Caso o worker não possa ser iniciado ou morra no meio
+#  da execução, as chamadas voltam a usar um subprocesso por requisição.
+#
+#  Os resultados são guardados no cache persistente (extractor_cache.py) e reaproveitados
+#  enquanto o arquivo analisado, os argumentos e os headers incluídos não mudarem.
+#  Antes de tudo isso, macros, typedefs e variáveis simples são localizados diretamente no
+#  texto do arquivo (lexical_locator.py), sem nenhum parse.
+#
+#  O worker também informa os headers incluídos pelos parses de cada requisição;
+#  eles são acumulados até a próxima chamada a take_includes().
+
+import atexit
+import json
+import os
+import subprocess
+import sys
+import extractor_cache
+import lexical_locator
+import tracing
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+EXTRACTOR_DIR = os.path.join(script_dir, "clang-code-extractor")
+
+class ExtractorWorkerError(Exception):
+    """Falha de comunicação com o worker do extractor."""
+
+class ExtractorWorker:
+    """
+    Processo persistente que executa o extract.py sob demanda.
+    A comunicação é feita por stdin/stdout, uma mensagem JSON por linha.
+    """
+    def __init__(self, extractor_dir: str = EXTRACTOR_DIR, options: dict = None):
+        self.extractor_dir = extractor_dir
+        # Opções do worker (ver extractor_worker.py)
+        self.options = options or {}
+        self.process = None
+        # Headers incluídos pelos parses da última requisição (None: desconhecidos)
+        self.last_includes = None
+
+    def start(self):
+        worker_script = os.path.join(script_dir, "extractor_worker.py")
+        try:
+            self.process = subprocess.Popen(
+                [sys.executable, worker_script, self.extractor_dir, json.dumps(self.options)],
+                cwd=self.extractor_dir,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                encoding="utf-8",
+            )
+        except OSError as e:
+            raise ExtractorWorkerError(f"cannot start extractor worker: {e}")
+
+        hello = self._read_message()
+        if not hello.get("ready"):
+            self.stop()
+            raise ExtractorWorkerError(f"extractor worker not ready: {hello.get('error', '')}")
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def request(self, args: list) -> tuple:
+        """Envia uma requisição ao worker e retorna (status, saida)."""
+        if not self.is_alive():
+            raise ExtractorWorkerError("extractor worker is not running")
+        try:
+            self.process.stdin.write(json.dumps({"args": args}) + "\n")
+            self.process.stdin.flush()
+        except OSError as e:
+            raise ExtractorWorkerError(f"cannot send request to extractor worker: {e}")
+        response = self._read_message()
+        self.last_includes = response.get("includes")
+        return response.get("status", 1), response.get("output", "")
+
+    def stop(self):
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            try:
+                self.process.stdin.write(json.dumps({"cmd": "exit"}) + "\n")
+                self.process.stdin.close()
+                self.process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+                self.process.wait()
+        self.process = None
+
+    def _read_message(self) -> dict:
+        line = self.process.stdout.readline()
+        if not line:
+            raise ExtractorWorkerError("extractor worker closed the connection")
+        try:
+            return json.loads(line)
+        except json.JSONDecodeError:
+            raise ExtractorWorkerError(f"invalid response from extractor worker: {line.strip()}")
+
+# Worker de cada projeto mockshadow (por diretório), compartilhado pelas gerações do processo
+_workers = {}
+# Projetos cujo worker não pôde ser iniciado: usam um subprocesso por requisição
+_workers_disabled = set()
+_atexit_registered = False
+# Headers incluídos pelos parses desde a última chamada a take_includes() (None: desconhecidos)
+_includes = set()
+
+def record_includes(includes):
+    global _includes
+    if includes is None:
+        _includes = None
+    elif _includes is not None:
+        _includes.update(includes)
+
+def take_includes():
+    """
+    Retorna os headers incluídos (direta ou indiretamente) pelos parses feitos desde a chamada
+    anterior, e recomeça a contagem. Retorna None se algum parse não informou as suas inclusões
+    (extractor em subprocesso ou sem libclang no worker).
+    """
+    global _includes
+    includes, _includes = _includes, set()
+    return includes
+
+def worker_enabled() -> bool:
+    """O worker pode ser desativado com "extractorWorker": false no config.json."""
+    import runtime
+    return bool(runtime.USER_CONFIGS.get("extractorWorker", True))
+
+def get_worker_options() -> dict:
+    """
+    Opções do worker a partir do config.json: "extractorPCH" lista o prefixo comum de headers
+    a pré-compilar (gravados em .mockshadow/cache/pch), identificados também pelas extractorCFlags.
+    """
+    import runtime
+    import mock_cache
+    headers = runtime.USER_CONFIGS.get("extractorPCH", [])
+    if not isinstance(headers, list) or not all(isinstance(header, str) and header for header in headers):
+        sys.exit("fatal: invalid 'extractorPCH' in .mockshadow/config.json")
+    if not headers:
+        return {}
+    return {"pchHeaders": headers, "pchDir": os.path.join(mock_cache.get_cache_dir(), "pch"),
+            "pchFlags": runtime.USER_CONFIGS.get("extractorCFlags", [])}
+
+def get_worker():
+    """
+    Retorna o worker do projeto atual, iniciando-o na primeira chamada (ou None se indisponível).
+    Se as opções do config.json mudaram, o worker é reiniciado com as novas opções.
+    """
+    global _atexit_registered
+    import runtime
+    project_dir = runtime.DIR_MOCK_SHADOW_PROJECT
+    if project_dir in _workers_disabled:
+        return None
+    options = get_worker_options()
+    worker = _workers.get(project_dir)
+    if worker is not None and worker.options != options:
+        stop_extractor()
+        worker = None
+    if worker is None:
+        worker = ExtractorWorker(options=options)
+        try:
+            worker.start()
+        except ExtractorWorkerError as e:
+            print(f"Warning: {e}. Falling back to one extractor process per directive.")
+            _workers_disabled.add(project_dir)
+            return None
+        _workers[project_dir] = worker
+        if not _atexit_registered:
+            atexit.register(stop_all_extractors)
+            _atexit_registered = True
+    return worker
+
+def disable_worker():
+    """Encerra o worker do projeto atual e passa a usar um subprocesso por requisição."""
+    import runtime
+    stop_extractor()
+    _workers_disabled.add(runtime.DIR_MOCK_SHADOW_PROJECT)
+
+def stop_extractor():
+    """Encerra o worker do projeto atual, se estiver rodando."""
+    import runtime
+    worker = _workers.pop(runtime.DIR_MOCK_SHADOW_PROJECT, None)
+    if worker is not None:
+        worker.stop()
+
+def stop_all_extractors():
+    """Encerra os workers de todos os projetos."""
+    while _workers:
+        _workers.popitem()[1].stop()
+
+def forget_extractor():
+    """
+    Descarta as referências aos workers sem encerrá-los. Usado em processos filhos criados por fork,
+    que herdam o estado do processo pai mas precisam iniciar o seu próprio worker.
+    """
+    _workers.clear()
+    _workers_disabled.clear()
+
+def run_extractor_subprocess(args: list) -> tuple:
+    """Caminho legado: um processo 'python extract.py' por requisição."""
+    cmd = [sys.executable, "extract.py"] + args
+    try:
+        result = subprocess.run(cmd, cwd=EXTRACTOR_DIR, capture_output=True, text=True)
+    except Exception as e:
+        print(f"Error executing extractor: {e}")
+        sys.exit(1)
+    return result.returncode, result.stdout + result.stderr
+
+def run_extractor(args: list) -> tuple:
+    """
+    Executa o extractor com os argumentos 'args' (os mesmos aceitos pelo extract.py)
+    e retorna (status, saida). Macros, typedefs e variáveis simples são localizados
+    sem o clang (lexical_locator.py); os demais usam o cache, o worker persistente
+    e, em caso de falha, o subprocesso por requisição.
+    """
+    with tracing.span(" ".join(args[:2]), tracing.CATEGORY_EXTRACTOR, type=args[0], name=args[1], file=args[2]):
+        mode = lexical_locator.get_mode()
+        located = lexical_locator.resolve(args) if mode != "off" else None
+        if located is not None and mode != "verify":
+            # A posição é obtida somente do próprio arquivo: não depende de nenhum header
+            record_includes(())
+            return located
+        status, output = run_clang_extractor(args)
+        if located is not None:
+            lexical_locator.verify(args, located, (status, output))
+        return status, output
+
+def run_clang_extractor(args: list) -> tuple:
+    """Executa o extractor (clang) para 'args', usando o cache de resultados quando possível."""
+    key, cached = extractor_cache.lookup(args)
+    if cached is not None:
+        status, output, includes = cached
+        record_includes(includes)
+        return status, output
+    worker = get_worker() if worker_enabled() else None
+    if worker is not None:
+        try:
+            status, output = worker.request(args)
+            record_includes(worker.last_includes)
+            extractor_cache.store(key, status, output, worker.last_includes)
+            return status, output
+        except ExtractorWorkerError as e:
+            print(f"Warning: {e}. Falling back to one extractor process per directive.")
+            disable_worker()
+    # O subprocesso não informa os headers incluídos: o resultado não vai para o cache
+    record_includes(None)
+    return run_extractor_subprocess(args)
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+#  Worker persistente do clang-code-extractor.
+#
+#  Executado por extractor_service.py dentro do diretório clang-code-extractor.
+#  Carrega o extract.py (e consequentemente a libclang) uma única vez e atende
+#  requisições pelo stdin/stdout, uma mensagem JSON por linha:
+#
+#    requisição: {"args": ["<EXTRACT_TYPE>", "<EXTRACT_NAME>", "<FILE>", "lines", ...]}
+#    resposta:   {"status": <codigo de saida>, "output": "<stdout + stderr do extractor>",
+#                 "includes": ["<header incluído>", ...]}
+#
+#  Logo após iniciar, o worker envia {"ready": true} ou {"ready": false, "error": "..."}.
+#
+#  Os TranslationUnits da libclang ficam em cache enquanto o worker viver, de forma
+#  que várias diretivas resolvidas sobre o mesmo arquivo (sem alterações entre elas)
+#  compartilham um único parse.
+#
+#  "includes" lista todos os headers incluídos (direta ou indiretamente) pelos parses
+#  usados na requisição. O campo é omitido quando a libclang não está disponível
+#  para o worker (inclusões desconhecidas).
+#
+#  Opções (JSON, segundo argumento do worker):
+#    "pchHeaders"  prefixo comum de headers (ex.: ["stm32f4xx.h", "stm32f4xx_hal.h"]). Um header
+#                  pré-compilado com esses headers é gerado em "pchDir" para cada conjunto de
+#                  argumentos de compilação e usado nos parses dos arquivos cujos primeiros
+#                  #include são exatamente esses headers, nessa ordem. Ele é gerado novamente
+#                  quando o conteúdo de qualquer header incluído nele muda.
+#    "pchDir"      diretório dos headers pré-compilados
+#    "pchFlags"    extractorCFlags, que fazem parte da identidade do header pré-compilado
+
+import collections
+import contextlib
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import re
+import runpy
+import sys
+
+def exit_status(code) -> int:
+    """Converte o código de um SystemExit no status que o processo retornaria."""
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    # sys.exit("mensagem") imprime a mensagem e retorna 1
+    print(code, file=sys.stderr)
+    return 1
+
+class ExtractScript:
+    """
+    Mantém o extract.py carregado em memória.
+    Se o script expõe uma função main(), ela é reaproveitada a cada requisição;
+    caso contrário o script é reexecutado como __main__ (os módulos importados,
+    como clang.cindex, continuam em cache no sys.modules).
+    """
+    def __init__(self, extract_py: str):
+        self.extract_py = extract_py
+        spec = importlib.util.spec_from_file_location("extract", extract_py)
+        self.module = importlib.util.module_from_spec(spec)
+        sys.modules["extract"] = self.module
+        spec.loader.exec_module(self.module)
+        self.main = getattr(self.module, "main", None)
+
+    def run(self, args: list) -> tuple:
+        output = io.StringIO()
+        status = 0
+        argv_backup = sys.argv
+        sys.argv = [self.extract_py] + list(args)
+        try:
+            with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+                try:
+                    if callable(self.main):
+                        self.main()
+                    else:
+                        runpy.run_path(self.extract_py, run_name="__main__")
+                except SystemExit as e:
+                    status = exit_status(e.code)
+        except Exception as e:
+            output.write(f"{type(e).__name__}: {e}\n")
+            status = 1
+        finally:
+            sys.argv = argv_backup
+        return status, output.getvalue()
+
+# Quantidade máxima de TranslationUnits mantidos em memória
+PARSE_CACHE_SIZE = 8
+
+# Headers incluídos pelos parses da requisição atual (None: parse cache não instalado)
+request_includes = None
+
+def file_digest(path: str):
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except OSError:
+        return None
+
+def file_mtime_ns(path: str):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+RE_INCLUDE = re.compile(r'\s*#\s*include\s*[<"]([^>"]+)[>"]')
+RE_DIRECTIVE = re.compile(r"\s*#")
+
+def leading_includes(path: str, count: int) -> list:
+    """
+    Headers dos primeiros 'count' #include de um arquivo, desde que nenhuma outra diretiva ou
+    código apareça antes deles (somente linhas em branco e comentários).
+    """
+    names = []
+    in_comment = False
+    try:
+        with open(path, "r", encoding="latin-1") as f:
+            for line in f:
+                # Remove os comentários da linha (incluindo os de várias linhas)
+                text = ""
+                while line:
+                    if in_comment:
+                        end = line.find("*/")
+                        if end < 0:
+                            line = ""
+                        else:
+                            line, in_comment = line[end + 2:], False
+                    else:
+                        start = line.find("/*")
+                        line_comment = line.find("//")
+                        if line_comment >= 0 and (start < 0 or line_comment < start):
+                            text += line[:line_comment]
+                            line = ""
+                        elif start >= 0:
+                            text, line, in_comment = text + line[:start] + " ", line[start + 2:], True
+                        else:
+                            text, line = text + line, ""
+                if not text.strip():
+                    continue
+                match = RE_INCLUDE.match(text)
+                if match is None:
+                    break
+                names.append(match.group(1))
+                if len(names) == count:
+                    break
+    except OSError:
+        pass
+    return names
+
+class PrecompiledHeader:
+    """
+    Headers pré-compilados do prefixo comum 'headers', um por conjunto de argumentos de compilação.
+    Cada um é gravado em '<pch_dir>/<chave>.pch', com a lista dos headers incluídos nele (e o hash
+    do conteúdo de cada um) em '<chave>.json'. A chave inclui as flags do extractor ('flags', de
+    extractorCFlags); o .pch só é reaproveitado se o conteúdo dos headers incluídos não mudou.
+    """
+    def __init__(self, headers: list, pch_dir: str, cindex, parse, flags: list = None):
+        self.headers = list(headers)
+        self.pch_dir = pch_dir
+        self.flags = list(flags or [])
+        self.cindex = cindex
+        # from_source original, sem o cache de parses
+        self.parse = parse
+        # Chaves já verificadas na requisição atual: (caminho do .pch, headers incluídos nele)
+        self.checked = {}
+        # Chaves cujo header pré-compilado não pôde ser gerado ou usado
+        self.failed = set()
+        # Hash do conteúdo de cada header, recalculado somente quando o stat do arquivo muda
+        self.digests = {}
+
+    def begin_request(self):
+        self.checked.clear()
+
+    def applies_to(self, filename: str) -> bool:
+        return leading_includes(filename, len(self.headers)) == self.headers
+
+    def key(self, args: tuple) -> str:
+        library = getattr(self.cindex.conf.lib, "_name", "") or ""
+        h = hashlib.sha1(json.dumps([self.headers, self.flags, list(args), library]).encode("utf-8"))
+        return h.hexdigest()
+
+    def digest(self, path: str):
+        """Hash do conteúdo de 'path' (None se o arquivo não existir)."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        # O ctime muda a cada escrita, mesmo que o mtime seja restaurado
+        signature = (st.st_mtime_ns, st.st_ctime_ns, st.st_size)
+        entry = self.digests.get(path)
+        if entry is None or entry[0] != signature:
+            entry = self.digests[path] = (signature, file_digest(path))
+        return entry[1]
+
+    def get(self, args: tuple):
+        """Retorna (caminho do .pch, headers incluídos nele) para os argumentos 'args', ou None."""
+        key = self.key(args)
+        if key in self.failed:
+            return None
+        if key not in self.checked:
+            self.checked[key] = self.load(key) or self.build(key, args)
+        return self.checked[key]
+
+    def load(self, key: str):
+        pch_path = os.path.join(self.pch_dir, key + ".pch")
+        try:
+            with open(os.path.join(self.pch_dir, key + ".json"), "r", encoding="utf-8") as f:
+                includes = json.load(f)["includes"]
+        except (OSError, ValueError, KeyError):
+            return None
+        if not os.path.isfile(pch_path) or any(self.digest(path) != digest for path, digest in includes):
+            return None
+        return pch_path, [path for path, _ in includes]
+
+    def build(self, key: str, args: tuple):
+        os.makedirs(self.pch_dir, exist_ok=True)
+        prefix_path = os.path.join(self.pch_dir, key + ".h")
+        with open(prefix_path, "w", encoding="utf-8") as f:
+            for header in self.headers:
+                f.write(f'#include "{header}"\n')
+        try:
+            # O prefixo é compilado como header (-x c-header); PARSE_INCOMPLETE é o modo indicado
+            # pela libclang para gerar um header pré-compilado
+            tu = self.parse(self.cindex.TranslationUnit, prefix_path, ["-x", "c-header"] + list(args), None,
+                            self.cindex.TranslationUnit.PARSE_INCOMPLETE, None)
+            if any(d.severity >= self.cindex.Diagnostic.Error for d in tu.diagnostics):
+                # O prefixo não compila sozinho com esses argumentos
+                self.failed.add(key)
+                return None
+            includes = [[inclusion.include.name, self.digest(inclusion.include.name)]
+                        for inclusion in tu.get_includes()]
+            # Vários workers podem gerar o mesmo header ao mesmo tempo: grava e renomeia
+            tmp_path = os.path.join(self.pch_dir, f"{key}.{os.getpid()}.tmp")
+            tu.save(tmp_path)
+            os.replace(tmp_path, os.path.join(self.pch_dir, key + ".pch"))
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"headers": self.headers, "args": list(args), "includes": includes}, f)
+            os.replace(tmp_path, os.path.join(self.pch_dir, key + ".json"))
+        except Exception:
+            self.failed.add(key)
+            return None
+        return os.path.join(self.pch_dir, key + ".pch"), [path for path, _ in includes]
+
+    def rejected(self, tu) -> bool:
+        """Verifica se o clang recusou o header pré-compilado no parse de 'tu'."""
+        for diagnostic in tu.diagnostics:
+            text = diagnostic.spelling
+            if diagnostic.severity >= self.cindex.Diagnostic.Error and (
+                    "precompiled header" in text or "PCH" in text or "AST file" in text):
+                return True
+        return False
+
+def install_parse_cache(max_entries: int = PARSE_CACHE_SIZE, options: dict = None):
+    """
+    Envolve clang.cindex.TranslationUnit.from_source (usado também por Index.parse)
+    com um cache LRU. A chave é o caminho do arquivo, os argumentos de compilação,
+    as opções e o hash do conteúdo do arquivo. Um TU em cache só é reaproveitado
+    se nenhum dos headers incluídos no parse tiver sido modificado desde então.
+    As inclusões de cada TU usado são acumuladas em 'request_includes'.
+    Com a opção "pchHeaders", os parses usam o header pré-compilado do prefixo comum.
+    Retorna o PrecompiledHeader em uso (ou None).
+    """
+    global request_includes
+    try:
+        from clang import cindex
+    except ImportError:
+        return None
+    request_includes = set()
+    original_from_source = cindex.TranslationUnit.from_source.__func__
+    cache = collections.OrderedDict()
+    options = options or {}
+    pch = None
+    if options.get("pchHeaders") and options.get("pchDir"):
+        pch = PrecompiledHeader(options["pchHeaders"], options["pchDir"], cindex, original_from_source,
+                                options.get("pchFlags"))
+
+    def parse(cls, filename, args, options, index) -> tuple:
+        """Faz o parse (com o header pré-compilado, se possível); retorna (tu, headers do .pch)."""
+        if pch is not None and pch.applies_to(filename):
+            entry = pch.get(tuple(args or ()))
+            if entry is not None:
+                pch_path, pch_includes = entry
+                tu = original_from_source(cls, filename, list(args or ()) + ["-include-pch", pch_path],
+                                          None, options, index)
+                if not pch.rejected(tu):
+                    return tu, pch_includes
+                pch.failed.add(pch.key(tuple(args or ())))
+        return original_from_source(cls, filename, args, None, options, index), []
+
+    def from_source(cls, filename, args=None, unsaved_files=None, options=0, index=None):
+        if unsaved_files or filename is None:
+            return original_from_source(cls, filename, args, unsaved_files, options, index)
+
+        key = (os.path.abspath(filename), tuple(args or ()), options, file_digest(filename))
+        entry = cache.get(key)
+        if entry is not None:
+            tu, includes = entry
+            if all(file_mtime_ns(path) == mtime for path, mtime in includes):
+                cache.move_to_end(key)
+                request_includes.update(path for path, _ in includes)
+                return tu
+            del cache[key]
+
+        tu, pch_includes = parse(cls, filename, args, options, index)
+        includes = []
+        # Os headers do .pch não aparecem nas inclusões do TU, mas também são dependências dele
+        for path in [inclusion.include.name for inclusion in tu.get_includes()] + pch_includes:
+            includes.append((path, file_mtime_ns(path)))
+        cache[key] = (tu, includes)
+        request_includes.update(path for path, _ in includes)
+        while len(cache) > max_entries:
+            cache.popitem(last=False)
+        return tu
+
+    cindex.TranslationUnit.from_source = classmethod(from_source)
+    return pch
+
+def send(channel, message: dict):
+    channel.write(json.dumps(message) + "\n")
+    channel.flush()
+
+def main():
+    # O canal de resposta é o stdout original; tudo que o extractor imprimir
+    # é capturado por ExtractScript.run() e devolvido no campo "output"
+    channel = sys.stdout
+    extractor_dir = sys.argv[1] if len(sys.argv) > 1 else os.getcwd()
+    extract_py = os.path.join(extractor_dir, "extract.py")
+    sys.path.insert(0, extractor_dir)
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            script = ExtractScript(extract_py)
+    except BaseException as e:
+        send(channel, {"ready": False, "error": f"{type(e).__name__}: {e}"})
+        return 1
+    try:
+        options = json.loads(sys.argv[2]) if len(sys.argv) > 2 else {}
+    except json.JSONDecodeError:
+        options = {}
+    pch = install_parse_cache(options=options)
+    send(channel, {"ready": True})
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError:
+            send(channel, {"status": 1, "output": f"Invalid request: {line}"})
+            continue
+        if request.get("cmd") == "exit":
+            break
+        if request_includes is not None:
+            request_includes.clear()
+        if pch is not None:
+            pch.begin_request()
+        status, output = script.run(request.get("args", []))
+        response = {"status": status, "output": output}
+        if request_includes is not None:
+            response["includes"] = sorted(os.path.abspath(path) for path in request_includes)
+        send(channel, response)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+#  Localizador léxico de macros, typedefs e variáveis globais.
+#
+#  Para diretivas do tipo "macro", "typedef" e "variable", o parse completo da libclang é
+#  desnecessário na maioria dos casos: o arquivo é dividido em tokens (tratando continuações de
+#  linha com '\', comentários, strings e diretivas do pré-processador) e o símbolo é localizado
+#  diretamente, com a mesma extensão que a libclang reportaria: do nome da macro (ou do primeiro
+#  token da declaração) até o seu último token.
+#
+#  O localizador só responde quando não há ambiguidade: o símbolo aparece uma única vez, fora de
+#  blocos condicionais (#if/#ifdef/#ifndef, exceto o include guard) e em uma declaração simples
+#  (um único declarador, sem atributos nem chamadas de macro), e nenhuma macro definida ou
+#  removida na linha de comando (-D/-U, de extractorCFlags ou dos argumentos da diretiva) aparece
+#  no arquivo. Nos demais casos a chamada segue para o extractor (clang). Com "lexicalLocator": "verify" no config.json as duas respostas são
+#  comparadas e as diferenças exibidas; com false o localizador não é usado.
+
+import re
+import sys
+
+# Tipos de diretiva resolvidos pelo localizador
+LEXICAL_TYPES = ("macro", "typedef", "variable")
+
+TOKEN = re.compile(r"""
+    (?P<splice>\\\r?\n)
+  | (?P<newline>\n)
+  | (?P<space>[ \t\f\v\r]+)
+  | (?P<line_comment>//(?:[^\n\\]|\\\r?\n|\\.?)*)
+  | (?P<block_comment>/\*.*?(?:\*/|\Z))
+  | (?P<string>"(?:[^"\\\n]|\\.)*"?)
+  | (?P<char>'(?:[^'\\\n]|\\.)*'?)
+  | (?P<ident>[A-Za-z_]\w*)
+  | (?P<number>\.?\d(?:[eEpP][+-]|[\w.])*)
+  | (?P<punct>.)
+""", re.VERBOSE | re.DOTALL)
+
+# Tokens que não geram símbolos, mas podem conter quebras de linha
+SKIPPED = ("splice", "space", "line_comment", "block_comment")
+# Profundidade atribuída a declarações que atravessam diretivas condicionais
+MIXED_DEPTH = 1 << 16
+# Palavras que podem preceder um identificador que não está sendo declarado
+NOT_DECLARATION = {"return", "case", "goto", "sizeof", "else", "do", "struct", "union", "enum"}
+TAG_KEYWORDS = ("struct", "union", "enum")
+# Palavras-chave que podem aparecer nos especificadores de uma declaração
+SPECIFIER_KEYWORDS = {
+    "typedef", "extern", "static", "auto", "register", "_Thread_local", "thread_local", "inline", "_Noreturn",
+    "const", "volatile", "restrict", "_Atomic", "signed", "unsigned", "short", "long", "int", "char",
+    "float", "double", "void", "_Bool", "bool", "_Complex", "struct", "union", "enum",
+    "__extension__", "__const", "__restrict", "__restrict__", "__volatile__", "__inline", "__inline__",
+}
+BASIC_TYPES = {"void", "char", "short", "int", "long", "float", "double", "signed", "unsigned", "_Bool", "bool",
+               "_Complex", "struct", "union", "enum"}
+# Flags que trazem macros de fora do arquivo, com o nome da macro no mesmo argumento ou no próximo
+MACRO_FLAGS = ("-D", "-U")
+# Flags que incluem um arquivo inteiro antes do analisado: as macros trazidas são desconhecidas
+INCLUDE_FLAGS = ("-include", "-imacros", "--include")
+# Os dois últimos tokens vistos no corpo de uma função: ((tipo, texto), (tipo, texto))
+NO_TOKENS = ((None, None), (None, None))
+
+# Símbolos do último conteúdo analisado de cada arquivo: caminho -> (texto, Symbols)
+_memo = {}
+
+class Symbols:
+    """
+    Símbolos de um arquivo. Cada tabela mapeia o nome para a lista de (linha inicial, linha final,
+    profundidade condicional); após Scanner.scan() a profundidade já desconta o include guard.
+    """
+    def __init__(self):
+        self.macros = {}
+        self.typedefs = {}
+        self.variables = {}
+        # Nomes que aparecem em declarações não compreendidas pelo localizador
+        self.uncertain = set()
+        # Nomes que parecem declarados dentro de funções (variáveis locais)
+        self.locals = set()
+        # Todos os identificadores do arquivo, inclusive nas diretivas
+        self.identifiers = set()
+
+    def table(self, extract_type: str) -> dict:
+        return {"macro": self.macros, "typedef": self.typedefs, "variable": self.variables}[extract_type]
+
+def end_line(token: tuple) -> int:
+    """Última linha de um token (strings podem continuar em outras linhas com '\\')."""
+    return token[2] + token[1].count("\n")
+
+def tokenize(text: str):
+    """Gera (tipo, texto, linha) de cada token; o tipo 'eol' marca o fim de uma linha lógica."""
+    line = 1
+    for match in TOKEN.finditer(text):
+        kind = match.lastgroup
+        value = match.group()
+        if kind == "newline":
+            yield "eol", value, line
+            line += 1
+            continue
+        if kind not in SKIPPED:
+            yield kind, value, line
+        line += value.count("\n")
+    yield "eol", "", line
+
+class Scanner:
+    """Percorre os tokens de um arquivo separando diretivas, declarações globais e corpos de funções."""
+    def __init__(self):
+        self.symbols = Symbols()
+        self.cond_depth = 0
+        # Diretivas condicionais e #define, em ordem: (tipo, argumento, profundidade)
+        self.events = []
+        self.first_code_line = None
+        # Declaração global em andamento: lista de (tipo, texto, linha, profundidade de chaves)
+        self.statement = []
+        self.statement_depth = 0
+        self.block_depth = 0
+        # Chaves de 'extern "C" {' abertas, que não iniciam um escopo
+        self.transparent = 0
+        # Profundidade de chaves dentro do corpo de uma função (0: fora de funções)
+        self.body_depth = 0
+        self.previous = NO_TOKENS
+
+    def scan(self, text: str) -> Symbols:
+        directive = None
+        at_line_start = True
+        identifiers = self.symbols.identifiers
+        for kind, value, line in tokenize(text):
+            if kind == "ident":
+                identifiers.add(value)
+            if kind == "eol":
+                if directive is not None:
+                    self.directive(directive)
+                    directive = None
+                at_line_start = True
+            elif directive is not None:
+                directive.append((kind, value, line))
+            elif at_line_start and value == "#":
+                directive = [(kind, value, line)]
+                at_line_start = False
+            else:
+                at_line_start = False
+                if self.first_code_line is None:
+                    self.first_code_line = line
+                self.token(kind, value, line)
+        self.apply_include_guard()
+        return self.symbols
+
+    def directive(self, tokens: list):
+        name = tokens[1][1] if len(tokens) > 1 else ""
+        argument = tokens[2][1] if len(tokens) > 2 else ""
+        if name in ("if", "ifdef", "ifndef", "elif", "else", "endif"):
+            if name in ("if", "ifdef", "ifndef"):
+                self.cond_depth += 1
+            self.events.append((name, argument, self.cond_depth, self.first_code_line is None))
+            if name == "endif":
+                self.cond_depth = max(0, self.cond_depth - 1)
+            if self.statement or self.block_depth or self.body_depth:
+                self.statement_depth = MIXED_DEPTH
+        elif name == "define" and len(tokens) > 2 and tokens[2][0] == "ident":
+            self.events.append((name, argument, self.cond_depth, self.first_code_line is None))
+            self.symbols.macros.setdefault(argument, []).append((tokens[2][2], end_line(tokens[-1]), self.cond_depth))
+
+    def token(self, kind: str, value: str, line: int):
+        if self.body_depth:
+            self.body_token(kind, value)
+            return
+        statement = self.statement
+        if not statement:
+            self.statement_depth = self.cond_depth
+        if value == "{" and self.block_depth == 0:
+            if [v for _, v, _, _ in statement] == ["extern", '"C"']:
+                statement.clear()
+                self.transparent += 1
+                return
+            if statement and statement[-1][1] == ")":
+                # Corpo de função: a declaração termina aqui
+                self.discard_statement()
+                self.body_depth = 1
+                self.previous = NO_TOKENS
+                return
+        if value == "}" and self.block_depth == 0:
+            if self.transparent:
+                self.transparent -= 1
+            self.discard_statement()
+            return
+        if value == ";" and self.block_depth == 0:
+            self.finish_statement()
+            return
+        if value == "}":
+            self.block_depth -= 1
+        statement.append((kind, value, line, self.block_depth))
+        if value == "{":
+            self.block_depth += 1
+
+    def body_token(self, kind: str, value: str):
+        """Tokens do corpo de uma função: somente registra os nomes que parecem variáveis locais."""
+        if value == "{":
+            self.body_depth += 1
+        elif value == "}":
+            self.body_depth -= 1
+        elif value in (";", "=", "[", ",", ")"):
+            (kind1, value1), (kind2, value2) = self.previous
+            if kind1 == "ident" and (value2 == "*" or (kind2 == "ident" and value2 not in NOT_DECLARATION)):
+                self.symbols.locals.add(value1)
+        self.previous = ((kind, value), self.previous[0])
+
+    def discard_statement(self):
+        """Declaração não compreendida: os seus nomes não são resolvidos pelo localizador."""
+        self.symbols.uncertain.update(v for k, v, _, _ in self.statement if k == "ident")
+        self.statement = []
+        self.block_depth = 0
+
+    def finish_statement(self):
+        statement = self.statement
+        if not statement:
+            return
+        found = declared_name(statement)
+        if found is None:
+            self.discard_statement()
+            return
+        name, preceding = found
+        if statement[0][1] == "typedef":
+            table = self.symbols.typedefs
+        elif preceding in TAG_KEYWORDS or defines_type(statement):
+            # Declaração de struct/union/enum, ou variável com o tipo definido na própria declaração
+            self.discard_statement()
+            return
+        else:
+            table = self.symbols.variables
+        table.setdefault(name, []).append((statement[0][2], end_line(statement[-1]), self.statement_depth))
+        self.statement = []
+
+    def apply_include_guard(self):
+        """
+        Um include guard (#ifndef G / #define G no início do arquivo, com o #endif correspondente
+        sem nenhum outro bloco condicional depois dele) não torna condicionais os símbolos internos.
+        """
+        events = self.events
+        guarded = (len(events) >= 3 and events[0][0] == "ifndef" and events[0][3]
+                   and events[1][:2] == ("define", events[0][1]) and events[1][3])
+        if guarded:
+            for index, (name, _, depth, _) in enumerate(events[1:], 1):
+                if depth == 1 and name in ("elif", "else"):
+                    guarded = False
+                    break
+                if depth == 1 and name == "endif":
+                    guarded = not any(e[0] in ("if", "ifdef", "ifndef") for e in events[index + 1:])
+                    break
+            else:
+                guarded = False
+        offset = 1 if guarded else 0
+        for table in (self.symbols.macros, self.symbols.typedefs, self.symbols.variables):
+            for entries in table.values():
+                entries[:] = [(start, end, max(0, depth - offset)) for start, end, depth in entries]
+
+def declared_name(statement: list):
+    """
+    Nome declarado por uma declaração global com um único declarador, e o token que o precede;
+    None quando a declaração tem mais de um declarador, parênteses fora de um ponteiro para
+    função (protótipos, atributos, chamadas de macro), mais de um nome de tipo (macros ou texto
+    que não é C) ou nenhum nome.
+    """
+    top = [(kind, value) for kind, value, _, depth in statement if depth == 0]
+    paren = 0
+    for _, value in top:
+        if value == "(":
+            paren += 1
+        elif value == ")":
+            paren -= 1
+        elif value == "=" and paren == 0:
+            break
+        elif value == "," and paren == 0:
+            return None
+    name_index = None
+    for index, (kind, value) in enumerate(top):
+        if value in ("=", "["):
+            break
+        if value == "(":
+            # Somente ponteiros para função: ( * NOME ) ( ... )
+            window = top[index:index + 5]
+            if not (len(window) == 5 and window[1][1] == "*" and window[2][0] == "ident" and window[3][1] == ")"
+                    and window[4][1] in ("(", "[")):
+                return None
+            name_index = index + 2
+            break
+        if kind == "ident":
+            name_index = index
+    if not name_index:
+        return None
+    # Os especificadores têm no máximo um nome de tipo, que não se combina com os tipos básicos;
+    # qualquer outro identificador seria uma macro (ou texto que não é C)
+    specifiers = [value for _, value in top[:name_index]]
+    type_names = [value for i, (kind, value) in enumerate(top[:name_index])
+                  if kind == "ident" and value not in SPECIFIER_KEYWORDS
+                  and (i == 0 or top[i - 1][1] not in TAG_KEYWORDS)]
+    if len(type_names) > 1 or (type_names and not BASIC_TYPES.isdisjoint(specifiers)):
+        return None
+    return top[name_index][1], top[name_index - 1][1]
+
+def defines_type(statement: list) -> bool:
+    """A declaração define uma struct/union/enum antes do inicializador (ex.: struct { ... } cfg;)."""
+    for _, value, _, depth in statement:
+        if value == "=" and depth == 0:
+            return False
+        if value == "{":
+            return True
+    return False
+
+def file_symbols(path: str) -> Symbols:
+    """Símbolos do conteúdo atual do arquivo (analisado novamente somente se o conteúdo mudou)."""
+    with open(path, "rb") as f:
+        text = f.read().decode("latin-1")
+    memo = _memo.get(path)
+    if memo is not None and memo[0] == text:
+        return memo[1]
+    symbols = Scanner().scan(text)
+    _memo[path] = (text, symbols)
+    return symbols
+
+def command_line_macros(flags: list):
+    """
+    Nomes das macros definidas ou removidas por 'flags' (-DNOME=valor, -D NOME, -UNOME...),
+    ou None quando as flags incluem arquivos cujas macros não são conhecidas (-include, -imacros).
+    """
+    names = set()
+    pending = False
+    for flag in flags:
+        if pending:
+            names.add(flag.split("=", 1)[0])
+            pending = False
+        elif flag in MACRO_FLAGS:
+            pending = True
+        elif flag.startswith(MACRO_FLAGS):
+            names.add(flag[2:].split("=", 1)[0])
+        elif flag.startswith(INCLUDE_FLAGS):
+            return None
+    return names
+
+def locate(extract_type: str, name: str, path: str, flags: list = ()):
+    """
+    (linha inicial, linha final) do símbolo, ou None quando a resposta deve vir do clang.
+    'flags' são os argumentos de compilação passados ao extractor.
+    """
+    if extract_type not in LEXICAL_TYPES:
+        return None
+    macros = command_line_macros(flags)
+    if macros is None:
+        return None
+    try:
+        symbols = file_symbols(path)
+    except OSError:
+        return None
+    # Uma macro da linha de comando usada no arquivo pode mudar o que o clang enxerga
+    if not macros.isdisjoint(symbols.identifiers):
+        return None
+    entries = symbols.table(extract_type).get(name, [])
+    if len(entries) != 1 or entries[0][2] != 0:
+        return None
+    if extract_type != "macro" and (name in symbols.uncertain or name in symbols.locals
+                                    or name in symbols.macros):
+        return None
+    return entries[0][:2]
+
+def get_mode() -> str:
+    """"lexicalLocator" no config.json: true (padrão), false ou "verify"."""
+    import runtime
+    mode = runtime.USER_CONFIGS.get("lexicalLocator", True)
+    if mode is True:
+        return "on"
+    if mode is False:
+        return "off"
+    if mode == "verify":
+        return mode
+    sys.exit(f"fatal: invalid 'lexicalLocator' in .mockshadow/config.json: {mode}")
+
+def resolve(args: list):
+    """
+    Resultado de uma chamada ao extractor (args: os mesmos do extract.py) obtido sem o clang:
+    (0, "<início>;<fim>"), ou None quando a chamada deve ir para o extractor.
+    """
+    if len(args) < 4 or args[0] not in LEXICAL_TYPES or args[3] != "lines":
+        return None
+    location = locate(args[0], args[1], args[2], args[4:])
+    if location is None:
+        return None
+    return 0, f"{location[0]};{location[1]}\n"
+
+def verify(args: list, lexical: tuple, clang: tuple):
+    """Modo "verify": exibe as diferenças entre o localizador e o extractor."""
+    if clang[0] != 0 or clang[1].strip() != lexical[1].strip():
+        result = clang[1].strip() if clang[0] == 0 else f"error {clang[0]}"
+        print(f"Warning: lexical locator mismatch for {args[0]} '{args[1]}' in {args[2]}: "
+              f"lexical {lexical[1].strip()}, extractor {result}")
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+#  Cache incremental dos arquivos de mock gerados.
+#
+#  Cada arquivo gerado em MOCK_TREE é registrado em .mockshadow/cache/mock_manifest.json
+#  com uma chave calculada a partir do conteúdo do arquivo __mock__, do conteúdo do arquivo
+#  original, das flags do extractor e das versões do mockshadow e do gerador. Enquanto a chave não mudar,
+#  o arquivo não é gerado novamente. Uma cópia de cada arquivo gerado fica guardada em
+#  .mockshadow/cache/outputs, permitindo restaurá-lo após um 'remock' sem chamar o extractor.
+#
+#  Cada entrada também registra os headers incluídos pelos parses do extractor usados na
+#  geração do arquivo, com o hash de cada um: a alteração de qualquer um deles invalida a entrada.
+
+import hashlib
+import json
+import os
+import shutil
+import tracing
+
+MANIFEST_VERSION = 2
+
+def get_cache_dir() -> str:
+    import runtime
+    return os.path.join(runtime.DIR_MOCK_SHADOW_PROJECT, ".mockshadow", "cache")
+
+def get_manifest_path() -> str:
+    return os.path.join(get_cache_dir(), "mock_manifest.json")
+
+def get_outputs_dir() -> str:
+    return os.path.join(get_cache_dir(), "outputs")
+
+def file_digest(path: str) -> str:
+    """Hash SHA-256 do conteúdo de um arquivo."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def include_digest(path: str):
+    """Hash de um header incluído, ou None se ele não existir mais."""
+    try:
+        return file_digest(path)
+    except OSError:
+        return None
+
+def includes_changed(entry: dict, digest_of) -> bool:
+    """
+    Verifica se algum header incluído na geração de 'entry' mudou.
+    'digest_of(caminho, hash registrado)' retorna o hash atual do header.
+    """
+    includes = entry.get("includes") or {}
+    return any(digest_of(path, digest) != digest for path, digest in includes.items())
+
+def dependent_entries(entries: dict, paths: set) -> set:
+    """Entradas (caminhos relativos) cuja geração incluiu algum dos arquivos 'paths' (absolutos)."""
+    return {rel_path for rel_path, entry in entries.items()
+            if not paths.isdisjoint(entry.get("includes") or ())}
+
+def mock_cache_key(rel_path: str, mock_file: str, original_file: str, original_digest: str = None,
+                   mock_digest: str = None) -> tuple:
+    """
+    Chave de cache de um arquivo de mock. Muda quando qualquer entrada que influencia
+    o resultado muda: conteúdo do __mock__, conteúdo do original, flags do extractor,
+    modo de resolução das diretivas e versões do mockshadow e do gerador
+    (mock_utils.GENERATOR_VERSION).
+    'original_digest' pode ser informado quando já se sabe que o original não mudou
+    e 'mock_digest' quando o hash do __mock__ já foi calculado.
+    Retorna (chave, hash do arquivo original).
+    """
+    import mock_utils
+    if original_digest is None:
+        original_digest = file_digest(original_file)
+    if mock_digest is None:
+        mock_digest = file_digest(mock_file)
+    h = hashlib.sha256()
+    for part in (mock_utils.MOCKSHADOW_VERSION,
+                 str(mock_utils.GENERATOR_VERSION),
+                 rel_path.replace("\\", "/"),
+                 mock_utils.mount_extractor_extra_args(""),
+                 mock_utils.get_directive_resolution(),
+                 mock_digest,
+                 original_digest):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest(), original_digest
+
+def load_manifest() -> tuple:
+    """
+    Lê o manifesto do cache e retorna (entradas, estado do git do projeto original no último mock).
+    Um manifesto ausente, inválido ou de outra versão é ignorado.
+    """
+    try:
+        with open(get_manifest_path(), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}, None
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return {}, None
+    return manifest.get("entries", {}), manifest.get("git")
+
+def save_manifest(entries: dict, git_state: dict = None):
+    """Grava o manifesto (de forma atômica) e remove do cache as saídas não referenciadas."""
+    os.makedirs(get_cache_dir(), exist_ok=True)
+    manifest_path = get_manifest_path()
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": MANIFEST_VERSION, "git": git_state, "entries": entries}, f, indent=4, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+    outputs_dir = get_outputs_dir()
+    if os.path.isdir(outputs_dir):
+        referenced = {entry["key"] for entry in entries.values()}
+        for name in os.listdir(outputs_dir):
+            if name not in referenced:
+                os.remove(os.path.join(outputs_dir, name))
+
+def is_up_to_date(entries: dict, rel_path: str, key: str, mock_file_to_create: str) -> bool:
+    """
+    Verifica se o arquivo de mock gerado corresponde à chave atual.
+    Se o arquivo não existir mais (por exemplo, após 'remock') ou tiver sido alterado,
+    ele é restaurado a partir da cópia guardada no cache.
+    """
+    entry = entries.get(rel_path)
+    if entry is None or entry.get("key") != key:
+        return False
+
+    if os.path.isfile(mock_file_to_create) and file_digest(mock_file_to_create) == entry.get("digest"):
+        return True
+
+    cached_output = os.path.join(get_outputs_dir(), key)
+    if not os.path.isfile(cached_output):
+        return False
+    os.makedirs(os.path.dirname(mock_file_to_create), exist_ok=True)
+    with tracing.span("restore from cache", tracing.CATEGORY_WRITE, file=mock_file_to_create):
+        shutil.copyfile(cached_output, mock_file_to_create)
+    return True
+
+def store_output(entries: dict, rel_path: str, key: str, mock_file_to_create: str, original_digest: str = None,
+                 includes: dict = None):
+    """
+    Registra um arquivo de mock recém-gerado no manifesto e guarda uma cópia no cache.
+    'includes' mapeia os headers incluídos na geração para os seus hashes (None: desconhecidos).
+    """
+    os.makedirs(get_outputs_dir(), exist_ok=True)
+    with tracing.span("store in cache", tracing.CATEGORY_WRITE, file=mock_file_to_create):
+        shutil.copyfile(mock_file_to_create, os.path.join(get_outputs_dir(), key))
+    entries[rel_path] = {"key": key, "digest": file_digest(mock_file_to_create), "original": original_digest,
+                         "includes": includes}
+
+def directory_usage(path: str) -> tuple:
+    """(quantidade de arquivos, bytes) de um diretório."""
+    files = size = 0
+    for root, dirs, names in os.walk(path):
+        for name in names:
+            try:
+                size += os.path.getsize(os.path.join(root, name))
+                files += 1
+            except OSError:
+                pass
+    return files, size
+
+def print_cache_stats():
+    """'mockshadow cache stats': uso de cada parte de .mockshadow/cache."""
+    import extractor_cache
+    import mock_ir
+    cache_dir = get_cache_dir()
+    if not os.path.isdir(cache_dir):
+        print("Cache is empty")
+        return
+    mb = 1024 * 1024
+    stats = extractor_cache.stats()
+    if stats is None:
+        print("Extractor results:   empty")
+    else:
+        lookups = stats["hits"] + stats["misses"]
+        ratio = f", {stats['hits'] / lookups * 100:.1f}% hit rate" if lookups else ""
+        print(f"Extractor results:   {stats['entries']} entries, {stats['bytes'] / mb:.2f} MB of "
+              f"{stats['max_bytes'] / mb:.0f} MB ({stats['file_bytes'] / mb:.2f} MB on disk)")
+        print(f"                     {stats['hits']} hits, {stats['misses']} misses{ratio}, "
+              f"{stats['evictions']} evicted")
+    entries, _ = load_manifest()
+    files, size = directory_usage(get_outputs_dir())
+    print(f"Generated mocks:     {len(entries)} entries, {files} stored outputs ({size / mb:.2f} MB)")
+    files, size = directory_usage(mock_ir.get_ir_cache_dir())
+    print(f"Parsed __mock__ IR:  {files} files ({size / mb:.2f} MB)")
+    index_path = os.path.join(cache_dir, "symbol_index.sqlite")
+    if os.path.isfile(index_path):
+        print(f"Symbol index:        {os.path.getsize(index_path) / mb:.2f} MB")
+    files, size = directory_usage(os.path.join(cache_dir, "pch"))
+    print(f"Precompiled headers: {files} files ({size / mb:.2f} MB)")
+    files, size = directory_usage(cache_dir)
+    print(f"Total:               {files} files, {size / mb:.2f} MB in {os.path.relpath(cache_dir)}")
+
+def clear_cache():
+    """'mockshadow cache clear': remove .mockshadow/cache (a próxima execução de 'mock' é completa)."""
+    import extractor_cache
+    extractor_cache.close()
+    cache_dir = get_cache_dir()
+    if os.path.isdir(cache_dir):
+        shutil.rmtree(cache_dir)
+    print(f"Removed {os.path.relpath(cache_dir)}")
@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+#  Documento usado para gerar um arquivo de mock.
+#
+#  Todas as passadas (replace text, remove, replace code, top/bottom, add before/after)
+#  editam o mesmo documento. Como o extractor lê o arquivo do disco, o documento é gravado
+#  antes de cada consulta em que ele tenha mudado: no modo "batch" isso acontece no máximo uma
+#  vez (após as substituições de texto) antes da escrita final; no modo "sequential", uma vez
+#  por diretiva resolvida após uma edição. Toda escrita é atômica (arquivo temporário + os.replace).
+#
+#  O conteúdo é uma lista de trechos ("piece table"): intervalos de bytes do arquivo original
+#  e dos textos inseridos pelas edições. O arquivo original nunca é decodificado nem editado:
+#  arquivos grandes (headers de registradores gerados a partir de SVD, por exemplo) são
+#  mapeados com mmap, e os trechos não editados são copiados direto entre os arquivos na
+#  escrita (os.copy_file_range/os.sendfile, quando disponíveis). A memória usada depende do
+#  tamanho das edições, não do arquivo. As posições das linhas vêm de um índice das quebras
+#  de linha de cada buffer, calculado uma única vez.
+
+import array
+import bisect
+import mmap
+import os
+import re
+import shutil
+import sys
+import tracing
+
+ENCODING = "latin-1"
+# Arquivos a partir deste tamanho são mapeados com mmap em vez de lidos para a memória
+MMAP_THRESHOLD = 1024 * 1024
+# Tamanho aproximado dos blocos (sempre com linhas inteiras) percorridos em buscas e substituições de texto
+CHUNK_SIZE = 1024 * 1024
+# Tamanho de cada leitura de um trecho quando a cópia direta entre arquivos não está disponível
+COPY_SIZE = 1024 * 1024
+
+NEWLINE = re.compile(b"\n")
+# Linha que começa com "#define", desconsiderando os espaços iniciais (como em str.lstrip())
+RE_DEFINE_LINE = re.compile(rb"^[ \t\r\f\v\x1c-\x1f\x85\xa0]*#define", re.MULTILINE)
+RE_ENDIF = re.compile(rb"#endif")
+
+def clamp_index(index: int, count: int) -> int:
+    """Normaliza um índice de linha como no fatiamento de listas (índices negativos contam do fim)."""
+    if index < 0:
+        index += count
+    return min(max(index, 0), count)
+
+def split_lines(text: str) -> list:
+    """Divide o texto como readlines(): somente em '\n', que fica no final de cada linha."""
+    lines = text.split("\n")
+    result = [line + "\n" for line in lines[:-1]]
+    if lines[-1]:
+        result.append(lines[-1])
+    return result
+
+class Buffer:
+    """Bytes de onde os trechos do documento são lidos (bytes ou mmap), com o índice das quebras de linha."""
+    def __init__(self, data, file=None):
+        self.data = data
+        # Arquivo mapeado em 'data' (usado nas cópias diretas entre arquivos), ou None
+        self.file = file
+        self._newlines = None
+
+    @property
+    def newlines(self) -> array.array:
+        """Posições de todos os '\n' do buffer, em ordem."""
+        if self._newlines is None:
+            positions = array.array("q")
+            positions.extend(match.start() for match in NEWLINE.finditer(self.data))
+            self._newlines = positions
+        return self._newlines
+
+    def count_newlines(self, start: int, end: int) -> int:
+        newlines = self.newlines
+        return bisect.bisect_left(newlines, end) - bisect.bisect_left(newlines, start)
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        if self.file is not None:
+            self.file.close()
+
+def payload(data: bytes) -> list:
+    """Trechos de um texto inserido por uma edição."""
+    return [(Buffer(data), 0, len(data))] if data else []
+
+def piece_starts(pieces: list) -> list:
+    """Posição de início de cada trecho, mais um item final com o tamanho total."""
+    starts = [0]
+    for _, start, end in pieces:
+        starts.append(starts[-1] + end - start)
+    return starts
+
+def slice_pieces(pieces: list, starts: list, start: int, end: int) -> list:
+    """Trechos que formam o intervalo [start, end) do conteúdo descrito por 'pieces'."""
+    result = []
+    if start >= end:
+        return result
+    index = bisect.bisect_right(starts, start) - 1
+    while start < end:
+        buffer, piece_start, piece_end = pieces[index]
+        offset = piece_start + start - starts[index]
+        stop = min(piece_end, piece_start + end - starts[index])
+        result.append((buffer, offset, stop))
+        start += stop - offset
+        index += 1
+    return result
+
+def direct_copy(src_fd: int, dst_fd: int, offset: int, count: int) -> int:
+    """
+    Copia até 'count' bytes de src_fd (a partir de 'offset') para a posição atual de dst_fd sem
+    passar pela memória do processo. Retorna quantos bytes foram copiados (0: cópia indisponível).
+    """
+    if hasattr(os, "copy_file_range"):
+        try:
+            return os.copy_file_range(src_fd, dst_fd, count, offset)
+        except OSError:
+            pass
+    if sys.platform.startswith("linux"):
+        try:
+            return os.sendfile(dst_fd, src_fd, offset, count)
+        except OSError:
+            pass
+    return 0
+
+def write_piece(f, buffer: Buffer, start: int, end: int):
+    """Escreve o trecho [start, end) de 'buffer' no arquivo binário não bufferizado 'f'."""
+    if buffer.file is not None:
+        while start < end:
+            copied = direct_copy(buffer.file.fileno(), f.fileno(), start, end - start)
+            if copied <= 0:
+                break
+            start += copied
+    while start < end:
+        stop = min(end, start + COPY_SIZE)
+        data = buffer.data[start:stop]
+        while data:
+            data = data[f.write(data):]
+        start = stop
+
+def suffix_is_prefix(a: bytes, b: bytes) -> bool:
+    """Algum sufixo próprio e não vazio de 'a' é prefixo de 'b'."""
+    i = a.find(b[:1], 1) if b else -1
+    while i != -1:
+        if b.startswith(a[i:]):
+            return True
+        i = a.find(b[:1], i + 1)
+    return False
+
+def can_overlap(a: bytes, b: bytes) -> bool:
+    """Ocorrências de 'a' e 'b' podem se sobrepor em algum texto."""
+    return a in b or b in a or suffix_is_prefix(a, b) or suffix_is_prefix(b, a)
+
+def can_create(new: bytes, old: bytes) -> bool:
+    """
+    Uma ocorrência de 'old' pode usar caracteres do texto 'new' inserido por uma substituição.
+    Um texto vazio pode juntar o que estava antes e depois dele, portanto sempre pode.
+    """
+    return not new or can_overlap(new, old)
+
+def creates_matches(data: bytes, replacements: list, sites: list) -> bool:
+    """
+    Verifica se o texto inserido em algum ponto 'sites' = [(índice da substituição, início, fim
+    da ocorrência em 'data')] forma, com o texto ao redor, uma ocorrência do texto procurado por
+    uma substituição posterior. Pontos vizinhos demais para essa verificação também contam.
+    """
+    olds = [old for old, _ in replacements]
+    later = [[k for k in range(j + 1, len(replacements)) if can_create(new, olds[k])]
+             for j, (_, new) in enumerate(replacements)]
+    if not any(later):
+        return False
+    reach = max(len(old) for old in olds)
+    for index, (j, start, end) in enumerate(sites):
+        if not later[j]:
+            continue
+        if (index > 0 and sites[index - 1][2] > start - reach) or \
+           (index + 1 < len(sites) and sites[index + 1][1] < end + reach):
+            return True
+        new = replacements[j][1]
+        for k in later[j]:
+            old = olds[k]
+            left = data[max(0, start - len(old) + 1):start]
+            window = left + new + data[end:end + len(old) - 1]
+            first, last = len(left), len(left) + len(new)
+            position = window.find(old)
+            while position != -1:
+                if (position < last and position + len(old) > first) if new else (position < first < position + len(old)):
+                    return True
+                position = window.find(old, position + 1)
+    return False
+
+def replace_all(data: bytes, replacements: list):
+    """
+    Passada única das substituições (antigo, novo) sobre 'data'. Retorna (segmentos, ocorrências
+    de cada uma), onde cada segmento do resultado é um intervalo (início, fim) de 'data' ou um texto
+    inserido; ou None quando o resultado poderia ser diferente do obtido aplicando-as em sequência:
+    textos procurados que podem se sobrepor, ou um texto inserido que forma outra ocorrência.
+    """
+    olds = [old for old, _ in replacements]
+    if not olds or not all(olds):
+        return None
+    for j in range(len(olds)):
+        for k in range(j + 1, len(olds)):
+            if can_overlap(olds[j], olds[k]):
+                return None
+    index = {old: i for i, old in enumerate(olds)}
+    pattern = re.compile(b"|".join(re.escape(old) for old in olds))
+    counts = [0] * len(olds)
+    segments = []
+    sites = []
+    position = 0
+    for match in pattern.finditer(data):
+        i = index[match.group()]
+        segments.append((position, match.start()))
+        segments.append(replacements[i][1])
+        sites.append((i, match.start(), match.end()))
+        position = match.end()
+        counts[i] += 1
+    segments.append((position, len(data)))
+    if creates_matches(data, replacements, sites):
+        return None
+    return segments, counts
+
+def replace_sequentially(data: bytes, replacements: list) -> tuple:
+    """Aplica as substituições uma após a outra; retorna (resultado, ocorrências de cada uma)."""
+    counts = []
+    for old, new in replacements:
+        count = data.count(old)
+        counts.append(count)
+        if count:
+            data = data.replace(old, new)
+    return data, counts
+
+class MockDocument:
+    """
+    Conteúdo do arquivo de mock 'path', carregado de 'source'.
+    As linhas seguem a mesma convenção de readlines(): cada linha inclui o seu '\n',
+    exceto possivelmente a última. Os textos são convertidos com ENCODING somente nas
+    bordas (conteúdo inserido, linhas lidas com get_lines()).
+    """
+    def __init__(self, path: str, data: bytes = b"", source: str = None, buffer: Buffer = None):
+        self.path = path
+        self.source = source
+        self._source_buffer = buffer or Buffer(data)
+        self._pieces = [(self._source_buffer, 0, len(self._source_buffer.data))]
+        self._pieces = [piece for piece in self._pieces if piece[2] > piece[1]]
+        self._index = None
+        # Enquanto não houver edições, o arquivo é gerado como cópia byte a byte de 'source'
+        self.modified = False
+        self._version = 0
+        self._disk_version = None
+
+    @classmethod
+    def from_file(cls, source: str, path: str) -> "MockDocument":
+        f = open(source, "rb")
+        try:
+            size = os.fstat(f.fileno()).st_size
+            # Um arquivo vazio não pode ser mapeado
+            if size == 0 or size < MMAP_THRESHOLD:
+                with f:
+                    return cls(path, f.read(), source)
+            return cls(path, source=source, buffer=Buffer(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), f))
+        except BaseException:
+            f.close()
+            raise
+
+    def close(self):
+        """Libera o arquivo original (mmap). O documento não pode mais ser usado."""
+        self._source_buffer.close()
+        self._pieces = []
+        self._index = None
+
+    def __enter__(self) -> "MockDocument":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _piece_index(self) -> tuple:
+        """(início de cada trecho, quantidade de '\n' antes de cada trecho), com um item final para os totais."""
+        if self._index is None:
+            newlines = [0]
+            for buffer, start, end in self._pieces:
+                newlines.append(newlines[-1] + buffer.count_newlines(start, end))
+            self._index = (piece_starts(self._pieces), newlines)
+        return self._index
+
+    def size(self) -> int:
+        return self._piece_index()[0][-1]
+
+    def line_count(self) -> int:
+        starts, newlines = self._piece_index()
+        count = newlines[-1]
+        if self._pieces:
+            buffer, _, end = self._pieces[-1]
+            if buffer.data[end - 1:end] != b"\n":
+                count += 1
+        return count
+
+    def _line_start(self, line: int) -> int:
+        """Posição do início da linha de índice 'line' (0 <= line <= line_count(); o fim do conteúdo no limite)."""
+        starts, newlines = self._piece_index()
+        if line <= 0:
+            return 0
+        if line > newlines[-1]:
+            return starts[-1]
+        # Trecho que contém a line-ésima quebra de linha
+        index = bisect.bisect_left(newlines, line) - 1
+        buffer, start, _ = self._pieces[index]
+        position = buffer.newlines[bisect.bisect_left(buffer.newlines, start) + line - newlines[index] - 1]
+        return starts[index] + position - start + 1
+
+    def _newlines_before(self, position: int) -> int:
+        starts, newlines = self._piece_index()
+        if position >= starts[-1]:
+            return newlines[-1]
+        index = bisect.bisect_right(starts, position) - 1
+        buffer, start, _ = self._pieces[index]
+        return newlines[index] + buffer.count_newlines(start, start + position - starts[index])
+
+    def _slice(self, start: int, end: int) -> list:
+        return slice_pieces(self._pieces, self._piece_index()[0], start, end)
+
+    def _read(self, start: int, end: int) -> bytes:
+        return b"".join(buffer.data[a:b] for buffer, a, b in self._slice(start, end))
+
+    def _chunks(self):
+        """Gera (índice da primeira linha, trechos, bytes) de blocos de linhas inteiras com cerca de CHUNK_SIZE bytes."""
+        size = self.size()
+        position = 0
+        while position < size:
+            end = min(position + CHUNK_SIZE, size)
+            line = self._newlines_before(end)
+            if end < size and self._line_start(line) != end:
+                end = self._line_start(line + 1)
+            pieces = self._slice(position, end)
+            yield self._newlines_before(position), pieces, b"".join(buffer.data[a:b] for buffer, a, b in pieces)
+            position = end
+
+    def _set_pieces(self, pieces: list):
+        merged = []
+        for piece in pieces:
+            if piece[2] <= piece[1]:
+                continue
+            if merged and merged[-1][0] is piece[0] and merged[-1][2] == piece[1]:
+                merged[-1] = (piece[0], merged[-1][1], piece[2])
+            else:
+                merged.append(piece)
+        self._pieces = merged
+        self._index = None
+        self.modified = True
+        self._version += 1
+
+    def get_lines(self, start: int = 0, end: int = None) -> list:
+        """Linhas de índice 'start' até 'end' (exclusivo), a partir de 0."""
+        count = self.line_count()
+        end = count if end is None else clamp_index(end, count)
+        start = min(clamp_index(start, count), end)
+        return split_lines(self._read(self._line_start(start), self._line_start(end)).decode(ENCODING))
+
+    def find_line(self, pattern: re.Pattern, last: bool = False):
+        """Índice (a partir de 0) da primeira (ou última) linha onde 'pattern' (bytes) ocorre, ou None."""
+        found = None
+        for first_line, _, data in self._chunks():
+            matches = pattern.finditer(data) if last else [pattern.search(data)]
+            for match in matches:
+                if match is not None:
+                    found = first_line + data.count(b"\n", 0, match.start())
+            if found is not None and not last:
+                break
+        return found
+
+    def first_define_line(self):
+        """Índice da primeira linha que começa com "#define", ou None."""
+        return self.find_line(RE_DEFINE_LINE)
+
+    def last_endif_line(self):
+        """Índice da última linha que contém "#endif", ou None."""
+        return self.find_line(RE_ENDIF, last=True)
+
+    def replace_lines(self, start: int, end: int, new_lines: list):
+        """Substitui as linhas 'start' até 'end' (exclusivo, a partir de 0) por 'new_lines'."""
+        self.apply_line_edits([(start, end, new_lines)])
+
+    def insert_lines(self, index: int, new_lines: list):
+        """Insere 'new_lines' antes da linha 'index' (a partir de 0)."""
+        self.apply_line_edits([(index, index, new_lines)])
+
+    def apply_line_edits(self, edits: list):
+        """
+        Aplica de uma só vez edições (start, end, new_lines) que não se sobrepõem, com posições
+        relativas ao conteúdo atual. O resultado é o mesmo de aplicá-las de baixo para cima
+        com lines[start:end] = new_lines; somente o texto inserido é copiado para a memória.
+        """
+        if not edits:
+            return
+        count = self.line_count()
+        ranges = []
+        for start, end, new_lines in edits:
+            start = clamp_index(start, count)
+            ranges.append((start, max(start, clamp_index(end, count)), new_lines))
+        pieces = []
+        position = 0
+        for start, end, new_lines in sorted(ranges, key=lambda e: (e[0], e[1])):
+            pieces += self._slice(position, self._line_start(start))
+            pieces += payload("".join(new_lines).encode(ENCODING))
+            position = self._line_start(end)
+        pieces += self._slice(position, self.size())
+        self._set_pieces(pieces)
+
+    def replace_text(self, old: str, new: str) -> int:
+        """Substitui todas as ocorrências de 'old' por 'new' e retorna quantas foram substituídas."""
+        return self.replace_texts([(old, new)])[0]
+
+    def replace_texts(self, replacements: list) -> list:
+        """
+        Aplica as substituições (antigo, novo), na ordem, com o mesmo resultado de aplicá-las
+        uma após a outra, e retorna quantas ocorrências cada uma substituiu.
+        O conteúdo é percorrido em blocos de linhas inteiras: um texto procurado sem quebra de
+        linha nunca atravessa dois blocos. Em cada bloco, quando nenhuma substituição pode afetar
+        as outras, todas são feitas em uma única passada; caso contrário, uma após a outra.
+        """
+        replacements = [(old.encode(ENCODING), new.encode(ENCODING)) for old, new in replacements]
+        if any(b"\n" in old for old, _ in replacements):
+            # Um texto procurado com quebra de linha pode atravessar blocos: o conteúdo é lido inteiro
+            chunks = [(0, self._pieces, self._read(0, self.size()))]
+        else:
+            chunks = self._chunks()
+        counts = [0] * len(replacements)
+        pieces = []
+        changed = False
+        for _, chunk_pieces, data in chunks:
+            result = replace_all(data, replacements)
+            if result is None:
+                data, chunk_counts = replace_sequentially(data, replacements)
+                segments = [data]
+            else:
+                segments, chunk_counts = result
+            if not any(chunk_counts):
+                pieces += chunk_pieces
+                continue
+            changed = True
+            counts = [total + count for total, count in zip(counts, chunk_counts)]
+            starts = piece_starts(chunk_pieces)
+            for segment in segments:
+                if isinstance(segment, tuple):
+                    pieces += slice_pieces(chunk_pieces, starts, *segment)
+                else:
+                    pieces += payload(segment)
+        if changed:
+            self._set_pieces(pieces)
+        return counts
+
+    def _write(self):
+        """Grava o conteúdo atual em 'path' de forma atômica (arquivo temporário + rename)."""
+        tmp_path = self.path + ".tmp"
+        with tracing.span("write", tracing.CATEGORY_WRITE, file=self.path):
+            try:
+                if not self.modified and self.source is not None:
+                    shutil.copy2(self.source, tmp_path)
+                else:
+                    with open(tmp_path, "wb", buffering=0) as f:
+                        for buffer, start, end in self._pieces:
+                            write_piece(f, buffer, start, end)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        self._disk_version = self._version
+
+    def materialize(self):
+        """
+        Garante que 'path' contenha o conteúdo atual, para ferramentas que leem o arquivo do
+        disco (o extractor). Não escreve nada se o arquivo já estiver atualizado.
+        """
+        if self._disk_version != self._version:
+            self._write()
+
+    def save(self):
+        """Escrita final do arquivo de mock."""
+        self.materialize()
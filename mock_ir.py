@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+#  Representação intermediária (IR) das diretivas de um arquivo __mock__.
+#
+#  O arquivo __mock__ é lido e analisado uma única vez, produzindo a lista de diretivas
+#  (com o conteúdo a inserir e as linhas de origem) consumida por todas as passadas de
+#  mock_utils. Os erros de sintaxe (instruções aninhadas, blocos sem marcador de fim, ...)
+#  são todos detectados aqui, antes de qualquer edição no arquivo de mock.
+#
+#  A IR fica em cache em .mockshadow/cache/ir/<sha256 do __mock__>.v<MOCK_IR_VERSION>.json,
+#  de forma que um __mock__ sem alterações nunca é analisado novamente. MOCK_IR_VERSION deve ser
+#  incrementada sempre que o analisador passar a produzir uma IR diferente para o mesmo arquivo.
+
+import collections
+import hashlib
+import json
+import os
+import re
+import sys
+import mock_cache
+import tracing
+
+MOCK_IR_VERSION = 1
+ENCODING = "latin-1"
+
+# Tipos de diretiva
+REPLACE_TEXT = "REPLACE_TEXT"   # __MOCK_REPLACE_TEXT_(START|LINE)
+REMOVE = "REMOVE"               # __MOCK_REMOVE
+REPLACE_CODE = "REPLACE_CODE"   # __MOCK_REPLACE_CODE_(START|LINE)
+TOP_BOTTOM = "TOP_BOTTOM"       # //__MOCK_TOP_START, //__MOCK_BOTTOM_START
+ADD = "ADD"                     # __MOCK_ADD_(BEFORE|AFTER)_(START|LINE)
+
+# Diretiva extraída de um arquivo __mock__.
+#   kind:       tipo da diretiva (ver acima)
+#   line:       linha (a partir de 1) do marcador inicial no arquivo __mock__
+#   end_line:   linha em que a diretiva termina (marcador de fim ou linha de conteúdo)
+#   cmd:        texto da linha do marcador inicial
+#   mode:       "START" ou "LINE" (REPLACE_TEXT, REPLACE_CODE, ADD)
+#   position:   "TOP"/"BOTTOM" (TOP_BOTTOM) ou "BEFORE"/"AFTER" (ADD)
+#   extract_type, extract_name, extra_args: símbolo a ser localizado pelo extractor
+#               (extra_args como escrito no __mock__, antes de mount_extractor_extra_args())
+#   content:    tupla das linhas que entram no arquivo de mock, todas terminadas em '\n'
+#   old_text, new_text: texto procurado e o texto que o substitui (REPLACE_TEXT)
+MockDirective = collections.namedtuple(
+    "MockDirective",
+    "kind line end_line cmd mode position extract_type extract_name extra_args content old_text new_text",
+    defaults=("", "", "", "", "", (), "", ""))
+
+RE_REPLACE_TEXT = re.compile(r"__MOCK_REPLACE_TEXT_(START|LINE): \s*(.*)")
+RE_REMOVE = re.compile(r"__MOCK_REMOVE:\s+(\S+)\s+(\S+)(\s+.*)?")
+RE_REPLACE_CODE = re.compile(r"__MOCK_REPLACE_CODE_(START|LINE):\s+(\S+)\s+(\S+)(\s+.*)?")
+RE_TOP_BOTTOM_START = re.compile(r"^//__MOCK_(TOP|BOTTOM)_START$")
+RE_TOP_BOTTOM_END = re.compile(r"^//__MOCK_(TOP|BOTTOM)_END$")
+RE_ADD_BLOCK = re.compile(r"__MOCK_ADD_(BEFORE|AFTER)_START:\s+(\S+)\s+(\S+)(\s+.*)?")
+RE_ADD_LINE = re.compile(r"__MOCK_ADD_(BEFORE|AFTER)_LINE:\s+(\S+)\s+(\S+)(\s+.*)?")
+
+class MockIR:
+    """
+    Diretivas de um arquivo __mock__, na ordem em que aparecem.
+    Só arquivos no modo "copy" têm diretivas; nos demais a lista é vazia.
+    """
+    def __init__(self, mock_file: str, mock_mode: str, directives: list):
+        self.mock_file = mock_file
+        self.mock_mode = mock_mode
+        self.directives = directives
+
+    def of_kind(self, kind: str) -> list:
+        return [d for d in self.directives if d.kind == kind]
+
+    def to_json(self) -> dict:
+        return {"version": MOCK_IR_VERSION,
+                "mock_mode": self.mock_mode,
+                "directives": [list(d) for d in self.directives]}
+
+    @classmethod
+    def from_json(cls, mock_file: str, data: dict) -> "MockIR":
+        directives = [MockDirective(*d) for d in data["directives"]]
+        # O JSON não distingue listas de tuplas
+        return cls(mock_file, data["mock_mode"], [d._replace(content=tuple(d.content)) for d in directives])
+
+def mock_mode_of(first_line: str) -> str:
+    """Modo de mock definido pela primeira linha do __mock__ (ver mock_utils.check_file_mock_mode())."""
+    first_line = first_line.rstrip("\r\n")
+    if first_line == "//__MOCK_COPY_FILE_CONTENT__":
+        return "copy"
+    return "discard"
+
+def with_newline(lines: list) -> tuple:
+    """Garante que a última linha do conteúdo termine com '\n'."""
+    lines = list(lines)
+    if lines and not lines[-1].endswith("\n"):
+        lines[-1] += "\n"
+    return tuple(lines)
+
+def parse_mock_lines(cmds_lines: list, mock_file: str) -> MockIR:
+    """
+    Analisa as linhas de um arquivo __mock__ em uma única passada.
+
+    Cada tipo de diretiva mantém o seu próprio estado, como se o arquivo fosse percorrido
+    uma vez por tipo: o conteúdo de um bloco de um tipo continua sendo procurado pelos
+    marcadores dos outros tipos. Em caso de erro de sintaxe, exibe a mensagem e encerra.
+    """
+    from mock_utils import mock_err_msg
+
+    mock_mode = mock_mode_of(cmds_lines[0]) if cmds_lines else "discard"
+    if mock_mode != "copy":
+        # As diretivas só são processadas no modo "copy"
+        return MockIR(mock_file, mock_mode, [])
+
+    directives = []
+    text_block = None        # __MOCK_REPLACE_TEXT_* em aberto
+    code_block = None        # __MOCK_REPLACE_CODE_* em aberto
+    top_bottom_block = None  # //__MOCK_TOP/BOTTOM_START em aberto
+    add_block = None         # __MOCK_ADD_*_START em aberto
+    add_line = None          # __MOCK_ADD_*_LINE aguardando a linha de conteúdo
+
+    count = 0
+    for count, raw_line in enumerate(cmds_lines, start=1):
+        line = raw_line.rstrip("\n")
+        # Todos os marcadores contêm "__MOCK_": evita as regex nas demais linhas
+        has_marker = "__MOCK_" in line
+
+        # __MOCK_REPLACE_TEXT_(START|LINE): <texto atual>
+        m = RE_REPLACE_TEXT.search(line) if has_marker else None
+        if m:
+            if text_block is not None:
+                mock_err_msg(count, mock_file, text_block["cmd"], "Nested instruction, expected text to replace")
+                sys.exit(1)
+            text_block = {"line": count, "cmd": line, "mode": m.group(1), "old_text": m.group(2), "new_text": ""}
+        elif line.strip() == "//__MOCK_REPLACE_TEXT_END" or (text_block is not None and text_block["mode"] == "LINE"):
+            if text_block is None:
+                mock_err_msg(count, mock_file, line, "Missing initial __MOCK_REPLACE_TEXT_START:")
+                sys.exit(1)
+            new_text = text_block["new_text"]
+            if text_block["mode"] == "LINE":
+                new_text += line
+            directives.append(MockDirective(REPLACE_TEXT, text_block["line"], count, text_block["cmd"], text_block["mode"],
+                                            old_text=text_block["old_text"], new_text=new_text.rstrip()))
+            text_block = None
+        elif text_block is not None:
+            text_block["new_text"] += line + "\n"
+
+        # __MOCK_REMOVE: <EXTRACT_TYPE> <EXTRACT_NAME> [extra-args]
+        m = RE_REMOVE.search(line) if has_marker else None
+        if m:
+            directives.append(MockDirective(REMOVE, count, count, line, extract_type=m.group(1), extract_name=m.group(2),
+                                            extra_args=m.group(3) or "", content=(line + "\n",)))
+
+        # __MOCK_REPLACE_CODE_(START|LINE): <EXTRACT_TYPE> <EXTRACT_NAME> [extra-args]
+        m = RE_REPLACE_CODE.search(line) if has_marker else None
+        if m:
+            if code_block is not None:
+                mock_err_msg(count, mock_file, line, "Nested instruction, expected __MOCK_REPLACE_CODE_END")
+                sys.exit(1)
+            code_block = {"line": count, "cmd": line, "mode": m.group(1),
+                          "extract_type": m.group(2), "extract_name": m.group(3), "extra_args": m.group(4) or ""}
+        elif line.strip() == "//__MOCK_REPLACE_CODE_END" or (code_block is not None and code_block["mode"] == "LINE"):
+            if code_block is None:
+                mock_err_msg(count, mock_file, line, "Missing initial __MOCK_REPLACE_CODE_START:")
+                sys.exit(1)
+            directives.append(MockDirective(REPLACE_CODE, code_block["line"], count, code_block["cmd"], code_block["mode"],
+                                            extract_type=code_block["extract_type"], extract_name=code_block["extract_name"],
+                                            extra_args=code_block["extra_args"],
+                                            content=with_newline(cmds_lines[code_block["line"] - 1:count])))
+            code_block = None
+
+        # //__MOCK_TOP_START ... //__MOCK_TOP_END, //__MOCK_BOTTOM_START ... //__MOCK_BOTTOM_END
+        m = RE_TOP_BOTTOM_START.match(line) if has_marker else None
+        if m:
+            if top_bottom_block is not None:
+                print(f"Erro: Bloco aninhado detectado em linha {count}. Não permitido.")
+                sys.exit(1)
+            top_bottom_block = {"line": count, "cmd": line, "position": m.group(1)}
+        else:
+            m = RE_TOP_BOTTOM_END.match(line) if has_marker else None
+            if m:
+                if top_bottom_block is None:
+                    print(f"Erro: Marcador de fim encontrado sem bloco iniciado (linha {count}).")
+                    sys.exit(1)
+                if m.group(1) != top_bottom_block["position"]:
+                    print(f"Erro: Marcador de fim '{line}' não corresponde ao início '{top_bottom_block['cmd']}' (linha {count}).")
+                    sys.exit(1)
+                directives.append(MockDirective(TOP_BOTTOM, top_bottom_block["line"], count, top_bottom_block["cmd"],
+                                                position=top_bottom_block["position"],
+                                                content=with_newline(cmds_lines[top_bottom_block["line"] - 1:count])))
+                top_bottom_block = None
+
+        # __MOCK_ADD_(BEFORE|AFTER)_(START|LINE): <EXTRACT_TYPE> <EXTRACT_NAME> [extra-args]
+        if add_line is not None:
+            # Linha de conteúdo de um __MOCK_ADD_*_LINE (não é procurada por marcadores de ADD)
+            add_line["content"].append(raw_line)
+            directives.append(MockDirective(ADD, add_line["line"], count, add_line["cmd"], "LINE", add_line["position"],
+                                            add_line["extract_type"], add_line["extract_name"], add_line["extra_args"],
+                                            with_newline(add_line["content"])))
+            add_line = None
+        elif add_block is not None:
+            add_block["content"].append(line + "\n")
+            if line.strip() == f"//__MOCK_ADD_{add_block['position']}_END":
+                directives.append(MockDirective(ADD, add_block["line"], count, add_block["cmd"], "START", add_block["position"],
+                                                add_block["extract_type"], add_block["extract_name"], add_block["extra_args"],
+                                                tuple(add_block["content"])))
+                add_block = None
+        elif has_marker:
+            m = RE_ADD_BLOCK.search(line) or RE_ADD_LINE.search(line)
+            if m:
+                block = {"line": count, "cmd": line, "position": m.group(1), "extract_type": m.group(2),
+                         "extract_name": m.group(3), "extra_args": m.group(4) or "", "content": [line + "\n"]}
+                if m.re is RE_ADD_BLOCK:
+                    add_block = block
+                else:
+                    add_line = block
+
+    # Blocos que ficaram abertos no fim do arquivo
+    if text_block is not None:
+        mock_err_msg(count, mock_file, text_block["cmd"], "Block not terminated properly.")
+        sys.exit(1)
+    if code_block is not None:
+        mock_err_msg(count, mock_file, code_block["cmd"], "Missing __MOCK_REPLACE_CODE_END")
+        sys.exit(1)
+    if top_bottom_block is not None:
+        print(f"Erro: Bloco iniciado com '{top_bottom_block['cmd']}' não foi encerrado corretamente.")
+        sys.exit(1)
+    if add_line is not None:
+        mock_err_msg(count, mock_file, add_line["cmd"], "Expected content line after __MOCK_ADD_LINE marker")
+        sys.exit(1)
+    if add_block is not None:
+        mock_err_msg(count, mock_file, add_block["cmd"].strip(), "Block not terminated properly.")
+        sys.exit(1)
+
+    return MockIR(mock_file, mock_mode, directives)
+
+def get_ir_cache_dir() -> str:
+    return os.path.join(mock_cache.get_cache_dir(), "ir")
+
+def get_ir_cache_path(mock_digest: str) -> str:
+    return os.path.join(get_ir_cache_dir(), f"{mock_digest}.v{MOCK_IR_VERSION}.json")
+
+def read_cached_ir(cache_path: str, mock_file: str):
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != MOCK_IR_VERSION:
+            return None
+        return MockIR.from_json(mock_file, data)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def write_cached_ir(cache_path: str, ir: MockIR):
+    """Grava a IR no cache. Falhas são ignoradas: o cache é apenas uma otimização."""
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(ir.to_json(), f)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+@tracing.traced("load __mock__ IR", "ir")
+def load_mock_ir(mock_file: str) -> MockIR:
+    """Retorna a IR de um arquivo __mock__, a partir do cache quando o arquivo não mudou."""
+    if not os.path.isfile(mock_file):
+        print(f"Error: Not Found Source File '{mock_file}'")
+        sys.exit(1)
+    with open(mock_file, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+
+    cache_path = get_ir_cache_path(digest)
+    ir = read_cached_ir(cache_path, mock_file)
+    if ir is None:
+        with open(mock_file, "r", encoding=ENCODING) as f:
+            cmds_lines = f.readlines()
+        ir = parse_mock_lines(cmds_lines, mock_file)
+        write_cached_ir(cache_path, ir)
+    return ir
+
+def prune_cache(mock_digests: set):
+    """
+    Remove do cache as IRs de arquivos __mock__ que não existem mais (ou mudaram) e as
+    geradas por outra versão do analisador.
+    """
+    cache_dir = get_ir_cache_dir()
+    if not os.path.isdir(cache_dir):
+        return
+    keep = {os.path.basename(get_ir_cache_path(digest)) for digest in mock_digests}
+    for name in os.listdir(cache_dir):
+        if name.endswith(".json") and name not in keep:
+            os.remove(os.path.join(cache_dir, name))
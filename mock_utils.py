@@ -2,16 +2,29 @@
 #  Created on: 18 de mar de 2025
 #      Author: roger moschiel
 
+import bisect
+import collections
+import concurrent.futures
+import contextlib
+import io
 import os
 import shutil
 import sys
 import re
-import subprocess
-import tempfile
-import time
+import traceback
 import json
+import extractor_service
+import mock_cache
+import mock_ir
+from mock_document import MockDocument
+import project_sync
+import tracing
 
 ENCODING="latin-1"
+MOCKSHADOW_VERSION = "1.0"
+# Versão do gerador: entra nas chaves dos caches e deve ser incrementada sempre que
+# as mesmas entradas passarem a gerar uma saída diferente (posicionamento, formatação...)
+GENERATOR_VERSION = 3
 script_dir = os.path.dirname(os.path.abspath(__file__))
 
 def validate_file_exists(file_path: str):
@@ -34,90 +47,43 @@ def remove_directory(directory: str):
     if os.path.isdir(directory):
         shutil.rmtree(directory)
 
-def copy_project_content(src: str, dest: str, compare_dates: bool = False):
-    """
-    Copia recursivamente o conteúdo de 'src' para 'dest', ignorando os itens listados em 'excludeFromCopy'.
-    Quando 'compare_dates' é False (comportamento padrão):
-      - Remove o diretório de destino (se existir), recriando-o e copiando tudo.
-    Quando 'compare_dates' é True:
-      - Atualiza somente os arquivos que não existem em 'dest' ou cujas datas de modificação diferem.
-      - Para diretórios, se já existirem, a função é chamada recursivamente.
-    """
+def get_exclude_items() -> list:
+    """Lê os itens a serem excluídos da cópia ('excludeFromCopy' no config.json)."""
     import runtime
-
-    # Lê os itens a serem excluídos
     exclude_items = []
     for item in runtime.USER_CONFIGS.get("excludeFromCopy", []):
         if isinstance(item, str) and item.strip():
             exclude_items.append(item.strip())
-    
-    def ignore_func(current, names):
-        """
-        Função auxiliar para o copytree: calcula o caminho relativo do diretório atual
-        em relação a 'src' e, para cada item, verifica se ele deve ser ignorado.
-        """
-        rel_current = os.path.relpath(current, src).replace("\\", "/")
-        ignored = []
-        for name in names:
-            candidate = name if rel_current == "." else f"{rel_current}/{name}"
-            if candidate in exclude_items:
-                ignored.append(name)
-        return ignored
+    return exclude_items
+
+def copy_project_content(src: str, dest: str, compare_dates: bool = False, copy_function=None,
+                         sync_record: dict = None, skip_paths: set = frozenset(),
+                         stats: "project_sync.SyncStats" = None) -> tuple:
+    """
+    Copia recursivamente o conteúdo de 'src' para 'dest', ignorando os itens listados em 'excludeFromCopy'
+    e os diretórios '.git'. Cada arquivo é materializado por 'copy_function' (ver
+    project_sync.make_copy_function()), que aplica a estratégia definida em "cloneStrategy".
+    Quando 'compare_dates' é False (comportamento padrão):
+      - Remove o diretório de destino (se existir), recriando-o e copiando tudo.
+    Quando 'compare_dates' é True:
+      - Sincroniza incrementalmente a partir de 'sync_record' (registro da última cópia no manifesto):
+        copia somente os arquivos alterados e remove os que deixaram de existir em 'src'.
+        Se 'src' for um repositório git, apenas os caminhos alterados segundo o git são visitados.
+    Retorna (registro para a próxima sincronização, caminhos alterados ou None se todo 'src' foi percorrido).
+    """
+    if copy_function is None:
+        copy_function = project_sync.make_clone_function(dest)
 
     if not compare_dates:
         # Comportamento original: remove o diretório de destino e copia tudo de src
         if os.path.exists(dest):
             shutil.rmtree(dest)
-        os.makedirs(dest)
+        sync_record = None
 
-        for item in os.listdir(src):
-            if item in exclude_items:
-                print(f"Ignored: {item}")
-                continue
-
-            src_item = os.path.join(src, item)
-            dest_item = os.path.join(dest, item)
-            if os.path.isdir(src_item):
-                shutil.copytree(src_item, dest_item, ignore=ignore_func)
-            else:
-                shutil.copy2(src_item, dest_item)
-    else:
-        # Comportamento incremental: só copia se a data de modificação for diferente
-        if not os.path.exists(dest):
-            os.makedirs(dest)
-
-        for item in os.listdir(src):
-            if item in exclude_items:
-                print(f"Ignored: {item}")
-                continue
-
-            src_item = os.path.join(src, item)
-            dest_item = os.path.join(dest, item)
-
-            if os.path.isdir(src_item):
-                if not os.path.exists(dest_item):
-                    shutil.copytree(src_item, dest_item, ignore=ignore_func)
-                else:
-                    # Atualiza recursivamente o conteúdo do diretório
-                    copy_project_content(src_item, dest_item, compare_dates=True)
-            else:
-                # Se o arquivo já existe, compara as datas de modificação
-                if os.path.exists(dest_item):
-                    src_mtime = os.path.getmtime(src_item)
-                    dest_mtime = os.path.getmtime(dest_item)
-                    if src_mtime != dest_mtime:
-                        shutil.copy2(src_item, dest_item)
-                else:
-                    shutil.copy2(src_item, dest_item)
-
-def remover_git_dirs(caminho_base):
-    for root, dirs, files in os.walk(caminho_base):
-        if '.git' in dirs:
-            caminho_git = os.path.join(root, '.git')
-            print(f'Removendo: {caminho_git}')
-            shutil.rmtree(caminho_git)
-            # Remove da lista para evitar que o os.walk entre nessa pasta
-            dirs.remove('.git')
+    exclude_items = get_exclude_items()
+    fingerprint = [project_sync.get_shadow_mode(), project_sync.get_clone_strategy(), sorted(exclude_items)]
+    return project_sync.sync_project_tree(src, dest, sync_record, exclude_items, copy_function,
+                                          skip_paths, fingerprint, stats)
 
 def clone_project_tree():
     """
@@ -132,10 +98,7 @@ def clone_project_tree():
         sys.exit(1)
 
     # Lê os itens a serem excluídos da copia
-    exclude_items = []
-    for item in runtime.USER_CONFIGS.get("excludeFromCopy", []):
-        if isinstance(item, str) and item.strip():
-            exclude_items.append(item.strip())
+    exclude_items = get_exclude_items()
     
     for root, dirs, _ in os.walk(runtime.USER_ENV.get("originalProject")):
         # Caminho relativo do diretório atual
@@ -152,48 +115,77 @@ def clone_project_tree():
 
     print("Cloning Project Tree Complete!")
 
-def list_mocks():
+def find_mock_list() -> list:
+    """Arquivos __mock__ e __additional__ de DIR_SHADOW_MOCKS, relativos a DIR_MOCK_SHADOW_PROJECT."""
     import runtime
-    print("Mock List")
-    
+    mock_list = []
     # Percorre recursivamente o diretório DIR_SHADOW_MOCKS
     for root, dirs, files in os.walk(runtime.DIR_SHADOW_MOCKS):
         for filename in files:
             if filename.startswith("__mock__") or filename.startswith("__additional__"):
-                # Obtém o caminho completo do arquivo
-                file_path = os.path.join(root, filename)
                 # Calcula o caminho relativo a partir de DIR_MOCK_SHADOW_PROJECT
-                relative_path = os.path.relpath(file_path, runtime.DIR_MOCK_SHADOW_PROJECT)
-                print(f"  {relative_path}")
-    
+                mock_list.append(os.path.relpath(os.path.join(root, filename), runtime.DIR_MOCK_SHADOW_PROJECT))
+    return mock_list
+
+def list_mocks() -> list:
+    print("Mock List")
+    mock_list = find_mock_list()
+    for relative_path in mock_list:
+        print(f"  {relative_path}")
     print("Mock List Complete!")
+    return mock_list
 
+@tracing.traced("clone")
 def clone_project(compare_dates: bool = False):
+    """
+    Clona (ou sincroniza, quando 'compare_dates' é True) o projeto original e os itens de 'addToCopy'
+    no TEMP_PROJECT. Retorna os caminhos do projeto original alterados segundo o git, ou None
+    se todo o projeto foi percorrido.
+    """
     import runtime
     print(f"Cloning Project {runtime.USER_ENV.get("originalProject")} to {runtime.DIR_TEMP_PROJECT}")
-    copy_project_content(runtime.USER_ENV.get("originalProject"), runtime.DIR_TEMP_PROJECT, compare_dates)
-    
-    addToCopy = runtime.USER_CONFIGS.get("addToCopy")
+    # Os arquivos que serão mockados nunca viram hard links do projeto original
+    copy_function = project_sync.make_clone_function(runtime.DIR_TEMP_PROJECT)
+    mocked_paths = project_sync.get_mocked_paths()
+    sync_trees = project_sync.load_sync_manifest() if compare_dates else {}
+    new_sync_trees = {}
+    stats = project_sync.SyncStats()
+
+    tree_key = os.path.relpath(runtime.DIR_TEMP_PROJECT, runtime.DIR_MOCK_SHADOW_PROJECT).replace("\\", "/")
+    new_sync_trees[tree_key], changed_paths = copy_project_content(runtime.USER_ENV.get("originalProject"),
+                                                                   runtime.DIR_TEMP_PROJECT, compare_dates,
+                                                                   copy_function, sync_trees.get(tree_key),
+                                                                   mocked_paths, stats)
+
     for item in runtime.USER_CONFIGS.get("addToCopy", []):
         src = item["src"]
         dest = item["temp_dest"]
         if isinstance(src, str) and isinstance(dest, str):
+            src = os.path.join(runtime.DIR_MOCK_SHADOW_PROJECT, src)
             dest = os.path.join(runtime.DIR_TEMP_PROJECT, dest)
-            print(f"Cloning {src} to {dest}")  
-            copy_project_content(src, dest, compare_dates)      
-
-    print(f"Removing '.git' directories from cloned project")
-    remover_git_dirs(runtime.DIR_TEMP_PROJECT)
-
-    print("Cloning Complete")
-
-def get_user_configs():
+            print(f"Cloning {src} to {dest}")
+            # Caminhos mockados relativos a este destino
+            dest_prefix = os.path.relpath(dest, runtime.DIR_TEMP_PROJECT).replace("\\", "/") + "/"
+            skip_paths = {p[len(dest_prefix):] for p in mocked_paths if p.startswith(dest_prefix)}
+            tree_key = os.path.relpath(dest, runtime.DIR_MOCK_SHADOW_PROJECT).replace("\\", "/")
+            new_sync_trees[tree_key], _ = copy_project_content(src, dest, compare_dates, copy_function,
+                                                               sync_trees.get(tree_key), skip_paths, stats)
+
+    project_sync.save_sync_manifest(new_sync_trees)
+    if changed_paths is not None:
+        print(f"  {len(changed_paths)} path(s) changed according to git")
+    print(f"Cloning Complete ({stats.files} files checked, {stats.copied} copied, {stats.deleted} removed)")
+    return changed_paths
+
+def get_user_configs(project_dir: str = None):
     """
-    Reads the .mockshadow/config.json and returns the configuration dictionary.
+    Reads the .mockshadow/config.json of 'project_dir' (default: the current project)
+    and returns the configuration dictionary.
     Exits the application if the file is missing or contains invalid JSON.
     """
     import runtime
-    file_config_json = os.path.join(runtime.DIR_MOCK_SHADOW_PROJECT, ".mockshadow/config.json")
+    project_dir = project_dir or runtime.DIR_MOCK_SHADOW_PROJECT
+    file_config_json = os.path.join(project_dir, ".mockshadow/config.json")
 
     if not os.path.isfile(file_config_json):
         sys.exit("fatal: not a mockshadow project (missing .mockshadow/config.json)")
@@ -204,13 +196,14 @@ def get_user_configs():
     except json.JSONDecodeError:
         sys.exit("fatal: invalid JSON in .mockshadow/config.json")
 
-def get_user_env():
+def get_user_env(project_dir: str = None):
     """
-    Reads the .mockshadow/env.json and returns the configuration dictionary.
-    Creates if the file is missing.
+    Reads the .mockshadow/env.json of 'project_dir' (default: the current project)
+    and returns the configuration dictionary, with 'originalProject' as an absolute path.
     """
     import runtime
-    file_env_json = os.path.join(runtime.DIR_MOCK_SHADOW_PROJECT, ".mockshadow/env.json")
+    project_dir = project_dir or runtime.DIR_MOCK_SHADOW_PROJECT
+    file_env_json = os.path.join(project_dir, ".mockshadow/env.json")
 
     if not os.path.isfile(file_env_json):
         sys.exit("fatal: missing file .mockshadow/env.json")
@@ -226,7 +219,10 @@ def get_user_env():
 
     original_project_path = env_data["originalProject"]
 
-    if not isinstance(original_project_path, str) or not os.path.isdir(original_project_path):
+    if isinstance(original_project_path, str):
+        # Um caminho relativo é relativo ao projeto mockshadow, não ao diretório atual
+        env_data["originalProject"] = os.path.abspath(os.path.join(project_dir, original_project_path))
+    if not isinstance(original_project_path, str) or not os.path.isdir(env_data["originalProject"]):
         sys.exit(f"fatal: 'originalProject' path does not exist or is not a directory: {original_project_path}")
 
     return env_data
@@ -309,239 +305,111 @@ def mock_err_msg(line_number, file, cmd, msg):
     print(f"Mock instruction: {cmd}")
     print(msg)
 
-def mock_remove_content(mock_file_cmds: str, mock_file_to_create: str, show_details: bool = False):
+def mock_remove_content(ir: mock_ir.MockIR, document: MockDocument, show_details: bool = False):
     """
-    Processa o arquivo de comandos de mock (mock_file_cmds) para remover conteúdo
-    do arquivo de mock (mock_file_to_create) de acordo com as instruções.
-    
-    Para cada linha que corresponda a:
+    Remove conteúdo do documento do arquivo de mock (document) de acordo com as instruções
+    do arquivo __mock__ (ir):
+
       __MOCK_REMOVE: <EXTRACT_TYPE> <EXTRACT_NAME> [extra-args]
-    a função:
+
+    Para cada instrução, a função:
       - Adiciona "lines" e os extra args processados via mount_extractor_extra_args().
-      - Chama o extractor (a versão Python, extract.py) no diretório SCRIPT_MOCKSHADOW_DIR/clang-code-extractor.
+      - Chama o extractor (worker persistente do extract.py, ver extractor_service.py).
       - Se o extractor retornar erro, chama mock_err_msg() e encerra.
       - Se bem-sucedido, a saída deverá ser "<START_LINE>;<END_LINE>".
       - Atualiza o arquivo de mock, substituindo as linhas entre START_LINE e END_LINE
-        pela instrução de mock (a linha atual).
+        pela instrução de mock.
     """
-    # Verifica se os arquivos existem
-    if not os.path.isfile(mock_file_cmds):
-        print(f"Error: Not Found Source File '{mock_file_cmds}'")
-        sys.exit(1)
-    if not os.path.isfile(mock_file_to_create):
-        print(f"Error: Mock File '{mock_file_to_create}'")
-        sys.exit(1)
-    
-    count = 0
-    with open(mock_file_cmds, 'r', encoding=ENCODING) as f:
-        for line in f:
-            # Remove a quebra de linha no final, se houver
-            line = line.rstrip('\n')
-            count += 1
-
-            # Regex para capturar: __MOCK_REMOVE: <EXTRACT_TYPE> <EXTRACT_NAME> [extra-args]
-            pattern = r"__MOCK_REMOVE:\s+(\S+)\s+(\S+)(\s+.*)?"
-            m = re.search(pattern, line)
-            if m:
-                extract_type = m.group(1)
-                extract_name = m.group(2)
-                extra_args = m.group(3) if m.group(3) is not None else ""
-                # Adiciona "lines" e processa os extra args
-                extra_args = "lines " + mount_extractor_extra_args(extra_args)
-                
-                if show_details:
-                    print(f"      Remove original {extract_type} '{extract_name}'")
-                
-                # Define o diretório do extractor a partir da variável de ambiente SCRIPT_MOCKSHADOW_DIR
-                extractor_dir = os.path.join(script_dir, "clang-code-extractor")
-                # Monta o comando usando a versão Python do extractor (extract.py)
-                # Usamos sys.executable para invocar o Python atual
-                cmd = [sys.executable, "extract.py", extract_type, extract_name, mock_file_to_create] + extra_args.split()
-                
-                try:
-                    result = subprocess.run(cmd, cwd=extractor_dir, capture_output=True, text=True)
-                    text_extracted = (result.stdout + result.stderr).strip()
-                    status = result.returncode
-                except Exception as e:
-                    print(f"Error executing extractor: {e}")
-                    sys.exit(1)
-                
-                if status != 0:
-                    mock_err_msg(count, mock_file_cmds, line, text_extracted)
-                    sys.exit(status)
-                
-                # A saída deve estar no formato "<START_LINE>;<END_LINE>"
-                parts = text_extracted.split(";")
-                if len(parts) < 2:
-                    print(f"Error: Could not parse extractor output: {text_extracted}")
-                    sys.exit(1)
-                try:
-                    start_line = int(parts[0].strip())
-                    end_line = int(parts[1].strip())
-                except ValueError:
-                    print(f"Error: Invalid line numbers extracted: {text_extracted}")
-                    sys.exit(1)
-                
-                # Lê o conteúdo do arquivo de mock
-                with open(mock_file_to_create, 'r', encoding=ENCODING) as mf:
-                    file_lines = mf.readlines()
-                
-                # Monta o novo conteúdo:
-                # - Linhas antes de start_line: mantêm
-                # - Linha start_line: substituída pela instrução de mock (a linha atual)
-                # - Linhas de start_line+1 até end_line: descartadas
-                # - Linhas após end_line: mantidas
-                new_lines = []
-                for i, content in enumerate(file_lines, start=1):
-                    if i < start_line:
-                        new_lines.append(content)
-                    elif i == start_line:
-                        new_lines.append(line + "\n")
-                    elif i > end_line:
-                        new_lines.append(content)
-                # Escreve o novo conteúdo de volta para o arquivo
-                with open(mock_file_to_create, 'w', encoding=ENCODING) as mf:
-                    mf.writelines(new_lines)
-
-def mock_replace_code(mock_file_cmds: str, mock_file_to_create: str, show_details: bool = False) -> None:
-    """
-    Processa o arquivo de comandos de mock (mock_file_cmds) e substitui blocos de conteúdo
-    no arquivo de mock (mock_file_to_create) conforme instruções do tipo:
-    
+    for directive in ir.of_kind(mock_ir.REMOVE):
+        # Adiciona "lines" e processa os extra args
+        extra_args = "lines " + mount_extractor_extra_args(directive.extra_args)
+
+        if show_details:
+            print(f"      Remove original {directive.extract_type} '{directive.extract_name}'")
+
+        # Consulta o extractor (worker persistente ou, como fallback, extract.py em subprocesso)
+        # sobre o conteúdo atual do documento
+        document.materialize()
+        status, text_extracted = extractor_service.run_extractor(
+            [directive.extract_type, directive.extract_name, document.path] + extra_args.split())
+        text_extracted = text_extracted.strip()
+
+        if status != 0:
+            mock_err_msg(directive.line, ir.mock_file, directive.cmd, text_extracted)
+            sys.exit(status)
+
+        # A saída deve estar no formato "<START_LINE>;<END_LINE>"
+        parts = text_extracted.split(";")
+        if len(parts) < 2:
+            print(f"Error: Could not parse extractor output: {text_extracted}")
+            sys.exit(1)
+        try:
+            start_line = int(parts[0].strip())
+            end_line = int(parts[1].strip())
+        except ValueError:
+            print(f"Error: Invalid line numbers extracted: {text_extracted}")
+            sys.exit(1)
+
+        # Atualiza o documento:
+        # - Linhas antes de start_line: mantêm
+        # - Linha start_line: substituída pela instrução de mock
+        # - Linhas de start_line+1 até end_line: descartadas
+        # - Linhas após end_line: mantidas
+        document.replace_lines(start_line - 1, max(start_line, end_line), directive.content)
+
+def mock_replace_code(ir: mock_ir.MockIR, document: MockDocument, show_details: bool = False) -> None:
+    """
+    Substitui blocos de conteúdo no documento do arquivo de mock (document) conforme
+    as instruções do arquivo __mock__ (ir):
+
       __MOCK_REPLACE_CODE_START: <EXTRACT_TYPE> <EXTRACT_NAME> [extra-args]
       ... (conteudo multilinha que irá sobrescrever o conteudo original ) ...
       //__MOCK_REPLACE_CODE_END
 
       __MOCK_REPLACE_CODE_LINE: <EXTRACT_TYPE> <EXTRACT_NAME> [extra-args]
       ... (conteudo com uma unica linha que irá sobrescrever o conteudo original) ...
-      
-    Para cada bloco, a função:
-      - Determina o bloco (linhas SRC_START_LINE a SRC_END_LINE) no arquivo de comandos;
-      - Chama o extractor (versão Python, extract.py) para obter DEST_START_LINE e DEST_END_LINE
-        no arquivo de mock a ser atualizado;
-      - Extrai o conteúdo do bloco do arquivo de comandos e insere esse conteúdo
-        no arquivo de mock, substituindo as linhas entre DEST_START_LINE e DEST_END_LINE.
-    
-    Se ocorrer algum erro (como instrução aninhada ou falta de __MOCK_REPLACE_CODE_END),
-    a função chama mock_err_msg() e encerra.
-    """
-    # Verifica se os arquivos existem
-    if not os.path.isfile(mock_file_cmds):
-        print(f"Error: Not Found Source File '{mock_file_cmds}'")
-        sys.exit(1)
-    if not os.path.isfile(mock_file_to_create):
-        print(f"Error: Mock File '{mock_file_to_create}'")
-        sys.exit(1)
-    
-    inside_mock_block = False
-    MOCK_CMD = ""
-    count = 0
-    SRC_START_LINE = 0
-    SRC_END_LINE = 0
-    REPLACE_MODE = ""
-    
-    # Lê todas as linhas do arquivo de comandos (preservando quebras de linha)
-    with open(mock_file_cmds, "r", encoding=ENCODING) as f:
-        cmds_lines = f.readlines()
-    
-    # Itera sobre cada linha (contabilizando o número da linha)
-    for line in cmds_lines:
-        count += 1
-        line = line.rstrip("\n")
-        
-        # Procura instruções do tipo __MOCK_REPLACE_CODE_(START|LINE): <EXTRACT_TYPE> <EXTRACT_NAME> [extra-args]
-        pattern = r"__MOCK_REPLACE_CODE_(START|LINE):\s+(\S+)\s+(\S+)(\s+.*)?"
-        m = re.search(pattern, line)
-        if m:
-            if inside_mock_block:
-                mock_err_msg(count, mock_file_cmds, line, "Nested instruction, expected __MOCK_REPLACE_CODE_END")
-                sys.exit(1)
-            inside_mock_block = True
-            MOCK_CMD = line
-            SRC_START_LINE = count
-            
-            REPLACE_MODE = m.group(1)  # "START" ou "LINE"
-            EXTRACT_TYPE = m.group(2)
-            EXTRACT_NAME = m.group(3)
-            EXTRA_ARGS = m.group(4) if m.group(4) is not None else ""
-            # Adiciona o argumento "lines" e processa os extra args
-            EXTRA_ARGS = "lines " + mount_extractor_extra_args(EXTRA_ARGS)
-            
-            if show_details:
-                print(f"      replace code {EXTRACT_TYPE} '{EXTRACT_NAME}'")
-        
-        # Verifica se a linha marca o fim do bloco ou, no modo LINE, finaliza imediatamente
-        elif (line.strip() == "//__MOCK_REPLACE_CODE_END" or REPLACE_MODE == "LINE"):
-            if not inside_mock_block:
-                mock_err_msg(count, mock_file_cmds, line, "Missing initial __MOCK_REPLACE_CODE_START:")
-                sys.exit(1)
-            REPLACE_MODE = ""  # Reseta o modo
-            inside_mock_block = False
-            SRC_END_LINE = count
-            
-            # Chama o extractor (versão Python, extract.py) para obter DEST_START_LINE e DEST_END_LINE
-            extractor_dir = os.path.join(script_dir, "clang-code-extractor")
-            cmd = [sys.executable, "extract.py", EXTRACT_TYPE, EXTRACT_NAME, mock_file_to_create] + EXTRA_ARGS.split()
-            try:
-                result = subprocess.run(cmd, cwd=extractor_dir, capture_output=True, text=True)
-            except Exception as e:
-                print(f"Error executing extractor: {e}")
-                sys.exit(1)
-            text_extracted = (result.stdout + result.stderr).strip()
-            status = result.returncode
-            if status != 0:
-                mock_err_msg(count, mock_file_cmds, MOCK_CMD, text_extracted)
-                sys.exit(status)
-            
-            # Espera-se que a saída seja do formato "<DEST_START_LINE>;<DEST_END_LINE>"
-            parts = text_extracted.split(";")
-            if len(parts) < 2:
-                print(f"Error: Could not parse extractor output: {text_extracted}")
-                sys.exit(1)
-            try:
-                DEST_START_LINE = int(parts[0].strip())
-                DEST_END_LINE = int(parts[1].strip())
-            except ValueError:
-                print(f"Error: Invalid destination line numbers: {text_extracted}")
-                sys.exit(1)
-            
-            # Extrai o conteúdo do arquivo de comandos entre SRC_START_LINE e SRC_END_LINE
-            extracted_content = cmds_lines[SRC_START_LINE - 1:SRC_END_LINE]
-            # Garante que tenha um '\n' no final
-            if extracted_content and not extracted_content[-1].endswith('\n'):
-                extracted_content[-1] += '\n'
-            # Escreve esse conteúdo em um arquivo temporário
-            with tempfile.NamedTemporaryFile(delete=False, mode="w", encoding=ENCODING) as tmp_file:
-                tmp_file.writelines(extracted_content)
-                temp_file_path = tmp_file.name
-            
-            # Atualiza o arquivo de mock (mock_file_to_create):
-            # - Mantém as linhas antes de DEST_START_LINE
-            # - Insere o conteúdo do arquivo temporário no lugar das linhas de DEST_START_LINE até DEST_END_LINE
-            # - Mantém as linhas após DEST_END_LINE
-            with open(mock_file_to_create, "r", encoding=ENCODING) as mf:
-                mock_file_lines = mf.readlines()
-            new_content = []
-            new_content.extend(mock_file_lines[:DEST_START_LINE - 1])
-            with open(temp_file_path, "r", encoding=ENCODING) as tf:
-                temp_lines = tf.readlines()
-            new_content.extend(temp_lines)
-            new_content.extend(mock_file_lines[DEST_END_LINE:])
-            with open(mock_file_to_create, "w", encoding=ENCODING) as mf:
-                mf.writelines(new_content)
-            
-            # Remove o arquivo temporário
-            os.remove(temp_file_path)
-    
-    # Verifica se algum bloco ficou aberto sem encerramento
-    if inside_mock_block:
-        mock_err_msg(count, mock_file_cmds, MOCK_CMD, "Missing __MOCK_REPLACE_CODE_END")
-        sys.exit(1)
 
-def insert_mock_top_or_bottom(mock_file_cmds: str, mock_file_to_create: str, show_details: bool = False) -> None:
+    Para cada bloco, a função chama o extractor para obter DEST_START_LINE e DEST_END_LINE
+    no arquivo de mock e substitui essas linhas pelo bloco (incluindo os marcadores).
+    """
+    for directive in ir.of_kind(mock_ir.REPLACE_CODE):
+        # Adiciona o argumento "lines" e processa os extra args
+        EXTRA_ARGS = "lines " + mount_extractor_extra_args(directive.extra_args)
+
+        if show_details:
+            print(f"      replace code {directive.extract_type} '{directive.extract_name}'")
+
+        # Chama o extractor para obter DEST_START_LINE e DEST_END_LINE
+        document.materialize()
+        status, text_extracted = extractor_service.run_extractor(
+            [directive.extract_type, directive.extract_name, document.path] + EXTRA_ARGS.split())
+        text_extracted = text_extracted.strip()
+        if status != 0:
+            mock_err_msg(directive.end_line, ir.mock_file, directive.cmd, text_extracted)
+            sys.exit(status)
+
+        # Espera-se que a saída seja do formato "<DEST_START_LINE>;<DEST_END_LINE>"
+        parts = text_extracted.split(";")
+        if len(parts) < 2:
+            print(f"Error: Could not parse extractor output: {text_extracted}")
+            sys.exit(1)
+        try:
+            DEST_START_LINE = int(parts[0].strip())
+            DEST_END_LINE = int(parts[1].strip())
+        except ValueError:
+            print(f"Error: Invalid destination line numbers: {text_extracted}")
+            sys.exit(1)
+
+        # Atualiza o documento:
+        # - Mantém as linhas antes de DEST_START_LINE
+        # - Insere o bloco no lugar das linhas de DEST_START_LINE até DEST_END_LINE
+        # - Mantém as linhas após DEST_END_LINE
+        document.replace_lines(DEST_START_LINE - 1, DEST_END_LINE, directive.content)
+
+def insert_mock_top_or_bottom(ir: mock_ir.MockIR, document: MockDocument, show_details: bool = False) -> None:
     """
-    Insere conteúdo de blocos de mock em um arquivo de destino, de acordo com marcadores
-    no arquivo de comandos (mock_file_cmds). São suportados dois tipos de blocos:
+    Insere conteúdo de blocos de mock no documento do arquivo de mock, de acordo com os
+    marcadores do arquivo __mock__ (ir). São suportados dois tipos de blocos:
 
       - MOCK_TOP: Bloco que deve ser inserido no topo do arquivo de destino.
       - MOCK_BOTTOM: Bloco que deve ser inserido no fundo do arquivo de destino.
@@ -549,117 +417,42 @@ def insert_mock_top_or_bottom(mock_file_cmds: str, mock_file_to_create: str, sho
     Para arquivos com extensão .h, o código tenta identificar os "include guards":
       - Para MOCK_BOTTOM, procura a última ocorrência de "#endif" e insere logo antes.
       - Para MOCK_TOP, procura a primeira linha que inicia com "#define" e insere logo depois.
-
-    Se ocorrer algum erro (por exemplo, bloco aninhado ou ausência do marcador de fim),
-    o script exibe uma mensagem e encerra.
     """
-    # Verifica se os arquivos existem
-    if not os.path.isfile(mock_file_cmds):
-        print(f"Error: Not Found Source File '{mock_file_cmds}'")
-        sys.exit(1)
-    if not os.path.isfile(mock_file_to_create):
-        print(f"Error: Mock File '{mock_file_to_create}'")
-        sys.exit(1)
-    
-    inside_block = False
-    block_type = ""
-    MOCK_CMD = ""
-    count = 0
-    SRC_START_LINE = 0
-    SRC_END_LINE = 0
-    DEST_START_LINE = 0
-
-    # Lê todas as linhas do arquivo de comandos
-    with open(mock_file_cmds, "r", encoding=ENCODING) as f:
-        cmds_lines = f.readlines()
-    
-    for line in cmds_lines:
-        count += 1
-        line_stripped = line.rstrip("\n")
-        
-        # Verifica se a linha indica início de um bloco (MOCK_TOP ou MOCK_BOTTOM)
-        m_start = re.match(r"^//__(MOCK_TOP|MOCK_BOTTOM)_START$", line_stripped)
-        if m_start:
-            if inside_block:
-                print(f"Erro: Bloco aninhado detectado em linha {count}. Não permitido.")
-                sys.exit(1)
-            inside_block = True
-            block_type = m_start.group(1)  # "MOCK_TOP" ou "MOCK_BOTTOM"
-            MOCK_CMD = line_stripped
-            SRC_START_LINE = count
-            if show_details:
-                if block_type == "MOCK_BOTTOM":
-                    print("      insert content at the BOTTOM")
-                elif block_type == "MOCK_TOP":
-                    print("      insert content at the TOP")
-            continue
-        
-        # Verifica se a linha indica fim de bloco
-        m_end = re.match(r"^//__(MOCK_TOP|MOCK_BOTTOM)_END$", line_stripped)
-        if m_end:
-            if not inside_block:
-                print(f"Erro: Marcador de fim encontrado sem bloco iniciado (linha {count}).")
-                sys.exit(1)
-            expected_end = f"//__{block_type}_END"
-            if line_stripped != expected_end:
-                print(f"Erro: Marcador de fim '{line_stripped}' não corresponde ao início '{MOCK_CMD}' (linha {count}).")
-                sys.exit(1)
-            inside_block = False
-            SRC_END_LINE = count
-
-            # Extrai o conteúdo do bloco do arquivo de comandos (linhas do início ao fim do bloco)
-            block_content = cmds_lines[SRC_START_LINE - 1 : SRC_END_LINE]
-            # Garante que tenha um '\n' no final
-            if block_content and not block_content[-1].endswith('\n'):
-                block_content[-1] += '\n'
-            
-            # Determina a linha de destino para a inserção no arquivo de destino
-            # Para arquivos .h, tenta identificar os include guards
-            if block_type == "MOCK_BOTTOM":
-                if mock_file_to_create.endswith(".h"):
-                    with open(mock_file_to_create, "r", encoding=ENCODING) as f:
-                        dest_lines = f.readlines()
-                    # Procura a última ocorrência de "#endif"
-                    endif_lines = [i + 1 for i, l in enumerate(dest_lines) if "#endif" in l]
-                    if endif_lines:
-                        DEST_START_LINE = endif_lines[-1] - 1  # insere antes do #endif
-                    else:
-                        print("Aviso: Nenhum #endif encontrado. Inserindo no final do arquivo.")
-                        DEST_START_LINE = len(dest_lines)
+    for directive in ir.of_kind(mock_ir.TOP_BOTTOM):
+        if show_details:
+            print(f"      insert content at the {directive.position}")
+
+        # Determina a linha de destino para a inserção no arquivo de destino
+        # Para arquivos .h, tenta identificar os include guards
+        if directive.position == "BOTTOM":
+            if document.path.endswith(".h"):
+                # Procura a última ocorrência de "#endif"
+                endif_line = document.last_endif_line()
+                if endif_line is not None:
+                    DEST_START_LINE = endif_line  # insere antes do #endif
                 else:
-                    with open(mock_file_to_create, "r", encoding=ENCODING) as f:
-                        dest_lines = f.readlines()
-                    DEST_START_LINE = len(dest_lines)
-            elif block_type == "MOCK_TOP":
-                if mock_file_to_create.endswith(".h"):
-                    with open(mock_file_to_create, "r", encoding=ENCODING) as f:
-                        dest_lines = f.readlines()
-                    # Procura a primeira linha que inicia com "#define"
-                    define_lines = [i + 1 for i, l in enumerate(dest_lines) if l.lstrip().startswith("#define")]
-                    if define_lines:
-                        DEST_START_LINE = define_lines[0] + 1  # insere logo após
-                    else:
-                        DEST_START_LINE = 1
+                    print("Aviso: Nenhum #endif encontrado. Inserindo no final do arquivo.")
+                    DEST_START_LINE = document.line_count()
+            else:
+                DEST_START_LINE = document.line_count()
+        else:
+            if document.path.endswith(".h"):
+                # Procura a primeira linha que inicia com "#define"
+                define_line = document.first_define_line()
+                if define_line is not None:
+                    DEST_START_LINE = define_line + 2  # insere logo após
                 else:
                     DEST_START_LINE = 1
-            
-            # Insere o conteúdo extraído no arquivo de destino
-            with open(mock_file_to_create, "r", encoding=ENCODING) as f:
-                target_lines = f.readlines()
-            new_content = target_lines[:DEST_START_LINE - 1] + block_content + target_lines[DEST_START_LINE - 1:]
-            with open(mock_file_to_create, "w", encoding=ENCODING) as f:
-                f.writelines(new_content)
-            continue
-    # Final do loop de leitura
-    
-    if inside_block:
-        print(f"Erro: Bloco iniciado com '{MOCK_CMD}' não foi encerrado corretamente.")
-        sys.exit(1)
+            else:
+                DEST_START_LINE = 1
+
+        # Insere o bloco (incluindo os marcadores) no documento
+        document.insert_lines(DEST_START_LINE - 1, directive.content)
 
-def mock_add_content_before_or_after(mock_file_cmds: str, mock_file_to_create: str, show_details: bool = False) -> None:
+def mock_add_content_before_or_after(ir: mock_ir.MockIR, document: MockDocument, show_details: bool = False) -> None:
     """
-    Processa o arquivo de comandos de mock (mock_file_cmds) e insere blocos de conteúdo
-    no arquivo de mock (mock_file_to_create) conforme as instruções:
+    Insere blocos de conteúdo no documento do arquivo de mock conforme as instruções
+    do arquivo __mock__ (ir):
 
       __MOCK_ADD_BEFORE_START: <EXTRACT_TYPE> <EXTRACT_NAME> [extra-args]
       //multine content to add before
@@ -675,129 +468,30 @@ def mock_add_content_before_or_after(mock_file_cmds: str, mock_file_to_create: s
       __MOCK_ADD_AFTER_LINE: <EXTRACT_TYPE> <EXTRACT_NAME> [extra-args]
       //single line content to add after
 
-    Para cada comando, a função:
-      - Identifica o bloco (para comandos START, do marcador inicial até o marcador de fim;
-        para comandos LINE, a linha imediatamente após o comando);
-      - Chama o extractor (extract.py) para obter DEST_START_LINE e DEST_END_LINE
-        no arquivo de mock a ser atualizado;
-      - Insere o conteúdo extraído (incluindo os próprios marcadores) no arquivo de mock:
-          - Para comandos BEFORE, insere logo acima da linha DEST_START_LINE;
-          - Para comandos AFTER, insere logo após a linha DEST_END_LINE.
+    Para cada comando, o extractor informa DEST_START_LINE e DEST_END_LINE no arquivo de mock
+    e o bloco (incluindo os próprios marcadores) é inserido:
+      - Para comandos BEFORE, logo acima da linha DEST_START_LINE;
+      - Para comandos AFTER, logo após a linha DEST_END_LINE.
     """
-
-    # Verifica se os arquivos existem
-    if not os.path.isfile(mock_file_cmds):
-        print(f"Error: Not Found Source File '{mock_file_cmds}'")
-        sys.exit(1)
-    if not os.path.isfile(mock_file_to_create):
-        print(f"Error: Mock File '{mock_file_to_create}' not found.")
-        sys.exit(1)
-    
-    # Lê todas as linhas do arquivo de comandos
-    with open(mock_file_cmds, "r", encoding=ENCODING) as f:
-        cmds_lines = f.readlines()
-    
-    line_count = 0
-    inside_block = False
-    command_position = ""  # "BEFORE" ou "AFTER"
-    replace_mode = ""      # "START" ou "LINE"
-    EXTRACT_TYPE = ""
-    EXTRACT_NAME = ""
-    EXTRA_ARGS = ""
-    block_content = []  # conteúdo do bloco, incluindo marcadores
-
-    while line_count < len(cmds_lines):
-        current_line = cmds_lines[line_count].rstrip("\n")
-        line_count += 1
-
-        if not inside_block:
-            # Verifica comandos multi-linha (START)
-            pattern_block = r"__MOCK_ADD_(BEFORE|AFTER)_START:\s+(\S+)\s+(\S+)(\s+.*)?"
-            m_block = re.search(pattern_block, current_line)
-            if m_block:
-                inside_block = True
-                command_position = m_block.group(1)  # BEFORE ou AFTER
-                replace_mode = "START"
-                EXTRACT_TYPE = m_block.group(2)
-                EXTRACT_NAME = m_block.group(3)
-                EXTRA_ARGS = m_block.group(4) if m_block.group(4) is not None else ""
-                EXTRA_ARGS = "lines " + mount_extractor_extra_args(EXTRA_ARGS)
-                # Guarda o marcador inicial como parte do bloco
-                block_content = [current_line + "\n"]
-                if show_details:
-                    print(f"      add content {command_position} {EXTRACT_TYPE} '{EXTRACT_NAME}'")
-                continue
-
-            # Verifica comandos de linha única (LINE)
-            pattern_line = r"__MOCK_ADD_(BEFORE|AFTER)_LINE:\s+(\S+)\s+(\S+)(\s+.*)?"
-            m_line = re.search(pattern_line, current_line)
-            if m_line:
-
-                command_position = m_line.group(1)  # BEFORE ou AFTER
-                replace_mode = "LINE"
-                EXTRACT_TYPE = m_line.group(2)
-                EXTRACT_NAME = m_line.group(3)
-                EXTRA_ARGS = m_line.group(4) if m_line.group(4) is not None else ""
-                EXTRA_ARGS = "lines " + mount_extractor_extra_args(EXTRA_ARGS)
-                # Guarda o comando e a próxima linha (conteúdo a adicionar)
-                block_content = [current_line + "\n"]
-                if line_count < len(cmds_lines):
-                    content_line = cmds_lines[line_count]
-                    line_count += 1
-                    block_content.append(content_line)
-                else:
-                    mock_err_msg(line_count, mock_file_cmds, current_line, "Expected content line after __MOCK_ADD_LINE marker")
-                    sys.exit(1)
-                if show_details:
-                    print(f"      add content {command_position} {EXTRACT_TYPE} '{EXTRACT_NAME}'")
-                # Processa imediatamente o comando de linha única
-                process_add_command(mock_file_to_create, EXTRACT_TYPE, EXTRACT_NAME, EXTRA_ARGS, block_content, command_position, show_details)
-                block_content = []
-                continue
-
-        else:
-            # Estamos dentro de um bloco multi-linha iniciado por __MOCK_ADD_?_START
-            if command_position == "BEFORE":
-                if current_line.strip() == "//__MOCK_ADD_BEFORE_END":
-                    block_content.append(current_line + "\n")
-                    inside_block = False
-                    process_add_command(mock_file_to_create, EXTRACT_TYPE, EXTRACT_NAME, EXTRA_ARGS, block_content, command_position, show_details)
-                    block_content = []
-                    continue
-                else:
-                    block_content.append(current_line + "\n")
-            elif command_position == "AFTER":
-                # Observação: conforme o padrão fornecido, o marcador de fim é "__MOCK_ADD_AFTER_END"
-                if current_line.strip() == "//__MOCK_ADD_AFTER_END":
-                    block_content.append(current_line + "\n")
-                    inside_block = False
-                    process_add_command(mock_file_to_create, EXTRACT_TYPE, EXTRACT_NAME, EXTRA_ARGS, block_content, command_position, show_details)
-                    block_content = []
-                    continue
-                else:
-                    block_content.append(current_line + "\n")
-    
-    if inside_block:
-        mock_err_msg(line_count, mock_file_cmds, block_content[0].strip(), "Block not terminated properly.")
-        sys.exit(1)
-
-def process_add_command(mock_file_to_create: str, EXTRACT_TYPE: str, EXTRACT_NAME: str, EXTRA_ARGS: str,
+    for directive in ir.of_kind(mock_ir.ADD):
+        EXTRA_ARGS = "lines " + mount_extractor_extra_args(directive.extra_args)
+        if show_details:
+            print(f"      add content {directive.position} {directive.extract_type} '{directive.extract_name}'")
+        process_add_command(document, directive.extract_type, directive.extract_name, EXTRA_ARGS,
+                            directive.content, directive.position, show_details)
+
+def process_add_command(document: MockDocument, EXTRACT_TYPE: str, EXTRACT_NAME: str, EXTRA_ARGS: str,
                         block_content: list, command_position: str, show_details: bool = False) -> None:
     """
     Processa um comando de adição (antes ou depois), chamando o extractor para obter a posição
     de destino e inserindo o conteúdo (incluindo os marcadores) no arquivo de mock.
     """
 
-    # Define o diretório do extractor (supondo que 'script_dir' e 'extract.py' existam)
-    extractor_dir = os.path.join(script_dir, "clang-code-extractor")
-    cmd = [sys.executable, "extract.py", EXTRACT_TYPE, EXTRACT_NAME, mock_file_to_create] + EXTRA_ARGS.split()
-    try:
-        result = subprocess.run(cmd, cwd=extractor_dir, capture_output=True, text=True)
-    except Exception as e:
-        print(f"Error executing extractor: {e}")
-        sys.exit(1)
-    text_extracted = (result.stdout + result.stderr).strip()
-    status = result.returncode
+    # Chama o extractor para obter DEST_START_LINE e DEST_END_LINE
+    document.materialize()
+    status, text_extracted = extractor_service.run_extractor(
+        [EXTRACT_TYPE, EXTRACT_NAME, document.path] + EXTRA_ARGS.split())
+    text_extracted = text_extracted.strip()
     if status != 0:
         mock_err_msg(0, "", f"Extractor command for {EXTRACT_TYPE} '{EXTRACT_NAME}'", text_extracted)
         sys.exit(status)
@@ -814,10 +508,6 @@ def process_add_command(mock_file_to_create: str, EXTRACT_TYPE: str, EXTRACT_NAM
         print(f"Error: Invalid destination line numbers: {text_extracted}")
         sys.exit(1)
     
-    # Lê o conteúdo atual do arquivo de mock a ser atualizado
-    with open(mock_file_to_create, "r", encoding=ENCODING) as mf:
-        target_lines = mf.readlines()
-    
     # Define a posição de inserção com base no tipo do comando:
     # - BEFORE: insere logo acima de DEST_START_LINE
     # - AFTER: insere logo após DEST_END_LINE
@@ -829,89 +519,262 @@ def process_add_command(mock_file_to_create: str, EXTRACT_TYPE: str, EXTRACT_NAM
         print("Error: Invalid command position.")
         sys.exit(1)
     
-    # Garante que a última linha do bloco tenha '\n'
-    if block_content and not block_content[-1].endswith('\n'):
-        block_content[-1] += '\n'
-
-    # Constrói o novo conteúdo do arquivo
-    new_content = target_lines[:insert_index] + block_content + target_lines[insert_index:]
-    with open(mock_file_to_create, "w", encoding=ENCODING) as mf:
-        mf.writelines(new_content)
+    # Insere o bloco no documento (a IR garante o '\n' na última linha do bloco)
+    document.insert_lines(insert_index, block_content)
     
     #if show_details:
     #    pos_desc = "before" if command_position == "BEFORE" else "after"
-    #    print(f"Inserted content {pos_desc} line {insert_index+1} in '{mock_file_to_create}'")
+    #    print(f"Inserted content {pos_desc} line {insert_index+1} in '{document.path}'")
 
-def insert_mock_original_content(original_file: str, mock_file_to_create: str, show_details: bool):
-    print("TODO: insert_mock_original_content")
+# Edição de linhas no arquivo de mock, em coordenadas do arquivo ainda não editado.
+#   start, end: intervalo de linhas (índices a partir de 0, end exclusivo) a ser substituído;
+#               quando start == end, é uma inserção antes da linha de índice 'start'.
+#   lines:      conteúdo que entra no lugar do intervalo.
+#   order:      desempate entre inserções na mesma posição (ver insertion_order()).
+#   src_line, cmd: linha e instrução de origem no arquivo __mock__ (para mensagens de erro).
+MockEdit = collections.namedtuple("MockEdit", "start end lines order src_line cmd")
+
+# Ordem das passadas no modo sequencial, usada para ordenar inserções na mesma posição
+PASS_TOP_BOTTOM = 1
+PASS_ADD = 2
+
+def insertion_order(anchored_after: bool, pass_rank: int, src_line: int) -> tuple:
+    """
+    Reproduz a ordem em que o modo sequencial deixaria inserções feitas na mesma posição:
+      - Inserções ancoradas na linha anterior (MOCK_TOP, __MOCK_ADD_AFTER_*) ficam em ordem
+        inversa à de processamento, pois cada nova inserção entra logo após a âncora;
+      - Inserções ancoradas na linha seguinte (MOCK_BOTTOM, __MOCK_ADD_BEFORE_*) ficam na ordem
+        de processamento e depois das ancoradas na linha anterior.
+    """
+    if anchored_after:
+        return (0, -pass_rank, -src_line)
+    return (1, pass_rank, src_line)
 
-def mock_text_replace(mock_file_cmds: str, mock_file_to_create: str, show_details: bool = False) -> None:
-    # Verifica se os arquivos existem
-    if not os.path.isfile(mock_file_cmds):
-        print(f"Error: Not Found Source File '{mock_file_cmds}'")
+def get_directive_resolution() -> str:
+    """
+    Modo de resolução das diretivas, definido por "directiveResolution" no config.json:
+      - "sequential" (padrão): resolve e aplica uma diretiva por vez, reprocessando o arquivo a cada edição;
+      - "batch": resolve todas as diretivas de um arquivo sobre um único parse e aplica as edições
+        de uma vez (ver mock_apply_batch()).
+    """
+    import runtime
+    mode = runtime.USER_CONFIGS.get("directiveResolution", "sequential")
+    if mode not in ("batch", "sequential"):
+        sys.exit(f"fatal: invalid 'directiveResolution' in .mockshadow/config.json: {mode}")
+    return mode
+
+def extract_symbol_lines(extract_type: str, extract_name: str, extra_args: str, document: MockDocument,
+                         line_number: int, mock_file_cmds: str, cmd: str) -> tuple:
+    """
+    Consulta o extractor e retorna (START_LINE, END_LINE) do símbolo no conteúdo atual de 'document'.
+    Em caso de erro, exibe a mensagem referente à instrução de mock e encerra.
+    """
+    document.materialize()
+    status, text_extracted = extractor_service.run_extractor(
+        [extract_type, extract_name, document.path] + extra_args.split())
+    text_extracted = text_extracted.strip()
+    if status != 0:
+        mock_err_msg(line_number, mock_file_cmds, cmd, text_extracted)
+        sys.exit(status)
+
+    # A saída deve estar no formato "<START_LINE>;<END_LINE>"
+    parts = text_extracted.split(";")
+    if len(parts) < 2:
+        print(f"Error: Could not parse extractor output: {text_extracted}")
         sys.exit(1)
-    if not os.path.isfile(mock_file_to_create):
-        print(f"Error: Mock File '{mock_file_to_create}'")
+    try:
+        return int(parts[0].strip()), int(parts[1].strip())
+    except ValueError:
+        print(f"Error: Invalid line numbers extracted: {text_extracted}")
         sys.exit(1)
-    
-    inside_mock_block = False
-    MOCK_CMD = ""
-    count = 0
-    REPLACE_MODE = ""
-    NEW_TEXT = ""
-    CURR_TEXT = ""
-    
-    # Lê todas as linhas do arquivo de comandos (preservando quebras de linha)
-    with open(mock_file_cmds, "r", encoding=ENCODING) as f:
-        cmds_lines = f.readlines()
-    
-    # Itera sobre cada linha (contabilizando o número da linha)
-    for line in cmds_lines:
-        count += 1
-        line = line.rstrip("\n")
-        
-        pattern = r"__MOCK_REPLACE_TEXT_(START|LINE): \s*(.*)"
-        m = re.search(pattern, line)
-        if m:
-            if inside_mock_block:
-                mock_err_msg(count, mock_file_cmds, MOCK_CMD, "Nested instruction, expected text to replace")
-                sys.exit(1)
-            
-            inside_mock_block = True
-            REPLACE_MODE = m.group(1)  # "START" ou "LINE"
-            CURR_TEXT = m.group(2)
-            MOCK_CMD = line
-            
-            if show_details:
-                print(f"      replace text [${CURR_TEXT}]")        
-        elif (line.strip() == "//__MOCK_REPLACE_TEXT_END" or REPLACE_MODE == "LINE"):
-            if not inside_mock_block:
-                mock_err_msg(count, mock_file_cmds, line, "Missing initial __MOCK_REPLACE_TEXT_START:")
-                sys.exit(1)
-                
-            if REPLACE_MODE == "LINE":
-                NEW_TEXT += line
-            NEW_TEXT = NEW_TEXT.rstrip()
-            content = ""
-            with open(mock_file_to_create, "r", encoding=ENCODING) as f:
-                content = f.read()
-            if content.count(CURR_TEXT) == 0:
-                mock_err_msg(count, mock_file_cmds, MOCK_CMD, f"Not found text to replace '${CURR_TEXT}'")
-                sys.exit(1)
-            content = content.replace(CURR_TEXT, NEW_TEXT)
-            with open(mock_file_to_create, 'w', encoding=ENCODING) as f:
-                f.write(content)
-        
-            NEW_TEXT = "" # reseta o conteúdo
-            REPLACE_MODE = ""  # Reseta o modo
-            inside_mock_block = False
-        elif inside_mock_block:
-            NEW_TEXT += line + "\n"
-
-    if inside_mock_block:
-        mock_err_msg(count, mock_file_cmds, MOCK_CMD, "Block not terminated properly.")
+
+def collect_remove_edits(ir: mock_ir.MockIR, document: MockDocument, show_details: bool) -> list:
+    """Equivalente em lote de mock_remove_content()."""
+    edits = []
+    for directive in ir.of_kind(mock_ir.REMOVE):
+        extra_args = "lines " + mount_extractor_extra_args(directive.extra_args)
+        if show_details:
+            print(f"      Remove original {directive.extract_type} '{directive.extract_name}'")
+        start_line, end_line = extract_symbol_lines(directive.extract_type, directive.extract_name, extra_args,
+                                                    document, directive.line, ir.mock_file, directive.cmd)
+        edits.append(MockEdit(start_line - 1, end_line, directive.content, None, directive.line, directive.cmd))
+    return edits
+
+def collect_replace_code_edits(ir: mock_ir.MockIR, document: MockDocument, show_details: bool) -> list:
+    """Equivalente em lote de mock_replace_code()."""
+    edits = []
+    for directive in ir.of_kind(mock_ir.REPLACE_CODE):
+        extra_args = "lines " + mount_extractor_extra_args(directive.extra_args)
+        if show_details:
+            print(f"      replace code {directive.extract_type} '{directive.extract_name}'")
+        DEST_START_LINE, DEST_END_LINE = extract_symbol_lines(directive.extract_type, directive.extract_name, extra_args,
+                                                              document, directive.end_line, ir.mock_file, directive.cmd)
+        edits.append(MockEdit(DEST_START_LINE - 1, DEST_END_LINE, directive.content, None, directive.line, directive.cmd))
+    return edits
+
+def top_or_bottom_insert_index(position: str, document: MockDocument) -> int:
+    """Posição (índice a partir de 0) onde um bloco MOCK_TOP/MOCK_BOTTOM é inserido."""
+    if position == "BOTTOM":
+        if document.path.endswith(".h"):
+            # Insere antes do último "#endif" (include guard)
+            endif_line = document.last_endif_line()
+            if endif_line is not None:
+                return max(0, endif_line - 1)
+            print("Aviso: Nenhum #endif encontrado. Inserindo no final do arquivo.")
+        return max(0, document.line_count() - 1)
+
+    if document.path.endswith(".h"):
+        # Insere logo após o primeiro "#define" (include guard)
+        define_line = document.first_define_line()
+        if define_line is not None:
+            return define_line + 1
+    return 0
+
+def collect_top_bottom_edits(ir: mock_ir.MockIR, document: MockDocument) -> list:
+    """
+    Equivalente em lote de insert_mock_top_or_bottom(). As posições são calculadas sobre o
+    documento já com as remoções e substituições aplicadas, como no modo sequencial.
+    """
+    edits = []
+    for directive in ir.of_kind(mock_ir.TOP_BOTTOM):
+        index = top_or_bottom_insert_index(directive.position, document)
+        order = insertion_order(directive.position == "TOP", PASS_TOP_BOTTOM, directive.line)
+        edits.append(MockEdit(index, index, directive.content, order, directive.line, directive.cmd))
+    return edits
+
+def collect_add_edits(ir: mock_ir.MockIR, document: MockDocument, show_details: bool) -> list:
+    """Equivalente em lote de mock_add_content_before_or_after()."""
+    edits = []
+    for directive in ir.of_kind(mock_ir.ADD):
+        extra_args = "lines " + mount_extractor_extra_args(directive.extra_args)
+        if show_details:
+            print(f"      add content {directive.position} {directive.extract_type} '{directive.extract_name}'")
+        DEST_START_LINE, DEST_END_LINE = extract_symbol_lines(directive.extract_type, directive.extract_name, extra_args,
+                                                              document, directive.line, ir.mock_file, directive.cmd)
+        index = DEST_START_LINE - 1 if directive.position == "BEFORE" else DEST_END_LINE
+        order = insertion_order(directive.position == "AFTER", PASS_ADD, directive.line)
+        edits.append(MockEdit(index, index, directive.content, order, directive.line, directive.cmd))
+    return edits
+
+def check_overlapping_edits(edits: list, mock_file_cmds: str):
+    """
+    Garante que as edições possam ser aplicadas de uma vez: intervalos substituídos não
+    podem se sobrepor e nenhuma inserção pode cair no meio de um intervalo substituído.
+    """
+    def overlap_error(edit, other):
+        mock_err_msg(edit.src_line, mock_file_cmds, edit.cmd,
+                     f"Range overlaps with '{other.cmd}' (line {other.src_line}), directives cannot be resolved in batch.\n"
+                     "Fix the directives or set \"directiveResolution\": \"sequential\" in .mockshadow/config.json")
         sys.exit(1)
 
+    replacements = sorted((e for e in edits if e.end > e.start), key=lambda e: (e.start, e.end))
+    for previous, current in zip(replacements, replacements[1:]):
+        if current.start < previous.end:
+            overlap_error(current, previous)
+
+    starts = [e.start for e in replacements]
+    for edit in edits:
+        if edit.end > edit.start:
+            continue
+        # Última substituição que começa antes da posição de inserção
+        i = bisect.bisect_left(starts, edit.start) - 1
+        if i >= 0 and edit.start < replacements[i].end:
+            overlap_error(edit, replacements[i])
+
+def shift_insertions(insertions: list, replacements: list) -> list:
+    """
+    Converte as posições das inserções para o conteúdo com as substituições já aplicadas.
+    Uma inserção no início de uma substituição fica antes do novo conteúdo; no fim, depois.
+    """
+    replacements = sorted(replacements, key=lambda e: e.start)
+    ends = [e.end for e in replacements]
+    deltas = [0]
+    for edit in replacements:
+        deltas.append(deltas[-1] + len(edit.lines) - (edit.end - edit.start))
+    shifted = []
+    for edit in insertions:
+        # Deslocamento acumulado das substituições que terminam antes da posição da inserção (ou nela)
+        index = edit.start + deltas[bisect.bisect_right(ends, edit.start)]
+        shifted.append(edit._replace(start=index, end=index))
+    return shifted
+
+def apply_mock_edits(document: MockDocument, edits: list):
+    """
+    Aplica as edições ao documento de uma só vez, com o mesmo resultado de aplicá-las de baixo
+    para cima (posições decrescentes): uma edição nunca desloca as linhas de outra. Inserções
+    na mesma posição são agrupadas conforme 'order' e ficam antes de uma substituição que comece ali.
+    """
+    insertions = {}
+    for edit in edits:
+        if edit.end == edit.start:
+            insertions.setdefault(edit.start, []).append(edit)
+
+    operations = [(e.start, e.end, e.lines) for e in edits if e.end > e.start]
+    for index, group in insertions.items():
+        group.sort(key=lambda e: e.order)
+        operations.append((index, index, [l for e in group for l in e.lines]))
+    document.apply_line_edits(operations)
+
+def mock_apply_batch(ir: mock_ir.MockIR, document: MockDocument, show_details: bool = False) -> None:
+    """
+    Versão em lote de mock_remove_content(), mock_replace_code(), insert_mock_top_or_bottom()
+    e mock_add_content_before_or_after().
+
+    As posições das remoções, substituições e inserções __MOCK_ADD_* são resolvidas sobre o mesmo
+    conteúdo do documento (um único parse pelo worker do extractor). Intervalos sobrepostos são
+    recusados, mesmo quando o modo sequencial os aceitaria. As substituições são aplicadas
+    primeiro; MOCK_TOP/MOCK_BOTTOM são então posicionados no conteúdo resultante, como no modo
+    sequencial, e todas as inserções são aplicadas de uma vez, em memória.
+    """
+    edits = []
+    edits += collect_remove_edits(ir, document, show_details)
+    edits += collect_replace_code_edits(ir, document, show_details)
+    if show_details:
+        for directive in ir.of_kind(mock_ir.TOP_BOTTOM):
+            print(f"      insert content at the {directive.position}")
+    edits += collect_add_edits(ir, document, show_details)
+    check_overlapping_edits(edits, ir.mock_file)
+
+    replacements = [e for e in edits if e.end > e.start]
+    insertions = [e for e in edits if e.end == e.start]
+    if replacements:
+        apply_mock_edits(document, replacements)
+        insertions = shift_insertions(insertions, replacements)
+    insertions += collect_top_bottom_edits(ir, document)
+    apply_mock_edits(document, insertions)
+
+def insert_mock_original_content(original_file: str, mock_file_to_create: str, show_details: bool):
+    print("TODO: insert_mock_original_content")
+
+def mock_text_replace(ir: mock_ir.MockIR, document: MockDocument, show_details: bool = False) -> None:
+    """
+    Substitui textos no documento do arquivo de mock conforme as instruções do arquivo __mock__ (ir):
+
+      __MOCK_REPLACE_TEXT_START: <texto atual>
+      ... (novo texto, multilinha) ...
+      //__MOCK_REPLACE_TEXT_END
+
+      __MOCK_REPLACE_TEXT_LINE: <texto atual>
+      ... (novo texto, uma única linha) ...
+
+    Todas as ocorrências do texto atual são substituídas, na ordem das instruções. As substituições
+    do arquivo são aplicadas juntas (ver MockDocument.replace_texts()). Os textos sem nenhuma
+    ocorrência são exibidos todos de uma vez, e a execução é encerrada.
+    """
+    directives = ir.of_kind(mock_ir.REPLACE_TEXT)
+    if not directives:
+        return
+    counts = document.replace_texts([(d.old_text, d.new_text) for d in directives])
+    for directive, count in zip(directives, counts):
+        if show_details:
+            print(f"      replace text [${directive.old_text}] ({count} occurrences)")
+    missing = [d for d, count in zip(directives, counts) if count == 0]
+    for directive in missing:
+        mock_err_msg(directive.end_line, ir.mock_file, directive.cmd, f"Not found text to replace '${directive.old_text}'")
+    if missing:
+        sys.exit(1)
+
+@tracing.traced("unmock")
 def unmock_project():
     """
     Remove todos os arquivos com extensão .c ou .h dentro de DIR_SHADOW_MOCKS,
@@ -942,7 +805,237 @@ def unmock_project():
     # Chama a função clone_project para recriar a árvore de diretórios
     clone_project()
 
-def mock_project(*args):
+def create_mock_file(mock_file: str, mock_file_to_create: str, original_file: str, show_details: bool = False):
+    """
+    Gera 'mock_file_to_create' a partir do arquivo __mock__ ('mock_file') e do arquivo original.
+    Depende apenas desses dois arquivos, podendo ser executada em paralelo para arquivos diferentes.
+    """
+    import runtime
+    mock_mode = check_file_mock_mode(mock_file)
+    rel_path = os.path.relpath(mock_file_to_create, runtime.DIR_MOCK_SHADOW_PROJECT)
+    print(f"  Creating {rel_path} (MOCK_MODE: {mock_mode})")
+
+    if mock_mode == "copy":
+        # O arquivo de mock é montado a partir do arquivo original sem copiá-lo para a memória (o
+        # documento guarda somente as edições). Ele só é escrito antes de uma consulta ao extractor
+        # (que lê o arquivo do disco) se tiver mudado, e no final. No modo "batch" todas as consultas
+        # são feitas antes das edições de linhas: no máximo uma escrita intermediária (após as
+        # substituições de texto) e a final.
+        with MockDocument.from_file(original_file, mock_file_to_create) as document:
+            # O __mock__ é analisado uma única vez (ou lido do cache); todas as passadas consomem a mesma IR
+            ir = mock_ir.load_mock_ir(mock_file)
+            # Processa as seções: remove, replace, insert top/bottom, add before/after
+            mock_text_replace(ir, document, show_details)
+            if get_directive_resolution() == "batch":
+                mock_apply_batch(ir, document, show_details)
+            else:
+                mock_remove_content(ir, document, show_details)
+                mock_replace_code(ir, document, show_details)
+                insert_mock_top_or_bottom(ir, document, show_details)
+                mock_add_content_before_or_after(ir, document, show_details)
+            document.save()
+    else:
+        # Cria o arquivo de mock com o conteúdo do arquivo __mock__
+        shutil.copy2(mock_file, mock_file_to_create)
+        # Insere seções do conteúdo original no arquivo mockado
+        insert_mock_original_content(original_file, mock_file_to_create, show_details)
+
+def run_mock_task(task: tuple) -> tuple:
+    """
+    Executa create_mock_file() para uma tarefa (mock_file, mock_file_to_create, original_file, show_details),
+    capturando tudo que for impresso. Um sys.exit() dentro da geração não encerra o processo,
+    vira o status de retorno. Retorna (status, saida, headers incluídos pelos parses do extractor
+    ou None se desconhecidos).
+    """
+    import runtime
+    output = io.StringIO()
+    status = 0
+    extractor_service.take_includes()
+    rel_path = os.path.relpath(task[1], runtime.DIR_MOCK_SHADOW_PROJECT)
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output), \
+            tracing.span(rel_path, tracing.CATEGORY_FILE):
+        try:
+            create_mock_file(*task)
+        except SystemExit as e:
+            if e.code is None:
+                status = 0
+            elif isinstance(e.code, int):
+                status = e.code
+            else:
+                print(e.code)
+                status = 1
+        except Exception:
+            traceback.print_exc()
+            status = 1
+    includes = extractor_service.take_includes()
+    return status, output.getvalue(), sorted(includes) if includes is not None else None
+
+def run_pooled_mock_task(task: tuple) -> tuple:
+    """run_mock_task() em um processo do pool: retorna também os spans registrados nele."""
+    return run_mock_task(task) + (tracing.take_events(),)
+
+def init_mock_worker(trace_enabled: bool = False, project=None):
+    """
+    Inicializador dos processos do pool: cada processo usa o seu próprio worker do extractor,
+    e o mesmo projeto do processo que criou o pool.
+    """
+    import runtime
+    if project is not None:
+        runtime.adopt(project)
+    extractor_service.forget_extractor()
+    tracing.reset(trace_enabled)
+
+def get_default_jobs() -> int:
+    return os.cpu_count() or 1
+
+def run_mock_tasks(tasks: list, jobs: int) -> tuple:
+    """
+    Gera os arquivos de mock das tarefas, em paralelo quando jobs > 1.
+    A saída de cada arquivo é exibida agrupada e na ordem das tarefas.
+    Retorna (tarefas que falharam, headers incluídos na geração de cada arquivo).
+    """
+    import runtime
+    failed = []
+    includes_by_output = {}
+    if jobs <= 1 or len(tasks) <= 1:
+        results = (run_mock_task(task) + ([],) for task in tasks)
+        executor = None
+    else:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=min(jobs, len(tasks)), initializer=init_mock_worker,
+                                                          initargs=(tracing.enabled(), runtime.current_project()))
+        results = executor.map(run_pooled_mock_task, tasks)
+    try:
+        for task, (status, output, includes, events) in zip(tasks, results):
+            tracing.add_events(events)
+            includes_by_output[task[1]] = includes
+            print(output, end="")
+            if status != 0:
+                failed.append((task, status))
+                # Não deixa um arquivo de mock gerado pela metade
+                if os.path.isfile(task[1]):
+                    os.remove(task[1])
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return failed, includes_by_output
+
+def mock_file_targets(mock_file: str) -> tuple:
+    """
+    Para um arquivo __mock__, retorna (arquivo de mock a ser gerado, arquivo original correspondente,
+    caminho do arquivo gerado relativo a DIR_SHADOW_MOCKS).
+    """
+    import runtime
+    mock_dir = os.path.dirname(mock_file)
+    original_basename = os.path.basename(mock_file).replace("__mock__", "")
+    mock_file_to_create = os.path.join(mock_dir, original_basename)
+    # Remove DIR_SHADOW_MOCKS do caminho e junta com DIR_ORIGINAL_PROJECT para obter o arquivo original
+    partial_dir = os.path.relpath(mock_dir, runtime.DIR_SHADOW_MOCKS)
+    original_file = os.path.join(runtime.USER_ENV.get("originalProject"), partial_dir, original_basename)
+    rel_path = os.path.relpath(mock_file_to_create, runtime.DIR_SHADOW_MOCKS).replace("\\", "/")
+    return mock_file_to_create, original_file, rel_path
+
+def mock_file_of(rel_path: str) -> str:
+    """Arquivo __mock__ que gera o arquivo 'rel_path' (relativo a DIR_SHADOW_MOCKS)."""
+    import runtime
+    mock_dir, basename = os.path.split(os.path.join(runtime.DIR_SHADOW_MOCKS, rel_path))
+    return os.path.join(mock_dir, "__mock__" + basename)
+
+def find_mock_files() -> list:
+    """Todos os arquivos .c e .h que iniciam com "__mock__" em DIR_SHADOW_MOCKS."""
+    import runtime
+    mock_files = []
+    for root, dirs, files in os.walk(runtime.DIR_SHADOW_MOCKS):
+        for filename in files:
+            if (filename.endswith(".c") or filename.endswith(".h")) and filename.startswith("__mock__"):
+                mock_files.append(os.path.join(root, filename))
+    return mock_files
+
+@tracing.traced("mock generation")
+def generate_mock_files(mock_files: list, cache_entries: dict, show_details: bool, jobs: int,
+                        changed_originals: set = None) -> tuple:
+    """
+    Gera os arquivos de mock de 'mock_files' cuja chave de cache mudou, ou cujos headers incluídos
+    na última geração mudaram; os demais são mantidos (ou restaurados do cache). 'changed_originals'
+    são os arquivos originais que podem ter mudado segundo o git (None: desconhecido).
+    Retorna (entradas do cache desses arquivos, tarefas executadas, tarefas que falharam,
+    hashes dos arquivos __mock__).
+    """
+    import runtime
+    original_project = runtime.USER_ENV.get("originalProject")
+    entries = {}
+    tasks = []
+    task_keys = {}
+    mock_digests = set()
+    digests = {}
+
+    def current_digest(path, recorded=None):
+        """Hash atual de um header incluído (cada arquivo é lido no máximo uma vez)."""
+        if path not in digests:
+            rel = None
+            if path.startswith(original_project + os.sep):
+                rel = os.path.relpath(path, original_project).replace("\\", "/")
+            if (recorded is not None and changed_originals is not None and rel is not None
+                    and not project_sync.path_in_changed(rel, changed_originals)):
+                # Header do projeto original que o git garante não ter mudado
+                digests[path] = recorded
+            else:
+                digests[path] = mock_cache.include_digest(path)
+        return digests[path]
+
+    for mock_file in mock_files:
+        mock_file_to_create, original_file, rel_path = mock_file_targets(mock_file)
+        validate_file_exists(original_file)
+
+        # Só gera novamente se o conteúdo do __mock__, do original, dos headers incluídos ou as flags mudaram
+        original_digest = None
+        if changed_originals is not None and not project_sync.path_in_changed(rel_path, changed_originals):
+            # O git garante que o original não mudou: reaproveita o hash registrado
+            original_digest = cache_entries.get(rel_path, {}).get("original")
+        mock_digest = mock_cache.file_digest(mock_file)
+        mock_digests.add(mock_digest)
+        key, original_digest = mock_cache.mock_cache_key(rel_path, mock_file, original_file, original_digest,
+                                                         mock_digest)
+        if (mock_cache.is_up_to_date(cache_entries, rel_path, key, mock_file_to_create)
+                and not mock_cache.includes_changed(cache_entries[rel_path], current_digest)):
+            entries[rel_path] = cache_entries[rel_path]
+            continue
+        tasks.append((mock_file, mock_file_to_create, original_file, show_details))
+        task_keys[mock_file_to_create] = (rel_path, key, original_digest)
+
+    # Um arquivo que incluiu outro mock gerado nesta execução também é gerado novamente
+    regenerated = {os.path.abspath(task[1]) for task in tasks}
+    dependents = mock_cache.dependent_entries(entries, regenerated)
+    while dependents:
+        for rel_path in sorted(dependents):
+            entry = entries.pop(rel_path)
+            mock_file = mock_file_of(rel_path)
+            mock_file_to_create, original_file, _ = mock_file_targets(mock_file)
+            tasks.append((mock_file, mock_file_to_create, original_file, show_details))
+            task_keys[mock_file_to_create] = (rel_path, entry["key"], entry.get("original"))
+            regenerated.add(os.path.abspath(mock_file_to_create))
+        dependents = mock_cache.dependent_entries(entries, regenerated)
+
+    # Cada arquivo depende apenas do seu __mock__ e do seu original: gera em paralelo
+    tasks.sort(key=lambda task: task[0])
+    failed, includes_by_output = run_mock_tasks(tasks, jobs)
+
+    # Registra no cache os arquivos gerados com sucesso, com os hashes atuais dos headers incluídos
+    digests.clear()
+    failed_outputs = {task[1] for task, status in failed}
+    for task in tasks:
+        if task[1] not in failed_outputs:
+            rel_path, key, original_digest = task_keys[task[1]]
+            includes = includes_by_output.get(task[1])
+            if includes is not None:
+                includes = {path: current_digest(path) for path in includes}
+            mock_cache.store_output(entries, rel_path, key, task[1], original_digest, includes)
+    return entries, tasks, failed, mock_digests
+
+def mock_project(*args, jobs: int = None, keep_extractor: bool = False):
+    """
+    'mockshadow mock': sincroniza o TEMP_PROJECT, gera os mocks e os instala. Com 'keep_extractor'
+    o worker do extractor continua ativo para as próximas gerações no mesmo processo.
+    """
     import runtime
     # Parse arguments
     show_details = False
@@ -952,6 +1045,8 @@ def mock_project(*args):
             show_details = True
         elif arg == "remock":
             is_remock = True
+    if jobs is None:
+        jobs = get_default_jobs()
 
     proj_basename = os.path.basename(runtime.USER_ENV.get("originalProject", ""))
 
@@ -962,74 +1057,71 @@ def mock_project(*args):
         clone_project(True)
 
     print("Creating Mock Files ...")
-    last_mock_timestamp = runtime.USER_ENV.get("lastMockTimestamp", 0)
+    cache_entries, cache_git_state = mock_cache.load_manifest()
+    # Arquivos originais que podem ter mudado desde o último mock, segundo o git (None: desconhecido)
+    git_state, changed_originals = project_sync.git_changed_paths(runtime.USER_ENV.get("originalProject"),
+                                                                  cache_git_state)
 
     # Itera sobre todos os arquivos .c e .h que iniciam com "__mock__" em DIR_SHADOW_MOCKS
-    for root, dirs, files in os.walk(runtime.DIR_SHADOW_MOCKS):
-        for filename in files:
-            if (filename.endswith(".c") or filename.endswith(".h")) and filename.startswith("__mock__"):
-                mock_file = os.path.join(root, filename)
-                mock_dir = os.path.dirname(mock_file)
-                mock_basename = os.path.basename(mock_file)
-                original_basename = mock_basename.replace("__mock__", "")
-                mock_file_to_create = os.path.join(mock_dir, original_basename)
-
-                # Remove DIR_SHADOW_MOCKS do caminho e junta com DIR_ORIGINAL_PROJECT para obter o arquivo original
-                partial_dir = os.path.relpath(mock_dir, runtime.DIR_SHADOW_MOCKS)
-                original_file = os.path.join(runtime.USER_ENV.get("originalProject"), partial_dir, original_basename)
-                validate_file_exists(original_file)
-
-                
-                if ((not os.path.isfile(mock_file_to_create)) or                # Se o arquivo a ser criado não existe 
-                    (os.stat(mock_file).st_mtime > last_mock_timestamp) or      # ou se o arquivo __mock__ foi modificado após o último mock
-                    (os.stat(original_file).st_mtime > last_mock_timestamp)):   # ou se o arquivo original foi modificado após o último mock
-
-                    mock_mode = check_file_mock_mode(mock_file)
-                    rel_path = os.path.relpath(mock_file_to_create, runtime.DIR_MOCK_SHADOW_PROJECT)
-                    print(f"  Creating {rel_path} (MOCK_MODE: {mock_mode})")
-
-                    if mock_mode == "copy":
-                        # Cria o arquivo de mock como cópia do arquivo original
-                        shutil.copy2(original_file, mock_file_to_create)
-                        # Processa as seções: remove, replace, insert top/bottom, add before/after
-                        mock_text_replace(mock_file, mock_file_to_create, show_details)
-                        mock_remove_content(mock_file, mock_file_to_create, show_details)
-                        mock_replace_code(mock_file, mock_file_to_create, show_details)
-                        insert_mock_top_or_bottom(mock_file, mock_file_to_create, show_details)
-                        mock_add_content_before_or_after(mock_file, mock_file_to_create, show_details)
-                    else:
-                        # Cria o arquivo de mock com o conteúdo do arquivo __mock__
-                        shutil.copy2(mock_file, mock_file_to_create)
-                        # Insere seções do conteúdo original no arquivo mockado
-                        insert_mock_original_content(original_file, mock_file_to_create, show_details)
-
-    # Atualiza o timestamp do último mock
-    last_mock_timestamp = int(time.time())
-    update_user_env_param("lastMockTimestamp", last_mock_timestamp)
+    new_cache_entries, tasks, failed, mock_digests = generate_mock_files(find_mock_files(), cache_entries, show_details,
+                                                                         jobs, changed_originals)
+
+    # Encerra o worker do extractor, não será mais usado nesta execução
+    if not keep_extractor:
+        extractor_service.stop_extractor()
+
+    mock_cache.save_manifest(new_cache_entries, git_state)
+    # Descarta as IRs de arquivos __mock__ que foram alterados ou removidos
+    mock_ir.prune_cache(mock_digests)
+
+    if failed:
+        print(f"Error: failed to create {len(failed)} of {len(tasks)} mock file(s):")
+        for task, status in failed:
+            print(f"  {os.path.relpath(task[1], runtime.DIR_MOCK_SHADOW_PROJECT)}")
+        sys.exit(failed[0][1])
+
     print("Creating Mock Files Complete!")
 
     print(f"Mocking {os.path.basename(runtime.DIR_TEMP_PROJECT)} ...")
     # Itera sobre os mocks em DIR_SHADOW_MOCKS que são .c ou .h, mas não começam com "__mock__"
-    for root, dirs, files in os.walk(runtime.DIR_SHADOW_MOCKS):
-        for filename in files:
-            if (filename.endswith(".c") or filename.endswith(".h")) and not filename.startswith("__mock__"):
-                mock_file = os.path.join(root, filename)
-                proj_file = os.path.relpath(mock_file, runtime.DIR_SHADOW_MOCKS)
-                project_file_to_replace = os.path.join(runtime.DIR_TEMP_PROJECT, proj_file)
-
-                basename_project_to_mock = os.path.basename(runtime.DIR_TEMP_PROJECT)
-                print(f"  Mocking {os.path.join(basename_project_to_mock, proj_file)}")
-                file_basename = os.path.basename(proj_file)
-                if file_basename.startswith("__additional__"):
-                    # Arquivos __additional__ são copiados para o projeto
-                    os.makedirs(os.path.dirname(project_file_to_replace), exist_ok=True)
-                    shutil.copy2(mock_file, project_file_to_replace)
-                else:
-                    original_file = os.path.join(runtime.USER_ENV.get("originalProject"), proj_file)
-                    validate_file_exists(original_file)
-                    # Substitui o arquivo original pela versão mockada
-                    shutil.copy2(mock_file, project_file_to_replace)
-    print(f"Mocking {os.path.basename(runtime.DIR_TEMP_PROJECT)} Complete!")
+    installed = 0
+    rewritten = 0
+    with tracing.span(f"install into {os.path.basename(runtime.DIR_TEMP_PROJECT)}", tracing.CATEGORY_PHASE):
+        for root, dirs, files in os.walk(runtime.DIR_SHADOW_MOCKS):
+            for filename in files:
+                if (filename.endswith(".c") or filename.endswith(".h")) and not filename.startswith("__mock__"):
+                    installed += 1
+                    if install_mock_file(os.path.join(root, filename)):
+                        rewritten += 1
+    print(f"Mocking {os.path.basename(runtime.DIR_TEMP_PROJECT)} Complete! "
+          f"({rewritten} of {installed} files rewritten)")
+
+def install_mock_file(mock_file: str) -> bool:
+    """
+    Copia para o TEMP_PROJECT um arquivo de DIR_SHADOW_MOCKS que não seja __mock__: um mock gerado
+    (substitui o arquivo original) ou um arquivo __additional__. Um destino que já tenha o mesmo
+    conteúdo não é reescrito, preservando a sua data de modificação. Retorna True se o arquivo foi escrito.
+    """
+    import runtime
+    proj_file = os.path.relpath(mock_file, runtime.DIR_SHADOW_MOCKS)
+    project_file_to_replace = os.path.join(runtime.DIR_TEMP_PROJECT, proj_file)
+
+    file_basename = os.path.basename(proj_file)
+    if file_basename.startswith("__additional__"):
+        # Arquivos __additional__ são copiados para o projeto
+        os.makedirs(os.path.dirname(project_file_to_replace), exist_ok=True)
+    else:
+        original_file = os.path.join(runtime.USER_ENV.get("originalProject"), proj_file)
+        validate_file_exists(original_file)
+    if project_sync.same_content(mock_file, project_file_to_replace):
+        return False
+
+    basename_project_to_mock = os.path.basename(runtime.DIR_TEMP_PROJECT)
+    print(f"  Mocking {os.path.join(basename_project_to_mock, proj_file)}")
+    # Substitui o arquivo original pela versão mockada (sem escrever através de links)
+    with tracing.span("install", tracing.CATEGORY_WRITE, file=project_file_to_replace):
+        project_sync.replace_file(mock_file, project_file_to_replace)
+    return True
 
 def create_mockshadow_project(project_name):
     # Verifica se o nome do projeto é válido
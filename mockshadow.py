@@ -27,16 +27,82 @@ run_list = False
 run_clone_tree = False
 run_clone_project = False
 run_open_mock = False
+run_watch = False
+# 'exec --diff': compara as medições com a execução anterior; argumentos após '--' vão para o executável
+exec_diff = False
+exec_args = []
+# 'test': executa os cenários do config.json (ver scenario_runner.py)
+run_test = False
+test_shard = None
+expect_shard = False
+junit_path = None
+expect_junit = False
+json_path = None
+expect_json = False
 open_mock_file = ""
+# 'index' / 'find <símbolo>': índice de símbolos do projeto original (ver symbol_index.py)
+run_index = False
+run_find = False
+find_symbol = ""
+# 'cache stats' / 'cache clear'
+run_cache = False
+cache_command = ""
+mock_jobs = None
+expect_jobs = False
+# '--profile' / '--trace arquivo.json': registra a duração de cada fase (ver tracing.py)
+trace_path = None
+expect_trace = False
+DEFAULT_TRACE_PATH = os.path.join(".mockshadow", "trace.json")
+
+def parse_jobs(value):
+    """Valida o valor de '--jobs N' (número de processos para gerar os mocks)."""
+    try:
+        jobs = int(value)
+    except ValueError:
+        jobs = 0
+    if jobs < 1:
+        print(f"Error: invalid value for --jobs: '{value}'")
+        sys.exit(1)
+    return jobs
 
 # Processa os argumentos da linha de comando
-for arg in sys.argv[1:]:
+cli_args = sys.argv[1:]
+if "--" in cli_args:
+    separator = cli_args.index("--")
+    cli_args, exec_args = cli_args[:separator], cli_args[separator + 1:]
+for arg in cli_args:
     if run_create_project:
         create_project_name = arg
         break
     if run_open_mock:
         open_mock_file = arg
         break
+    if run_cache:
+        cache_command = arg
+        break
+    if run_find:
+        find_symbol = arg
+        break
+    if expect_jobs:
+        mock_jobs = parse_jobs(arg)
+        expect_jobs = False
+        continue
+    if expect_trace:
+        trace_path = arg
+        expect_trace = False
+        continue
+    if expect_shard:
+        test_shard = arg
+        expect_shard = False
+        continue
+    if expect_junit:
+        junit_path = arg
+        expect_junit = False
+        continue
+    if expect_json:
+        json_path = arg
+        expect_json = False
+        continue
 
     if arg == "version":
         run_version = True
@@ -70,12 +136,67 @@ for arg in sys.argv[1:]:
         run_clone_project = True
     elif arg == "open-mock":
         run_open_mock = True
+    elif arg == "watch":
+        run_watch = True
+    elif arg == "test":
+        run_test = True
+    elif arg == "cache":
+        run_cache = True
+    elif arg == "index":
+        run_index = True
+    elif arg == "find":
+        run_find = True
+    elif arg in ("--jobs", "-j"):
+        expect_jobs = True
+    elif arg.startswith("--jobs="):
+        mock_jobs = parse_jobs(arg.split("=", 1)[1])
+    elif arg == "--diff":
+        exec_diff = True
+    elif arg == "--shard":
+        expect_shard = True
+    elif arg.startswith("--shard="):
+        test_shard = arg.split("=", 1)[1]
+    elif arg == "--junit":
+        expect_junit = True
+    elif arg.startswith("--junit="):
+        junit_path = arg.split("=", 1)[1]
+    elif arg == "--json":
+        expect_json = True
+    elif arg.startswith("--json="):
+        json_path = arg.split("=", 1)[1]
+    elif arg == "--profile":
+        trace_path = trace_path or DEFAULT_TRACE_PATH
+    elif arg == "--trace":
+        expect_trace = True
+    elif arg.startswith("--trace="):
+        trace_path = arg.split("=", 1)[1]
     else:
         print(f"Warning: Unknown argument '{arg}'")
 
+if expect_jobs:
+    print("Error: missing value for --jobs")
+    sys.exit(1)
+if expect_trace or trace_path == "":
+    print("Error: missing file for --trace")
+    sys.exit(1)
+
+if expect_shard:
+    print("Error: missing value for --shard")
+    sys.exit(1)
+if expect_junit or junit_path == "":
+    print("Error: missing file for --junit")
+    sys.exit(1)
+if expect_json or json_path == "":
+    print("Error: missing file for --json")
+    sys.exit(1)
+
+if trace_path:
+    import tracing
+    tracing.enable(trace_path)
+
 # Executa as funções de acordo com as flags
 if run_version:
-    print("mockshadow version 1.0")
+    print(f"mockshadow version {mock_utils.MOCKSHADOW_VERSION}")
     sys.exit(0)
 
 if run_create_project:
@@ -99,45 +220,55 @@ if run_open_mock:
     open_mock.open_mock(open_mock_file)
     sys.exit(0)
 
+if run_cache:
+    import mock_cache
+    if cache_command == "stats":
+        mock_cache.print_cache_stats()
+    elif cache_command == "clear":
+        mock_cache.clear_cache()
+    else:
+        print("Usage: mockshadow cache stats|clear")
+        sys.exit(1)
+    sys.exit(0)
+
+if run_index:
+    import symbol_index
+    symbol_index.update_index(jobs=mock_jobs)
+    sys.exit(0)
+
+if run_find:
+    import symbol_index
+    symbol_index.find_symbol(find_symbol)
+    sys.exit(0)
+
+if run_watch:
+    import watch
+    watch.watch_project(show_details, jobs=mock_jobs)
+    sys.exit(0)
+
 if run_mock or run_remock:
     mock_args = []
     if show_details:
         mock_args.append("details")
     if run_remock:
         mock_args.append("remock")
-    mock_utils.mock_project(*mock_args)
+    mock_utils.mock_project(*mock_args, jobs=mock_jobs)
 
 if run_build or run_rebuild:
-    print("TODO: run_build and run_rebuild")
-    """     
-    import runtime
-    build_dir = os.path.join(runtime.DIR_MOCK_SHADOW_PROJECT, "build")
-    # Se rebuild, remove o diretório build
-    if run_rebuild:
-        # Usa a função já convertida para remover diretórios
-        mock_utils.remove_directory( build_dir )
-    # Se o diretório build não existir, cria-o
-    if not os.path.isdir(build_dir):
-        os.mkdir(build_dir)
-    os.chdir(build_dir)
-    print("Generating Makefile with CMake")
-    subprocess.run(["cmake", "../"], check=True)
-    print("Building Project...")
-    subprocess.run(["make"], check=True)
-    os.chdir(script_mockshadow_dir) """
-
-if run_exec or run_debug:
-    print("TODO: run_exec and run_debug")
-    """ 
-    import runtime
-    print("Executing Target...")
-    os.chdir(runtime.DIR_MOCK_SHADOW_PROJECT)
-    target_dir=os.path.join(runtime.DIR_MOCK_SHADOW_PROJECT, "build/executable")
-    if run_exec:
-        subprocess.run([target_dir], check=True)
-    else:
-        subprocess.run(["gdb", "-q", "--args", target_dir], check=True)
-    os.chdir(script_mockshadow_dir) """
+    import build_runner
+    build_runner.build_project(rebuild=run_rebuild, jobs=mock_jobs)
+
+if run_exec:
+    import exec_runner
+    exec_runner.exec_project(exec_args, show_diff=exec_diff)
+elif run_debug:
+    import exec_runner
+    exec_runner.debug_project(exec_args)
+
+if run_test:
+    import scenario_runner
+    shard = scenario_runner.parse_shard(test_shard) if test_shard is not None else None
+    scenario_runner.run_tests(jobs=mock_jobs, shard=shard, junit_path=junit_path, json_path=json_path)
 
 if run_unmock:
     mock_utils.unmock_project()
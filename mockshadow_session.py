@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+#  API Python do mockshadow, para uso sem a linha de comando (ex.: em uma suíte pytest).
+#
+#    with MockShadowSession("caminho/do/projeto") as session:
+#        session.mock()
+#        session.build()
+#
+#  Cada sessão trabalha no seu projeto (runtime.activate()), sem depender do diretório atual,
+#  e várias sessões podem existir no mesmo processo. O worker do extractor e os caches ficam
+#  ativos entre as chamadas da sessão, até close(). O env.json e o config.json são lidos
+#  novamente a cada chamada. Um erro que encerraria a linha de comando (sys.exit) vira
+#  MockShadowError.
+
+import contextlib
+import os
+import extractor_cache
+import extractor_service
+import mock_utils
+import project_sync
+import runtime
+
+class MockShadowError(Exception):
+    """Falha de uma operação da sessão. 'status' é o código de saída que a linha de comando usaria."""
+    def __init__(self, status: int, message: str = ""):
+        super().__init__(message or f"mockshadow failed with exit status {status}")
+        self.status = status
+
+class MockShadowSession:
+    def __init__(self, project_dir: str, show_details: bool = False, jobs: int = None):
+        if not os.path.isfile(os.path.join(project_dir, ".mockshadow", "config.json")):
+            raise MockShadowError(1, f"not a mockshadow project (missing .mockshadow/config.json): {project_dir}")
+        self.project = runtime.Project(project_dir)
+        self.show_details = show_details
+        # Processos para gerar os mocks ('--jobs'); com 1, toda a geração usa o worker da sessão
+        self.jobs = jobs
+
+    @contextlib.contextmanager
+    def _operation(self):
+        """Executa uma operação no projeto da sessão, convertendo sys.exit() em MockShadowError."""
+        self.project.reload()
+        project_sync.forget_git_snapshots()
+        with runtime.activate(self.project):
+            try:
+                yield
+            except SystemExit as e:
+                if e.code is None or e.code == 0:
+                    return
+                if isinstance(e.code, int):
+                    raise MockShadowError(e.code) from None
+                raise MockShadowError(1, str(e.code)) from None
+
+    def clone(self):
+        """Copia o projeto original para o TEMP_PROJECT ('mockshadow clone-project')."""
+        with self._operation():
+            mock_utils.clone_project()
+
+    def mock(self, paths: list = None, remock: bool = False):
+        """
+        Sem 'paths': 'mockshadow mock' (ou 'remock'). Com 'paths', depois de um mock completo, processa
+        somente esses arquivos alterados, como o 'watch' faria: arquivos __mock__ e __additional__ de
+        MOCK_TREE ou arquivos do projeto original, absolutos ou relativos ao projeto mockshadow.
+        """
+        import watch
+        with self._operation():
+            if paths is None:
+                mock_args = ["details"] if self.show_details else []
+                if remock:
+                    mock_args.append("remock")
+                mock_utils.mock_project(*mock_args, jobs=self.jobs, keep_extractor=True)
+                return
+            changed = {os.path.abspath(os.path.join(self.project.project_dir, path)) for path in paths}
+            failed = watch.apply_changes(changed, self.show_details)
+            if failed:
+                raise MockShadowError(1, f"failed to create {failed} mock file(s)")
+
+    def unmock(self):
+        """Remove os mocks gerados e restaura o TEMP_PROJECT ('mockshadow unmock')."""
+        with self._operation():
+            mock_utils.unmock_project()
+
+    def list(self) -> list:
+        """Arquivos __mock__ e __additional__ do projeto, relativos ao projeto mockshadow."""
+        with self._operation():
+            return mock_utils.find_mock_list()
+
+    def build(self, rebuild: bool = False):
+        """'mockshadow build' (ou 'rebuild'); retorna os tempos do build (build_runner.BuildTimings)."""
+        import build_runner
+        with self._operation():
+            return build_runner.build_project(rebuild=rebuild, jobs=self.jobs)
+
+    def close(self):
+        """Encerra o worker do extractor da sessão e fecha o cache de resultados."""
+        with runtime.activate(self.project):
+            extractor_service.stop_extractor()
+            extractor_cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
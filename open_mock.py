@@ -1,4 +1,5 @@
 import os
+import re
 import sys
 import subprocess
 import tkinter as tk
@@ -17,6 +18,14 @@ def get_clipboard_content():
         return ""
 
 def open_mock(original_file: str):
+    # Um nome de símbolo (ex.: "HAL_UART_Init") é procurado no índice de símbolos
+    if not os.path.isfile(original_file) and re.fullmatch(r"[A-Za-z_]\w*", original_file):
+        import symbol_index
+        rel_path = symbol_index.resolve_symbol_file(original_file)
+        if rel_path is not None:
+            open_mock_file(rel_path)
+            return
+
     # Caminho do arquivo original
     if not os.path.isfile(original_file):
         print(f"Arquivo '{original_file}' não encontrado.")
@@ -50,9 +59,13 @@ def open_mock(original_file: str):
         print("Erro: o arquivo não está dentro do diretório TEMP_PROJECT ou do diretório MOCK_TREE.")
         sys.exit(1)
     
+    open_mock_file(rel_path)
+
+def open_mock_file(rel_path: str):
+    """Cria (se preciso) e abre o arquivo __mock__ do arquivo 'rel_path' (relativo ao projeto)."""
     # Obtém o caminho relativo (ex.: "path/to/file.c")
     rel_dir = os.path.dirname(rel_path)
-    original_filename = os.path.basename(original_file)
+    original_filename = os.path.basename(rel_path)
     
     # Cria a mesma estrutura de diretórios em MOCK_TREE
     target_dir = os.path.join(runtime.DIR_SHADOW_MOCKS, rel_dir)
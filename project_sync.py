@@ -0,0 +1,505 @@
+#!/usr/bin/env python3
+#  Materialização dos arquivos do projeto original dentro do TEMP_PROJECT.
+#
+#  A estratégia é definida por "cloneStrategy" no .mockshadow/config.json:
+#    - "copy"     (padrão): cópia completa de cada arquivo;
+#    - "reflink":  cópia copy-on-write (FICLONE), quando o sistema de arquivos suporta;
+#    - "hardlink": hard link para arquivos que nunca são mockados, cópia para os demais;
+#    - "auto":     reflink quando suportado, senão hardlink para os arquivos nunca mockados,
+#                  senão cópia.
+#
+#  Com "shadowMode": "symlink", o TEMP_PROJECT vira um esqueleto de diretórios em que cada
+#  arquivo é um link simbólico para o arquivo correspondente no projeto original; somente os
+#  arquivos escritos pelo mockshadow (mocks e __additional__) são arquivos reais.
+#
+#  Arquivos que o mockshadow sobrescreve no TEMP_PROJECT nunca compartilham o inode com o
+#  projeto original: antes de sobrescrever, replace_file() desfaz o link.
+#
+#  A sincronização incremental (sync_tree) percorre o projeto original com os.scandir e
+#  compara cada arquivo com o manifesto da última sincronização
+#  (.mockshadow/cache/sync_manifest.json), copiando somente o que mudou e removendo do
+#  TEMP_PROJECT os arquivos que não existem mais na origem. Diretórios '.git' não são copiados.
+#
+#  Quando o projeto original é um repositório git, o estado do repositório (commit e arquivos
+#  modificados) é registrado a cada sincronização. Na seguinte, o git informa quais caminhos
+#  podem ter mudado desde então e somente eles são visitados (ver git_changed_paths()).
+#  Se o diretório não for um repositório, ou o git não estiver disponível, todo o projeto é
+#  percorrido.
+
+import filecmp
+import json
+import os
+import shutil
+import stat
+import subprocess
+import sys
+import tracing
+
+CLONE_STRATEGIES = ("copy", "reflink", "hardlink", "auto")
+SHADOW_MODES = ("copy", "symlink")
+
+# ioctl FICLONE do Linux (_IOW(0x94, 9, int))
+FICLONE = 0x40049409
+
+# None: ainda não testado; False: o sistema de arquivos não suporta reflink
+_reflink_supported = None
+# False quando o sistema não permite criar links simbólicos (ex.: Windows sem privilégio)
+_symlink_supported = True
+
+def get_clone_strategy() -> str:
+    import runtime
+    strategy = runtime.USER_CONFIGS.get("cloneStrategy", "copy")
+    if strategy not in CLONE_STRATEGIES:
+        sys.exit(f"fatal: invalid 'cloneStrategy' in .mockshadow/config.json: {strategy}")
+    return strategy
+
+def get_shadow_mode() -> str:
+    import runtime
+    mode = runtime.USER_CONFIGS.get("shadowMode", "copy")
+    if mode not in SHADOW_MODES:
+        sys.exit(f"fatal: invalid 'shadowMode' in .mockshadow/config.json: {mode}")
+    return mode
+
+def get_mocked_paths() -> set:
+    """
+    Caminhos (relativos ao TEMP_PROJECT, separados por '/') dos arquivos que o mockshadow
+    escreve no TEMP_PROJECT: os gerados a partir de um __mock__ e os __additional__.
+    """
+    import runtime
+    mocked = set()
+    for root, dirs, files in os.walk(runtime.DIR_SHADOW_MOCKS):
+        rel_root = os.path.relpath(root, runtime.DIR_SHADOW_MOCKS).replace("\\", "/")
+        for filename in files:
+            if not (filename.endswith(".c") or filename.endswith(".h")):
+                continue
+            if filename.startswith("__mock__"):
+                filename = filename.replace("__mock__", "", 1)
+            mocked.add(filename if rel_root == "." else f"{rel_root}/{filename}")
+    return mocked
+
+def reflink_file(src: str, dest: str) -> bool:
+    """Tenta criar 'dest' como cópia copy-on-write de 'src'. Retorna False se não for possível."""
+    global _reflink_supported
+    if _reflink_supported is False:
+        return False
+    try:
+        import fcntl
+    except ImportError:
+        _reflink_supported = False
+        return False
+
+    try:
+        with open(src, "rb") as fsrc, open(dest, "wb") as fdest:
+            fcntl.ioctl(fdest.fileno(), FICLONE, fsrc.fileno())
+    except OSError:
+        _reflink_supported = False
+        if os.path.lexists(dest):
+            os.remove(dest)
+        return False
+    shutil.copystat(src, dest)
+    _reflink_supported = True
+    return True
+
+def symlink_file(src: str, dest: str) -> bool:
+    """Tenta criar 'dest' como link simbólico (absoluto) para 'src'. Retorna False se não for possível."""
+    global _symlink_supported
+    if not _symlink_supported:
+        return False
+    try:
+        os.symlink(os.path.abspath(src), dest)
+    except OSError as e:
+        print(f"Warning: cannot create symbolic links ({e}), copying files instead.")
+        _symlink_supported = False
+        return False
+    return True
+
+def hardlink_file(src: str, dest: str) -> bool:
+    """Tenta criar 'dest' como hard link de 'src'. Retorna False se não for possível."""
+    try:
+        os.link(src, dest)
+    except OSError:
+        return False
+    return True
+
+def make_copy_function(strategy: str, dest_root: str, mocked_paths: set):
+    """
+    Retorna uma função copy_function(src, dest), compatível com shutil.copytree, que aplica
+    a estratégia de clonagem ("symlink" ou uma de CLONE_STRATEGIES). 'mocked_paths' são
+    os caminhos relativos a 'dest_root' que não podem ser hard links.
+    """
+    def copy_function(src, dest):
+        # Nunca escreve sobre um arquivo existente: ele pode ser um link para o projeto original
+        if os.path.lexists(dest):
+            os.remove(dest)
+        if strategy == "symlink" and symlink_file(src, dest):
+            return dest
+        if strategy in ("reflink", "auto") and reflink_file(src, dest):
+            return dest
+        if strategy in ("hardlink", "auto"):
+            rel_dest = os.path.relpath(dest, dest_root).replace("\\", "/")
+            if rel_dest not in mocked_paths and hardlink_file(src, dest):
+                return dest
+        return shutil.copy2(src, dest)
+
+    return copy_function
+
+def make_clone_function(dest_root: str):
+    """
+    Função de cópia usada para clonar o projeto original em 'dest_root' (TEMP_PROJECT),
+    conforme "shadowMode" e "cloneStrategy" do config.json.
+    """
+    strategy = "symlink" if get_shadow_mode() == "symlink" else get_clone_strategy()
+    return make_copy_function(strategy, dest_root, get_mocked_paths())
+
+def replace_file(src: str, dest: str):
+    """
+    Copia 'src' sobre 'dest'. Se 'dest' for um link (hard ou simbólico) para o projeto
+    original, o link é desfeito antes, para nunca escrever no arquivo original.
+    """
+    if os.path.islink(dest) or (os.path.isfile(dest) and os.stat(dest).st_nlink > 1):
+        os.remove(dest)
+    shutil.copy2(src, dest)
+
+def same_content(src: str, dest: str) -> bool:
+    """Verifica se 'dest' é um arquivo comum (não um link) com o mesmo conteúdo de 'src'."""
+    try:
+        st = os.lstat(dest)
+    except OSError:
+        return False
+    if not stat.S_ISREG(st.st_mode) or st.st_nlink > 1 or st.st_size != os.path.getsize(src):
+        return False
+    return filecmp.cmp(src, dest, shallow=False)
+
+SYNC_MANIFEST_VERSION = 2
+
+def get_sync_manifest_path() -> str:
+    import mock_cache
+    return os.path.join(mock_cache.get_cache_dir(), "sync_manifest.json")
+
+def load_sync_manifest() -> dict:
+    """
+    Lê o manifesto de sincronização: {destino: {"entries": {...}, "git": {...}, "config": [...]}},
+    em que 'destino' é o diretório sincronizado relativo ao projeto mockshadow e cada entrada
+    é caminho_relativo: [size, mtime_ns, inode, dest_size, dest_mtime_ns].
+    Um manifesto ausente ou inválido é tratado como vazio.
+    """
+    try:
+        with open(get_sync_manifest_path(), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get("version") != SYNC_MANIFEST_VERSION:
+        return {}
+    return manifest.get("trees", {})
+
+def save_sync_manifest(trees: dict):
+    manifest_path = get_sync_manifest_path()
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": SYNC_MANIFEST_VERSION, "trees": trees}, f, separators=(",", ":"))
+    os.replace(tmp_path, manifest_path)
+
+def git_enabled() -> bool:
+    """A detecção de mudanças pelo git pode ser desativada com "gitChangeDetection": false."""
+    import runtime
+    return bool(runtime.USER_CONFIGS.get("gitChangeDetection", True))
+
+def run_git(repo_dir: str, args: list):
+    """Executa um comando git em 'repo_dir'. Retorna a saída, ou None se o git falhar ou não existir."""
+    try:
+        result = subprocess.run(["git", "-C", repo_dir] + args, capture_output=True)
+    except OSError:
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.decode("utf-8", "surrogateescape")
+
+def strip_git_prefix(paths, prefix: str) -> set:
+    """Converte caminhos relativos à raiz do repositório em caminhos relativos a 'prefix'."""
+    return {p[len(prefix):].rstrip("/") for p in paths if p.startswith(prefix) and len(p) > len(prefix)}
+
+def parse_git_status(status: str) -> list:
+    """
+    Caminhos citados pela saída de 'git status --porcelain -z'.
+    Formato: "XY caminho\0", e "XY novo\0antigo\0" para renomeações e cópias (os dois caminhos
+    são retornados).
+    """
+    paths = []
+    fields = status.split("\0")
+    i = 0
+    while i < len(fields):
+        field = fields[i]
+        i += 1
+        if len(field) < 4:
+            continue
+        paths.append(field[3:])
+        if field[0] in "RC" and i < len(fields):
+            paths.append(fields[i])
+            i += 1
+    return paths
+
+# Estado do git por diretório, consultado uma única vez por execução
+_git_snapshots = {}
+
+def git_snapshot(repo_dir: str):
+    """
+    Estado atual do repositório que contém 'repo_dir':
+      {"toplevel", "prefix", "head", "dirty": [caminhos modificados, novos, removidos,
+       não rastreados ou ignorados, relativos a 'repo_dir']}
+    Retorna None se 'repo_dir' não estiver em um repositório git (com ao menos um commit).
+    """
+    repo_dir = os.path.abspath(repo_dir)
+    if repo_dir in _git_snapshots:
+        return _git_snapshots[repo_dir]
+
+    snapshot = None
+    info = run_git(repo_dir, ["rev-parse", "--show-toplevel", "--show-prefix", "HEAD"])
+    if info is not None:
+        lines = info.split("\n")
+        toplevel, prefix, head = lines[0], lines[1], lines[2]
+        status = run_git(repo_dir, ["status", "--porcelain", "-z", "--untracked-files=all",
+                                    "--ignored=traditional", "--", "."])
+        if status is not None:
+            snapshot = {"toplevel": toplevel, "prefix": prefix, "head": head,
+                        "dirty": sorted(strip_git_prefix(parse_git_status(status), prefix))}
+    _git_snapshots[repo_dir] = snapshot
+    return snapshot
+
+def forget_git_snapshots():
+    """Descarta os estados do git já consultados (para execuções longas, como 'watch')."""
+    _git_snapshots.clear()
+
+@tracing.traced("git change detection")
+def git_changed_paths(repo_dir: str, previous: dict):
+    """
+    Retorna (estado_atual, caminhos) com os caminhos (relativos a 'repo_dir') que podem ter
+    mudado desde o estado 'previous' registrado anteriormente: arquivos alterados entre os
+    commits, e arquivos que estavam ou estão modificados/não rastreados/ignorados.
+    'caminhos' é None quando não é possível determinar as mudanças pelo git.
+    """
+    snapshot = git_snapshot(repo_dir)
+    if snapshot is None or not previous:
+        return snapshot, None
+    if previous.get("toplevel") != snapshot["toplevel"] or previous.get("prefix") != snapshot["prefix"]:
+        return snapshot, None
+
+    changed = set(snapshot["dirty"]) | set(previous.get("dirty", []))
+    if previous.get("head") != snapshot["head"]:
+        diff = run_git(repo_dir, ["diff", "--name-only", "-z", "--no-renames",
+                                  previous.get("head", ""), snapshot["head"], "--", "."])
+        if diff is None:
+            # Commit anterior não existe mais (ex.: rebase seguido de gc)
+            return snapshot, None
+        changed |= strip_git_prefix(diff.split("\0"), snapshot["prefix"])
+    return snapshot, changed
+
+def path_in_changed(rel: str, changed: set) -> bool:
+    """Verifica se 'rel' ou algum de seus diretórios pais está em 'changed'."""
+    while rel:
+        if rel in changed:
+            return True
+        rel = os.path.dirname(rel)
+    return False
+
+def dest_signature(path: str):
+    """[size, mtime_ns] do arquivo de destino (sem seguir links), ou None se não existir."""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+def remove_empty_dirs(dest_root: str, rel_dir: str, keep_dirs: set):
+    """Remove 'rel_dir' e seus pais enquanto estiverem vazios e não existirem mais na origem."""
+    while rel_dir and rel_dir not in keep_dirs:
+        try:
+            os.rmdir(os.path.join(dest_root, rel_dir))
+        except OSError:
+            return
+        rel_dir = os.path.dirname(rel_dir)
+
+def is_excluded(rel: str, exclude_items: set) -> bool:
+    """Verifica se 'rel' está excluído da cópia, diretamente ou por um diretório pai (ou '.git')."""
+    while rel:
+        name = os.path.basename(rel)
+        if rel in exclude_items or name == ".git":
+            return True
+        rel = os.path.dirname(rel)
+    return False
+
+class SyncStats:
+    def __init__(self):
+        self.files = 0
+        self.copied = 0
+        self.deleted = 0
+
+def sync_file(src_path: str, dest_path: str, st, prev, copy_function, mocked: bool, stats: SyncStats) -> list:
+    """
+    Sincroniza um arquivo e retorna a sua nova entrada no manifesto.
+    'st' é o stat do arquivo de origem e 'prev' a sua entrada anterior (ou None).
+    """
+    stats.files += 1
+    src_sig = [st.st_size, st.st_mtime_ns, st.st_ino]
+    dest_sig = dest_signature(dest_path)
+
+    if mocked and dest_sig is not None:
+        # Arquivo mockado: o conteúdo é responsabilidade do mock. Mantém a assinatura
+        # anterior do destino, para que ele seja restaurado quando deixar de ser mockado.
+        return src_sig + (prev[3:] if prev else [None, None])
+
+    if prev is not None:
+        unchanged = prev[:3] == src_sig and prev[3:] == dest_sig
+    else:
+        # Sem histórico: aceita um destino que já tenha o mesmo tamanho e mtime da origem
+        unchanged = dest_sig == src_sig[:2]
+    if not unchanged:
+        copy_function(src_path, dest_path)
+        dest_sig = dest_signature(dest_path)
+        stats.copied += 1
+    return src_sig + dest_sig
+
+def remove_stale(dest_root: str, rel: str, skip_paths: set, keep_dirs: set, stats: SyncStats):
+    """Remove do destino um arquivo que não existe mais na origem."""
+    if rel in skip_paths:
+        return
+    dest_path = os.path.join(dest_root, rel)
+    if os.path.lexists(dest_path) and not os.path.isdir(dest_path):
+        os.remove(dest_path)
+        stats.deleted += 1
+    remove_empty_dirs(dest_root, os.path.dirname(rel), keep_dirs)
+
+def sync_tree(src_root: str, dest_root: str, entries: dict, exclude_items: list, copy_function,
+              skip_paths: set = frozenset(), stats: SyncStats = None) -> dict:
+    """
+    Sincroniza 'dest_root' com 'src_root' e retorna as novas entradas do manifesto.
+
+      - entries:       entradas do manifesto da sincronização anterior deste destino;
+      - exclude_items: caminhos relativos (separados por '/') que não são copiados;
+      - copy_function: função que materializa um arquivo (ver make_copy_function());
+      - skip_paths:    caminhos relativos escritos pelo mockshadow (mocks): não são
+                       sobrescritos enquanto existirem no destino.
+
+    Um arquivo é copiado quando o seu tamanho, mtime ou inode mudaram desde a última
+    sincronização, ou quando o arquivo de destino foi alterado ou removido. Arquivos
+    registrados no manifesto que não existem mais na origem são removidos do destino.
+    """
+    if stats is None:
+        stats = SyncStats()
+    exclude_items = set(exclude_items)
+    new_entries = {}
+    seen_dirs = {""}
+    stack = [""]
+
+    while stack:
+        rel_dir = stack.pop()
+        src_dir = os.path.join(src_root, rel_dir) if rel_dir else src_root
+        dest_dir = os.path.join(dest_root, rel_dir) if rel_dir else dest_root
+        os.makedirs(dest_dir, exist_ok=True)
+
+        with os.scandir(src_dir) as it:
+            for entry in it:
+                rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if rel in exclude_items:
+                    if not rel_dir:
+                        print(f"Ignored: {entry.name}")
+                    continue
+                if entry.is_dir():
+                    # Não desce em repositórios git: não precisam existir na cópia
+                    if entry.name != ".git":
+                        seen_dirs.add(rel)
+                        stack.append(rel)
+                    continue
+                new_entries[rel] = sync_file(entry.path, os.path.join(dest_dir, entry.name), entry.stat(),
+                                             entries.get(rel), copy_function, rel in skip_paths, stats)
+
+    # Remove do destino o que deixou de existir (ou passou a ser excluído) na origem
+    for rel in entries:
+        if rel not in new_entries:
+            remove_stale(dest_root, rel, skip_paths, seen_dirs, stats)
+
+    return new_entries
+
+def sync_paths(src_root: str, dest_root: str, entries: dict, rel_paths: set, exclude_items: list, copy_function,
+               skip_paths: set = frozenset(), stats: SyncStats = None) -> dict:
+    """
+    Como sync_tree(), mas visita apenas 'rel_paths' (caminhos que podem ter mudado).
+    Um caminho que seja um diretório (ex.: submódulo, diretório ignorado) é sincronizado por inteiro.
+    """
+    if stats is None:
+        stats = SyncStats()
+    exclude_items = set(exclude_items)
+    new_entries = dict(entries)
+
+    for rel in sorted(rel_paths):
+        if is_excluded(rel, exclude_items):
+            continue
+        src_path = os.path.join(src_root, rel)
+        dest_path = os.path.join(dest_root, rel)
+
+        if os.path.isdir(src_path):
+            prefix = rel + "/"
+            sub_entries = {k[len(prefix):]: new_entries.pop(k) for k in list(new_entries) if k.startswith(prefix)}
+            sub_excludes = {e[len(prefix):] for e in exclude_items if e.startswith(prefix)}
+            sub_skip = {p[len(prefix):] for p in skip_paths if p.startswith(prefix)}
+            synced = sync_tree(src_path, dest_path, sub_entries, sub_excludes, copy_function, sub_skip, stats)
+            new_entries.update({prefix + k: v for k, v in synced.items()})
+        elif os.path.isfile(src_path):
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            new_entries[rel] = sync_file(src_path, dest_path, os.stat(src_path), entries.get(rel),
+                                         copy_function, rel in skip_paths, stats)
+        elif rel in new_entries:
+            del new_entries[rel]
+            remove_stale(dest_root, rel, skip_paths, set(), stats)
+
+    return new_entries
+
+def dest_identity(dest_root: str):
+    """Identifica o diretório de destino (muda quando ele é removido e criado novamente)."""
+    try:
+        st = os.stat(dest_root)
+    except OSError:
+        return None
+    return [st.st_dev, st.st_ino]
+
+def dest_complete(dest_root: str, entries: dict) -> bool:
+    """
+    Verifica se os diretórios (e os arquivos da raiz) registrados no manifesto ainda existem
+    no destino. Um TEMP_PROJECT removido e recriado pode reaproveitar o mesmo inode; nesse
+    caso só a falta do conteúdo revela que ele precisa ser percorrido por inteiro.
+    """
+    paths = {os.path.dirname(rel) or rel for rel in entries}
+    return all(os.path.lexists(os.path.join(dest_root, rel)) for rel in paths)
+
+@tracing.traced("sync tree", "sync")
+def sync_project_tree(src_root: str, dest_root: str, previous: dict, exclude_items: list, copy_function,
+                      skip_paths: set, fingerprint: list, stats: SyncStats = None) -> tuple:
+    """
+    Sincroniza 'dest_root' com 'src_root' a partir do registro 'previous' (do manifesto) e
+    retorna (novo_registro, caminhos_alterados).
+
+    Se 'src_root' for um repositório git e a sincronização anterior foi feita com a mesma
+    configuração ('fingerprint'), somente os caminhos informados pelo git são visitados e
+    'caminhos_alterados' é esse conjunto. Caso contrário, todo o diretório é percorrido e
+    'caminhos_alterados' é None.
+    """
+    previous = previous or {}
+    entries = previous.get("entries", {})
+    snapshot, changed = (None, None)
+    if git_enabled():
+        snapshot, changed = git_changed_paths(src_root, previous.get("git"))
+    # O git não sabe do destino: se ele foi removido, recriado ou perdeu arquivos, percorre tudo
+    if (previous.get("config") != fingerprint or previous.get("dest") != dest_identity(dest_root)
+            or (changed is not None and not dest_complete(dest_root, entries))):
+        changed = None
+
+    if changed is not None:
+        # Arquivos que passaram a ser (ou deixaram de ser) mockados também precisam ser visitados
+        changed |= set(previous.get("mocked", [])) ^ set(skip_paths)
+        new_entries = sync_paths(src_root, dest_root, entries, changed, exclude_items, copy_function, skip_paths, stats)
+    else:
+        new_entries = sync_tree(src_root, dest_root, entries, exclude_items, copy_function, skip_paths, stats)
+
+    record = {"entries": new_entries, "git": snapshot, "config": fingerprint, "mocked": sorted(skip_paths),
+              "dest": dest_identity(dest_root)}
+    return record, changed
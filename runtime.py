@@ -1,17 +1,84 @@
 #!/usr/bin/env python3
 #  Created on: 21 de jan de 2025
 #      Author: roger.moschiel
+#
+#  Diretórios e configurações do projeto mockshadow em uso.
+#
+#  Os módulos consultam runtime.DIR_MOCK_SHADOW_PROJECT, runtime.DIR_SHADOW_MOCKS,
+#  runtime.DIR_TEMP_PROJECT, runtime.USER_ENV e runtime.USER_CONFIGS. Esses valores vêm do
+#  projeto ativo: o ativado por activate() (ver mockshadow_session.py) ou, na linha de comando,
+#  o diretório atual. O env.json e o config.json são lidos na primeira consulta.
+import contextlib
+import contextvars
 import os
 import mock_utils
 
-# Diretório do projeto mock shadow
-DIR_MOCK_SHADOW_PROJECT = os.getcwd()
+# Nome consultado pelos módulos -> atributo de Project
+PROJECT_ATTRIBUTES = {
+    "DIR_MOCK_SHADOW_PROJECT": "project_dir",
+    "DIR_SHADOW_MOCKS": "shadow_mocks_dir",
+    "DIR_TEMP_PROJECT": "temp_project_dir",
+    "USER_ENV": "user_env",
+    "USER_CONFIGS": "user_configs",
+}
 
-# Diretório para a árvore de mocks
-DIR_SHADOW_MOCKS = os.path.join(DIR_MOCK_SHADOW_PROJECT, "MOCK_TREE").rstrip("/")
+class Project:
+    """Um projeto mockshadow: os seus diretórios e o env.json/config.json, lidos sob demanda."""
+    def __init__(self, project_dir: str):
+        # Diretório do projeto mock shadow
+        self.project_dir = os.path.abspath(project_dir)
+        # Diretório para a árvore de mocks
+        self.shadow_mocks_dir = os.path.join(self.project_dir, "MOCK_TREE").rstrip("/")
+        # Diretório do projeto temporário
+        self.temp_project_dir = os.path.join(self.project_dir, "TEMP_PROJECT").rstrip("/")
+        self._user_env = None
+        self._user_configs = None
 
-# Diretório do projeto temporário
-DIR_TEMP_PROJECT = os.path.join(DIR_MOCK_SHADOW_PROJECT, "TEMP_PROJECT").rstrip("/")
+    @property
+    def user_env(self) -> dict:
+        if self._user_env is None:
+            self._user_env = mock_utils.get_user_env(self.project_dir)
+        return self._user_env
 
-USER_ENV = mock_utils.get_user_env()
-USER_CONFIGS = mock_utils.get_user_configs()
\ No newline at end of file
+    @property
+    def user_configs(self) -> dict:
+        if self._user_configs is None:
+            self._user_configs = mock_utils.get_user_configs(self.project_dir)
+        return self._user_configs
+
+    def reload(self):
+        """Descarta o env.json e o config.json lidos: a próxima consulta lê os arquivos novamente."""
+        self._user_env = None
+        self._user_configs = None
+
+# Projeto ativado por activate() no contexto atual (thread ou tarefa)
+_active_project = contextvars.ContextVar("mockshadow_project", default=None)
+# Projeto do diretório atual, usado quando nenhum foi ativado (linha de comando)
+_cwd_project = None
+
+def current_project() -> Project:
+    global _cwd_project
+    project = _active_project.get()
+    if project is not None:
+        return project
+    if _cwd_project is None:
+        _cwd_project = Project(os.getcwd())
+    return _cwd_project
+
+@contextlib.contextmanager
+def activate(project: Project):
+    """Torna 'project' o projeto em uso no contexto atual enquanto o bloco 'with' executa."""
+    token = _active_project.set(project)
+    try:
+        yield project
+    finally:
+        _active_project.reset(token)
+
+def adopt(project: Project):
+    """Torna 'project' o projeto em uso até o fim do processo (processos dos pools)."""
+    _active_project.set(project)
+
+def __getattr__(name: str):
+    if name in PROJECT_ATTRIBUTES:
+        return getattr(current_project(), PROJECT_ATTRIBUTES[name])
+    raise AttributeError(f"module 'runtime' has no attribute '{name}'")
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+#  Matriz de testes do firmware simulado ('mockshadow test').
+#
+#  Executa os cenários da seção "test" do .mockshadow/config.json em paralelo (um processo do
+#  firmware por cenário, até 'jobs' ao mesmo tempo), cada um com o seu tempo limite. Um cenário
+#  passa quando o executável termina com o código de saída esperado. Os resultados são gravados
+#  em JUnit XML (para o CI) e em JSON (tempos de cada cenário).
+#
+#  "test": {
+#    "jobs"       execuções simultâneas (padrão: número de núcleos; '--jobs' tem prioridade)
+#    "timeout"    tempo limite padrão de cada cenário, em segundos (padrão: 60)
+#    "scenarios": [
+#      {
+#        "name"       nome do cenário (obrigatório e único)
+#        "binary"     executável, relativo ao projeto mockshadow (padrão: o mesmo do 'exec')
+#        "args"       argumentos do executável
+#        "stdin"      arquivo enviado à entrada padrão (script de entrada), relativo ao projeto
+#        "env"        variáveis de ambiente extras (ex.: ASAN_OPTIONS)
+#        "cwd"        diretório de execução, relativo ao projeto (padrão: o projeto)
+#        "timeout"    tempo limite do cenário, em segundos
+#        "exitCode"   código de saída esperado (padrão: 0)
+#      }
+#    ]
+#  }
+#
+#  '--shard i/n' executa somente a i-ésima de n partes dos cenários (1 <= i <= n), para dividir
+#  a matriz entre várias máquinas do CI.
+
+import concurrent.futures
+import contextvars
+import datetime
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+DEFAULT_TIMEOUT = 60
+# Quantidade máxima da saída de cada cenário guardada nos resultados (o final da saída)
+MAX_OUTPUT_CHARS = 64 * 1024
+RESULTS_DIR = "test_results"
+
+STATUS_PASSED = "passed"
+STATUS_FAILED = "failed"
+STATUS_TIMEOUT = "timeout"
+STATUS_ERROR = "error"
+
+class ScenarioResult:
+    def __init__(self, name: str):
+        self.name = name
+        self.status = STATUS_ERROR
+        self.seconds = 0.0
+        self.exit_code = None
+        self.message = ""
+        self.output = ""
+
+    def to_json(self) -> dict:
+        return {"name": self.name, "status": self.status, "seconds": self.seconds,
+                "exit_code": self.exit_code, "message": self.message}
+
+def parse_shard(value: str) -> tuple:
+    """Valida o valor de '--shard i/n'; retorna (i, n)."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        index = count = 0
+    if count < 1 or not 1 <= index <= count:
+        print(f"Error: invalid value for --shard: '{value}' (expected i/n, with 1 <= i <= n)")
+        sys.exit(1)
+    return index, count
+
+def get_test_config() -> dict:
+    import runtime
+    config = runtime.USER_CONFIGS.get("test", {})
+    if not isinstance(config, dict):
+        sys.exit("fatal: invalid 'test' section in .mockshadow/config.json")
+    return config
+
+def get_scenarios(config: dict) -> list:
+    scenarios = config.get("scenarios", [])
+    if not isinstance(scenarios, list) or not all(isinstance(s, dict) for s in scenarios):
+        sys.exit("fatal: invalid 'test.scenarios' in .mockshadow/config.json")
+    names = set()
+    for scenario in scenarios:
+        name = scenario.get("name")
+        if not isinstance(name, str) or not name:
+            sys.exit("fatal: every scenario in 'test.scenarios' needs a 'name'")
+        if name in names:
+            sys.exit(f"fatal: duplicated scenario name in 'test.scenarios': {name}")
+        names.add(name)
+        args = scenario.get("args", [])
+        if not isinstance(args, list) or not all(isinstance(arg, str) for arg in args):
+            sys.exit(f"fatal: invalid 'args' in scenario '{name}'")
+        env = scenario.get("env", {})
+        if not isinstance(env, dict) or not all(isinstance(v, str) for v in env.values()):
+            sys.exit(f"fatal: invalid 'env' in scenario '{name}'")
+    return scenarios
+
+def get_timeout(config: dict, scenario: dict) -> float:
+    timeout = scenario.get("timeout", config.get("timeout", DEFAULT_TIMEOUT))
+    if not isinstance(timeout, (int, float)) or timeout <= 0:
+        sys.exit(f"fatal: invalid timeout for scenario '{scenario['name']}': {timeout}")
+    return timeout
+
+def get_jobs(config: dict, jobs: int = None) -> int:
+    if jobs is not None:
+        return jobs
+    jobs = config.get("jobs")
+    if jobs is None:
+        return os.cpu_count() or 1
+    if not isinstance(jobs, int) or jobs < 1:
+        sys.exit(f"fatal: invalid 'test.jobs' in .mockshadow/config.json: {jobs}")
+    return jobs
+
+def shard_scenarios(scenarios: list, shard) -> list:
+    """Cenários da parte 'shard' = (i, n): distribuídos alternadamente, na ordem da configuração."""
+    if shard is None:
+        return scenarios
+    index, count = shard
+    return scenarios[index - 1::count]
+
+def kill_process(process: subprocess.Popen):
+    """Encerra o cenário e os processos que ele criou (o cenário roda no seu próprio grupo de processos)."""
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except OSError:
+        pass
+
+def run_scenario(scenario: dict, timeout: float, default_binary) -> ScenarioResult:
+    import exec_runner
+    import runtime
+    result = ScenarioResult(scenario["name"])
+    binary = exec_runner.resolve_binary(scenario.get("binary", default_binary))
+    if not os.path.isfile(binary):
+        result.message = f"executable '{os.path.relpath(binary, runtime.DIR_MOCK_SHADOW_PROJECT)}' not found"
+        return result
+    cwd = os.path.join(runtime.DIR_MOCK_SHADOW_PROJECT, scenario.get("cwd", "."))
+    env = dict(os.environ, **scenario.get("env", {}))
+    stdin = subprocess.DEVNULL
+    if scenario.get("stdin"):
+        try:
+            stdin = open(os.path.join(runtime.DIR_MOCK_SHADOW_PROJECT, scenario["stdin"]), "rb")
+        except OSError as e:
+            result.message = f"cannot open stdin file: {e}"
+            return result
+
+    started = time.perf_counter()
+    try:
+        try:
+            process = subprocess.Popen([binary] + scenario.get("args", []), cwd=cwd, env=env, stdin=stdin,
+                                       stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                       start_new_session=(os.name == "posix"))
+        except OSError as e:
+            result.message = f"cannot execute: {e}"
+            return result
+        try:
+            output, _ = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            kill_process(process)
+            output, _ = process.communicate()
+            result.status = STATUS_TIMEOUT
+            result.message = f"timed out after {timeout:g} s"
+    finally:
+        if stdin is not subprocess.DEVNULL:
+            stdin.close()
+    result.seconds = time.perf_counter() - started
+    result.output = output.decode("utf-8", errors="replace")[-MAX_OUTPUT_CHARS:]
+    result.exit_code = process.returncode
+
+    if result.status != STATUS_TIMEOUT:
+        expected = scenario.get("exitCode", 0)
+        if result.exit_code == expected:
+            result.status = STATUS_PASSED
+        else:
+            result.status = STATUS_FAILED
+            if result.exit_code < 0:
+                result.message = f"killed by signal {-result.exit_code}"
+            else:
+                result.message = f"exit code {result.exit_code}, expected {expected}"
+    return result
+
+def write_junit(path: str, results: list, seconds: float, suite_name: str):
+    suite = ET.Element("testsuite", {
+        "name": suite_name,
+        "tests": str(len(results)),
+        "failures": str(sum(r.status in (STATUS_FAILED, STATUS_TIMEOUT) for r in results)),
+        "errors": str(sum(r.status == STATUS_ERROR for r in results)),
+        "time": f"{seconds:.3f}",
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "hostname": socket.gethostname(),
+    })
+    for result in results:
+        case = ET.SubElement(suite, "testcase", {"name": result.name, "classname": "mockshadow",
+                                                 "time": f"{result.seconds:.3f}"})
+        if result.status in (STATUS_FAILED, STATUS_TIMEOUT):
+            ET.SubElement(case, "failure", {"type": result.status, "message": result.message})
+        elif result.status == STATUS_ERROR:
+            ET.SubElement(case, "error", {"message": result.message})
+        if result.output:
+            ET.SubElement(case, "system-out").text = result.output
+    tree = ET.ElementTree(ET.Element("testsuites"))
+    tree.getroot().append(suite)
+    ET.indent(tree)
+    tree.write(path, encoding="utf-8", xml_declaration=True)
+
+def write_json(path: str, results: list, seconds: float, shard):
+    data = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "shard": f"{shard[0]}/{shard[1]}" if shard else None,
+        "seconds": seconds,
+        "scenarios": [r.to_json() for r in results],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4)
+
+def default_result_path(extension: str, shard) -> str:
+    import runtime
+    suffix = f"_shard{shard[0]}of{shard[1]}" if shard else ""
+    return os.path.join(runtime.DIR_MOCK_SHADOW_PROJECT, ".mockshadow", RESULTS_DIR, f"results{suffix}.{extension}")
+
+def print_failure_output(result: ScenarioResult, lines: int = 20):
+    tail = result.output.splitlines()[-lines:]
+    if tail:
+        print(f"---- {result.name} (last {len(tail)} lines of output) ----")
+        for line in tail:
+            print(f"  {line}")
+
+def run_tests(jobs: int = None, shard=None, junit_path: str = None, json_path: str = None):
+    import exec_runner
+    config = get_test_config()
+    scenarios = shard_scenarios(get_scenarios(config), shard)
+    if not scenarios:
+        print("No test scenarios to run. Add them to 'test.scenarios' in .mockshadow/config.json.")
+        return
+    jobs = min(get_jobs(config, jobs), len(scenarios))
+    default_binary = exec_runner.get_exec_config().get("binary")
+    junit_path = junit_path or default_result_path("xml", shard)
+    json_path = json_path or default_result_path("json", shard)
+
+    shard_text = f" (shard {shard[0]}/{shard[1]})" if shard else ""
+    print(f"Running {len(scenarios)} scenario(s){shard_text} with {jobs} job(s) ...")
+    started = time.perf_counter()
+    results = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        # Cada cenário roda em uma cópia do contexto atual, com o mesmo projeto (runtime.activate())
+        futures = {executor.submit(contextvars.copy_context().run, run_scenario, s, get_timeout(config, s),
+                                   default_binary): s["name"]
+                   for s in scenarios}
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            results[result.name] = result
+            detail = f" - {result.message}" if result.message else ""
+            print(f"  {result.status.upper():<8}{result.name} ({result.seconds:.2f} s){detail}")
+    seconds = time.perf_counter() - started
+    # Resultados na ordem da configuração, independente da ordem de término
+    ordered = [results[s["name"]] for s in scenarios]
+
+    for path in (junit_path, json_path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    write_junit(junit_path, ordered, seconds, "mockshadow" + (f" shard {shard[0]}/{shard[1]}" if shard else ""))
+    write_json(json_path, ordered, seconds, shard)
+
+    not_passed = [r for r in ordered if r.status != STATUS_PASSED]
+    for result in not_passed:
+        print_failure_output(result)
+    passed = len(ordered) - len(not_passed)
+    print(f"Tests Complete! {passed} passed, {len(not_passed)} not passed ({seconds:.2f} s)")
+    print(f"  JUnit XML: {os.path.relpath(junit_path)}")
+    print(f"  JSON:      {os.path.relpath(json_path)}")
+    if not_passed:
+        sys.exit(1)
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+#  Índice de símbolos do projeto original ('mockshadow index' / 'mockshadow find <símbolo>').
+#
+#  Cada arquivo .c/.h de originalProject é analisado pela libclang (em um pool de processos) e
+#  os símbolos definidos ou declarados nele (funções, variáveis, macros, typedefs, structs,
+#  unions e enums) são gravados em .mockshadow/cache/symbol_index.sqlite, com o tipo, o arquivo
+#  e o intervalo de linhas. 'find' e 'open-mock <símbolo>' consultam o índice sem nenhum parse.
+#
+#  A atualização é incremental: um arquivo só é analisado novamente quando o seu conteúdo
+#  muda, quando muda um header do projeto incluído por ele, ou quando mudam as flags do
+#  extractor (extractorCFlags).
+
+import concurrent.futures
+import json
+import os
+import sys
+import time
+
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+
+import extractor_service
+import mock_cache
+import project_sync
+import tracing
+
+SCHEMA_VERSION = 1
+DB_FILE = "symbol_index.sqlite"
+SOURCE_EXTENSIONS = (".c", ".h")
+# Quantidade máxima de nomes parecidos exibidos por 'find' quando o símbolo não é encontrado
+MAX_SUGGESTIONS = 20
+
+# Tipo de cada cursor indexado, com os mesmos nomes usados pelas diretivas de mock
+SYMBOL_KINDS = {
+    "FUNCTION_DECL": "function",
+    "VAR_DECL": "variable",
+    "MACRO_DEFINITION": "macro",
+    "TYPEDEF_DECL": "typedef",
+    "STRUCT_DECL": "struct",
+    "UNION_DECL": "union",
+    "ENUM_DECL": "enum",
+}
+
+# Estado de cada processo do pool
+_index = None
+
+def get_db_path() -> str:
+    return os.path.join(mock_cache.get_cache_dir(), DB_FILE)
+
+def connect():
+    connection = sqlite3.connect(get_db_path(), timeout=30)
+    if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        connection.executescript(f"""
+            DROP TABLE IF EXISTS files;
+            DROP TABLE IF EXISTS symbols;
+            DROP TABLE IF EXISTS meta;
+            CREATE TABLE files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT,
+                                includes TEXT, error TEXT);
+            CREATE TABLE symbols (name TEXT, kind TEXT, path TEXT, start_line INTEGER, end_line INTEGER,
+                                  definition INTEGER);
+            CREATE INDEX symbols_name ON symbols (name);
+            CREATE INDEX symbols_path ON symbols (path);
+            CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT);
+            PRAGMA user_version = {SCHEMA_VERSION};
+        """)
+    return connection
+
+def init_index_worker():
+    """Inicializador dos processos do pool: carrega a libclang do clang-code-extractor."""
+    global _index
+    sys.path.insert(0, extractor_service.EXTRACTOR_DIR)
+    from clang import cindex
+    _index = cindex.Index.create()
+
+def index_file(path: str, args: list, project_dir: str) -> tuple:
+    """
+    Analisa um arquivo e retorna (símbolos, headers do projeto incluídos, erro).
+    Cada símbolo é (nome, tipo, linha inicial, linha final, é definição).
+    """
+    from clang import cindex
+    options = cindex.TranslationUnit.PARSE_DETAILED_PROCESSING_RECORD | cindex.TranslationUnit.PARSE_INCOMPLETE
+    try:
+        tu = _index.parse(path, args=args, options=options)
+    except cindex.TranslationUnitLoadError as e:
+        return [], [], str(e)
+    symbols = []
+    for cursor in tu.cursor.get_children():
+        kind = SYMBOL_KINDS.get(cursor.kind.name)
+        location = cursor.location
+        if kind is None or location.file is None or location.file.name != path or not cursor.spelling:
+            continue
+        if kind in ("struct", "union", "enum") and cursor.is_anonymous():
+            continue
+        definition = kind in ("macro", "typedef") or cursor.is_definition()
+        symbols.append((cursor.spelling, kind, cursor.extent.start.line, cursor.extent.end.line, int(definition)))
+    includes = sorted({inclusion.include.name for inclusion in tu.get_includes()
+                       if inclusion.include.name.startswith(project_dir + os.sep)})
+    return symbols, includes, None
+
+def index_files(tasks: list, args: list, project_dir: str, jobs: int) -> list:
+    """Analisa os arquivos de 'tasks' (caminhos absolutos), em paralelo quando jobs > 1."""
+    if jobs <= 1 or len(tasks) <= 1:
+        init_index_worker()
+        return [index_file(path, args, project_dir) for path in tasks]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=min(jobs, len(tasks)),
+                                                initializer=init_index_worker) as executor:
+        chunksize = max(1, len(tasks) // (jobs * 8))
+        return list(executor.map(index_file, tasks, [args] * len(tasks), [project_dir] * len(tasks),
+                                 chunksize=chunksize))
+
+def find_source_files(project_dir: str) -> dict:
+    """Arquivos .c/.h do projeto original (caminho relativo -> stat), exceto os excluídos da cópia."""
+    import mock_utils
+    exclude_items = set(mock_utils.get_exclude_items())
+    files = {}
+    for root, dirs, names in os.walk(project_dir):
+        rel_root = os.path.relpath(root, project_dir).replace("\\", "/")
+        rel_root = "" if rel_root == "." else rel_root + "/"
+        dirs[:] = [d for d in dirs if not project_sync.is_excluded(rel_root + d, exclude_items)]
+        for name in names:
+            rel = rel_root + name
+            if name.endswith(SOURCE_EXTENSIONS) and not project_sync.is_excluded(rel, exclude_items):
+                try:
+                    files[rel] = os.stat(os.path.join(root, name))
+                except OSError:
+                    pass
+    return files
+
+def check_libclang():
+    sys.path.insert(0, extractor_service.EXTRACTOR_DIR)
+    try:
+        from clang import cindex  # noqa: F401
+    except ImportError:
+        print("Error: 'mockshadow index' requires the libclang Python bindings (clang.cindex)")
+        sys.exit(1)
+    if sqlite3 is None:
+        print("Error: 'mockshadow index' requires the sqlite3 module")
+        sys.exit(1)
+
+@tracing.traced("index")
+def update_index(jobs: int = None):
+    """'mockshadow index': cria ou atualiza o índice de símbolos do projeto original."""
+    import mock_utils
+    import runtime
+    check_libclang()
+    project_dir = os.path.abspath(runtime.USER_ENV.get("originalProject"))
+    mock_utils.validate_directory_exists(project_dir)
+    if jobs is None:
+        jobs = mock_utils.get_default_jobs()
+    args = mock_utils.mount_extractor_extra_args("").split()
+    started = time.perf_counter()
+    print("Indexing original project ...")
+
+    os.makedirs(mock_cache.get_cache_dir(), exist_ok=True)
+    connection = connect()
+    meta = dict(connection.execute("SELECT name, value FROM meta"))
+    fingerprint = json.dumps({"args": args, "project": project_dir, "version": mock_utils.MOCKSHADOW_VERSION})
+    known = {}
+    if meta.get("fingerprint") == fingerprint:
+        for path, size, mtime_ns, digest, includes in connection.execute(
+                "SELECT path, size, mtime_ns, digest, includes FROM files"):
+            known[path] = (size, mtime_ns, digest, json.loads(includes))
+
+    files = find_source_files(project_dir)
+    removed = set(known) - set(files)
+    to_parse = set()
+    touched = {}
+    for rel, st in files.items():
+        previous = known.get(rel)
+        if previous is not None and previous[:2] == (st.st_size, st.st_mtime_ns):
+            continue
+        digest = mock_cache.file_digest(os.path.join(project_dir, rel))
+        if previous is not None and previous[2] == digest:
+            # Somente o mtime mudou
+            touched[rel] = (st.st_size, st.st_mtime_ns)
+            continue
+        to_parse.add(rel)
+    # Arquivos que incluem um header modificado ou removido também são analisados novamente
+    changed_paths = {os.path.join(project_dir, rel) for rel in to_parse | removed}
+    for rel, (_, _, _, includes) in known.items():
+        if rel in files and not changed_paths.isdisjoint(includes):
+            to_parse.add(rel)
+
+    tasks = sorted(to_parse)
+    results = index_files([os.path.join(project_dir, rel) for rel in tasks], args, project_dir, jobs)
+
+    errors = 0
+    with connection:
+        if meta.get("fingerprint") != fingerprint:
+            connection.execute("DELETE FROM files")
+            connection.execute("DELETE FROM symbols")
+            connection.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('fingerprint', ?)", (fingerprint,))
+        for rel in removed | to_parse:
+            connection.execute("DELETE FROM files WHERE path = ?", (rel,))
+            connection.execute("DELETE FROM symbols WHERE path = ?", (rel,))
+        for rel, (size, mtime_ns) in touched.items():
+            connection.execute("UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?", (size, mtime_ns, rel))
+        for rel, (symbols, includes, error) in zip(tasks, results):
+            st = files[rel]
+            if error:
+                errors += 1
+                print(f"  Warning: cannot parse {rel}: {error}")
+            connection.execute("INSERT INTO files (path, size, mtime_ns, digest, includes, error) "
+                               "VALUES (?, ?, ?, ?, ?, ?)",
+                               (rel, st.st_size, st.st_mtime_ns, mock_cache.file_digest(os.path.join(project_dir, rel)),
+                                json.dumps(includes), error))
+            connection.executemany("INSERT INTO symbols (name, kind, path, start_line, end_line, definition) "
+                                   "VALUES (?, ?, ?, ?, ?, ?)", [(s[0], s[1], rel) + s[2:] for s in symbols])
+    total = connection.execute("SELECT COUNT(*) FROM symbols").fetchone()[0]
+    connection.close()
+    print(f"Indexing Complete! {len(files)} files ({len(tasks)} parsed, {len(removed)} removed), "
+          f"{total} symbols ({time.perf_counter() - started:.2f} s)")
+    if errors:
+        print(f"  {errors} file(s) could not be parsed")
+
+def lookup(name: str) -> list:
+    """
+    Símbolos de nome 'name' no índice: lista de (tipo, caminho relativo, linha inicial, linha final, é definição),
+    definições primeiro. Encerra com uma mensagem se o índice não existir.
+    """
+    if sqlite3 is None or not os.path.isfile(get_db_path()):
+        print("Error: no symbol index. Run 'mockshadow index' first.")
+        sys.exit(1)
+    connection = connect()
+    rows = connection.execute("SELECT kind, path, start_line, end_line, definition FROM symbols WHERE name = ? "
+                              "ORDER BY definition DESC, path, start_line", (name,)).fetchall()
+    connection.close()
+    return rows
+
+def suggestions(name: str) -> list:
+    connection = connect()
+    rows = connection.execute("SELECT DISTINCT name FROM symbols WHERE name LIKE ? ORDER BY name LIMIT ?",
+                              (f"%{name}%", MAX_SUGGESTIONS)).fetchall()
+    connection.close()
+    return [row[0] for row in rows]
+
+def find_symbol(name: str):
+    """'mockshadow find <símbolo>': exibe onde o símbolo é definido e declarado."""
+    if not name:
+        print("Usage: mockshadow find <symbol>")
+        sys.exit(1)
+    rows = lookup(name)
+    if not rows:
+        print(f"Symbol '{name}' not found in the index")
+        similar = suggestions(name)
+        if similar:
+            print("Similar names: " + ", ".join(similar))
+        sys.exit(1)
+    for kind, path, start_line, end_line, definition in rows:
+        lines = f"{start_line}" if start_line == end_line else f"{start_line}-{end_line}"
+        note = "" if definition else "  (declaration)"
+        print(f"{kind:<9} {path}:{lines}{note}")
+
+def resolve_symbol_file(name: str):
+    """
+    Arquivo (relativo ao projeto original) que define o símbolo 'name', para 'open-mock <símbolo>'.
+    Retorna None se o símbolo não estiver no índice; encerra se houver mais de uma definição.
+    """
+    rows = lookup(name)
+    if not rows:
+        return None
+    definitions = [row for row in rows if row[4]] or rows
+    files = sorted({row[1] for row in definitions})
+    if len(files) > 1:
+        print(f"Symbol '{name}' is defined in more than one file:")
+        for path in files:
+            print(f"  {path}")
+        sys.exit(1)
+    kind, path, start_line, _, _ = definitions[0]
+    print(f"{kind} {name}: {path}:{start_line}")
+    return path
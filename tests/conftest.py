@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+#  Fixtures comuns aos testes.
+
+import os
+import sys
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def fake_runtime(tmp_path, monkeypatch):
+    """
+    Substitui o módulo runtime, que lê o diretório atual e os arquivos .mockshadow ao ser
+    importado, por um projeto vazio em tmp_path.
+    """
+    runtime = types.SimpleNamespace(
+        DIR_MOCK_SHADOW_PROJECT=str(tmp_path),
+        DIR_SHADOW_MOCKS=os.path.join(str(tmp_path), "MOCK_TREE"),
+        DIR_TEMP_PROJECT=os.path.join(str(tmp_path), "TEMP_PROJECT"),
+        USER_ENV={},
+        USER_CONFIGS={})
+    monkeypatch.setitem(sys.modules, "runtime", runtime)
+    return runtime
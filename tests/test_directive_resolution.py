@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+#  Os modos "batch" e "sequential" de "directiveResolution" devem gerar o mesmo arquivo de mock.
+#
+#  O extractor é substituído por um localizador simples (funções e protótipos de uma linha), que
+#  responde sobre o conteúdo atual do arquivo, como o extractor faria.
+
+import re
+
+import pytest
+
+import extractor_service
+import mock_ir
+import mock_utils
+from mock_document import MockDocument
+
+def fake_extractor(args: list) -> tuple:
+    """Mesma interface de extractor_service.run_extractor(): [tipo, nome, arquivo, ...] -> (status, "início;fim")."""
+    name, path = args[1], args[2]
+    with open(path, encoding=mock_utils.ENCODING) as f:
+        lines = f.read().splitlines()
+    # Declarações globais: começam na primeira coluna
+    pattern = re.compile(rf"[A-Za-z_][\w\s*]*\b{re.escape(name)}\s*\(")
+    for start, line in enumerate(lines):
+        if not pattern.match(line):
+            continue
+        if line.rstrip().endswith(";"):
+            return 0, f"{start + 1};{start + 1}\n"
+        depth = 0
+        for end in range(start, len(lines)):
+            depth += lines[end].count("{") - lines[end].count("}")
+            if depth == 0 and "}" in lines[end]:
+                return 0, f"{start + 1};{end + 1}\n"
+    return 1, f"symbol '{name}' not found\n"
+
+@pytest.fixture(autouse=True)
+def use_fake_extractor(fake_runtime, monkeypatch):
+    monkeypatch.setattr(extractor_service, "run_extractor", fake_extractor)
+
+def generate_mock(tmp_path, mode: str, filename: str, original: str, mock: str) -> str:
+    mock_dir = tmp_path / mode
+    mock_dir.mkdir()
+    mock_file = mock_dir / ("__mock__" + filename)
+    mock_file.write_text(mock)
+    original_file = tmp_path / filename
+    original_file.write_text(original)
+    mock_file_to_create = mock_dir / filename
+    document = MockDocument.from_file(str(original_file), str(mock_file_to_create))
+    ir = mock_ir.load_mock_ir(str(mock_file))
+
+    if mode == "batch":
+        mock_utils.mock_apply_batch(ir, document)
+    else:
+        mock_utils.mock_remove_content(ir, document)
+        mock_utils.mock_replace_code(ir, document)
+        mock_utils.insert_mock_top_or_bottom(ir, document)
+        mock_utils.mock_add_content_before_or_after(ir, document)
+    document.save()
+    return mock_file_to_create.read_text()
+
+SOURCE = """\
+#include "app.h"
+
+int main(void)
+{
+    return helper();
+}
+
+int helper(void)
+{
+    return 1;
+}
+"""
+
+HEADER = """\
+#ifndef APP_H
+#define APP_H
+
+int main(void);
+
+static inline int helper(void)
+{
+    return 1;
+}
+#endif
+"""
+
+CASES = {
+    # MOCK_BOTTOM cairia dentro do intervalo da última função removida
+    "remove last function": ("app.c", SOURCE, """\
+//__MOCK_COPY_FILE_CONTENT__
+//__MOCK_REMOVE: function helper
+//__MOCK_BOTTOM_START
+int helper(void) { return 0; }
+//__MOCK_BOTTOM_END
+"""),
+    "replace last function": ("app.c", SOURCE, """\
+//__MOCK_COPY_FILE_CONTENT__
+//__MOCK_REPLACE_CODE_START: function helper
+int helper(void)
+{
+    return 2;
+}
+//__MOCK_REPLACE_CODE_END
+//__MOCK_ADD_BEFORE_LINE: function main
+static int calls;
+//__MOCK_BOTTOM_START
+/* bottom */
+//__MOCK_BOTTOM_END
+//__MOCK_TOP_START
+#include <stdio.h>
+//__MOCK_TOP_END
+"""),
+    # A definição antes do #endif é removida
+    "remove definition before endif": ("app.h", HEADER, """\
+//__MOCK_COPY_FILE_CONTENT__
+//__MOCK_REMOVE: function helper
+//__MOCK_REPLACE_CODE_LINE: function main
+int main(int argc, char **argv);
+//__MOCK_BOTTOM_START
+int mock_helper_calls(void);
+//__MOCK_BOTTOM_END
+//__MOCK_TOP_START
+#include <stdint.h>
+//__MOCK_TOP_END
+"""),
+}
+
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_batch_matches_sequential(tmp_path, case):
+    filename, original, mock = CASES[case]
+    sequential = generate_mock(tmp_path, "sequential", filename, original, mock)
+    batch = generate_mock(tmp_path, "batch", filename, original, mock)
+    assert batch == sequential
+
+def test_bottom_after_removed_last_function(tmp_path):
+    filename, original, mock = CASES["remove last function"]
+    batch = generate_mock(tmp_path, "batch", filename, original, mock)
+    assert "//__MOCK_REMOVE: function helper" in batch
+    assert "int helper(void) { return 0; }" in batch
+    assert "return 1;" not in batch
+
+def test_batch_refuses_overlapping_directives(tmp_path):
+    filename, original, _ = CASES["remove last function"]
+    mock = """\
+//__MOCK_COPY_FILE_CONTENT__
+//__MOCK_REMOVE: function helper
+//__MOCK_REPLACE_CODE_LINE: function helper
+int helper(void);
+"""
+    with pytest.raises(SystemExit):
+        generate_mock(tmp_path, "batch", filename, original, mock)
+
+def test_default_resolution_is_sequential(fake_runtime):
+    assert mock_utils.get_directive_resolution() == "sequential"
+    fake_runtime.USER_CONFIGS["directiveResolution"] = "batch"
+    assert mock_utils.get_directive_resolution() == "batch"
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+#  Cache persistente dos resultados do extractor (extractor_cache.py).
+
+import os
+import time
+
+import pytest
+
+import extractor_cache
+import mock_utils
+
+pytestmark = pytest.mark.skipif(extractor_cache.sqlite3 is None, reason="sqlite3 not available")
+
+@pytest.fixture
+def project(tmp_path, fake_runtime):
+    (tmp_path / "hal.h").write_text("#define HAS_UART 1\n")
+    (tmp_path / "main.c").write_text('#include "hal.h"\nint main(void) { return 0; }\n')
+    yield tmp_path
+    extractor_cache.close()
+
+def args_for(project, name="main"):
+    return ["function", name, str(project / "main.c"), "lines"]
+
+def rewrite(path, text):
+    """Reescreve o arquivo garantindo um mtime diferente, mesmo com tamanho igual."""
+    st = path.stat()
+    path.write_text(text)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+def store(project, name="main", includes=None):
+    args = args_for(project, name)
+    key, cached = extractor_cache.lookup(args)
+    assert cached is None
+    if includes is None:
+        includes = [str(project / "hal.h")]
+    extractor_cache.store(key, 0, "2;2\n", includes)
+    return args
+
+def test_hit_reports_output_and_includes(project):
+    args = store(project)
+    _, cached = extractor_cache.lookup(args)
+    assert cached == (0, "2;2\n", [str(project / "hal.h")])
+    assert extractor_cache.stats()["hits"] == 1
+
+def test_included_header_edit_is_a_miss(project):
+    args = store(project)
+    rewrite(project / "hal.h", "#define HAS_UART 0\n")
+    _, cached = extractor_cache.lookup(args)
+    assert cached is None
+
+def test_removed_header_is_a_miss(project):
+    args = store(project)
+    (project / "hal.h").unlink()
+    assert extractor_cache.lookup(args)[1] is None
+
+def test_parsed_file_edit_changes_the_key(project):
+    args = store(project)
+    key = extractor_cache.result_key(args)
+    rewrite(project / "main.c", '#include "hal.h"\nint main(void) { return 1; }\n')
+    assert extractor_cache.result_key(args) != key
+    assert extractor_cache.lookup(args)[1] is None
+
+def test_key_depends_on_arguments_and_versions(project, monkeypatch):
+    key = extractor_cache.result_key(args_for(project))
+    assert extractor_cache.result_key(args_for(project) + ["-DSIM"]) != key
+    assert extractor_cache.result_key(args_for(project, "other")) != key
+    monkeypatch.setattr(mock_utils, "GENERATOR_VERSION", mock_utils.GENERATOR_VERSION + 1)
+    assert extractor_cache.result_key(args_for(project)) != key
+
+def test_unknown_include_set_or_failure_is_not_stored(project):
+    args = args_for(project)
+    key, _ = extractor_cache.lookup(args)
+    extractor_cache.store(key, 0, "2;2\n", None)
+    extractor_cache.store(key, 1, "not found\n", [])
+    assert extractor_cache.lookup(args)[1] is None
+    assert extractor_cache.stats()["entries"] == 0
+
+def test_row_without_include_set_is_never_reused(project):
+    args = store(project)
+    connection = extractor_cache.connect()
+    connection.execute("UPDATE results SET includes = NULL")
+    assert extractor_cache.lookup(args)[1] is None
+
+def test_evict_removes_least_recently_used(project):
+    names = [f"symbol_{i}" for i in range(10)]
+    for name in names:
+        store(project, name, includes=[])
+    connection = extractor_cache.connect()
+    # Ordem de uso: symbol_0 é o mais antigo; symbol_1 é usado agora e passa a ser o mais recente
+    for i, name in enumerate(names):
+        connection.execute("UPDATE results SET last_used = ? WHERE key = ?",
+                           (1000 + i, extractor_cache.result_key(args_for(project, name))))
+    assert extractor_cache.lookup(args_for(project, "symbol_1"))[1] is not None
+
+    total = connection.execute("SELECT SUM(size) FROM results").fetchone()[0]
+    assert extractor_cache.evict(connection, total) == 0
+    removed = extractor_cache.evict(connection, total // 2)
+    assert removed > 0
+    assert connection.execute("SELECT SUM(size) FROM results").fetchone()[0] <= total // 2 * extractor_cache.EVICT_TARGET
+
+    kept = [name for name in names if extractor_cache.lookup(args_for(project, name))[1] is not None]
+    assert "symbol_1" in kept
+    assert "symbol_0" not in kept
+    assert kept == ["symbol_1"] + names[len(names) - len(kept) + 1:]
+    assert extractor_cache.stats()["evictions"] == removed
+
+def test_store_evicts_when_over_the_limit(project, fake_runtime, monkeypatch):
+    monkeypatch.setattr(extractor_cache, "EVICT_CHECK_INTERVAL", 1)
+    fake_runtime.USER_CONFIGS["extractorCacheMaxMB"] = 300 / (1024 * 1024)
+    for i in range(10):
+        store(project, f"symbol_{i}", includes=[])
+        time.sleep(0.001)
+    stats = extractor_cache.stats()
+    assert stats["bytes"] <= 300
+    assert stats["evictions"] > 0
+    assert extractor_cache.lookup(args_for(project, "symbol_9"))[1] is not None
+
+def test_disabled_cache(project, fake_runtime):
+    fake_runtime.USER_CONFIGS["extractorCache"] = False
+    assert extractor_cache.lookup(args_for(project)) == (None, None)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+#  Localizador léxico de macros, typedefs e variáveis (lexical_locator.py).
+
+import pytest
+
+import lexical_locator
+
+SOURCE = """\
+/* header */
+#ifndef DRIVER_H
+#define DRIVER_H
+
+#include <stdint.h>
+
+#define REG_BASE 0x40000000u
+#define REG_MASK(bits) \\
+    ((1u << (bits)) - 1u)
+
+typedef unsigned int reg_t;
+typedef struct {
+    reg_t ctrl;
+    reg_t data;
+} uart_t;
+typedef void (*handler_t)(int);
+
+static const char banner[] =
+    "driver \\"v1\\" // not a comment";
+uint32_t counter = 0;
+void (*on_error)(int code);
+extern int shared
+    ;
+
+#ifdef DEBUG
+int debug_level = 3;
+#endif
+
+int compute(int value)
+{
+    int local = value * 2;
+    return local;
+}
+
+int twice, both;
+int dup;
+int dup;
+
+#endif
+"""
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "driver.h"
+    path.write_text(SOURCE)
+    return str(path)
+
+@pytest.mark.parametrize("extract_type, name, expected", [
+    # Macros: do nome até o último token, atravessando continuações de linha
+    ("macro", "REG_BASE", (7, 7)),
+    ("macro", "REG_MASK", (8, 9)),
+    # Declarações: do primeiro token até o último antes do ';'
+    ("typedef", "reg_t", (11, 11)),
+    ("typedef", "uart_t", (12, 15)),
+    ("typedef", "handler_t", (16, 16)),
+    ("variable", "banner", (18, 19)),
+    ("variable", "counter", (20, 20)),
+    ("variable", "on_error", (21, 21)),
+    ("variable", "shared", (22, 22)),
+])
+def test_ranges(source, extract_type, name, expected):
+    assert lexical_locator.locate(extract_type, name, source) == expected
+
+@pytest.mark.parametrize("extract_type, name", [
+    ("variable", "debug_level"),  # dentro de #ifdef
+    ("variable", "local"),        # variável local
+    ("variable", "twice"),        # mais de um declarador
+    ("variable", "dup"),          # declarado duas vezes
+    ("variable", "compute"),      # função
+    ("function", "compute"),      # tipo não tratado pelo localizador
+    ("macro", "MISSING"),
+])
+def test_ambiguous_symbols_go_to_the_extractor(source, extract_type, name):
+    assert lexical_locator.locate(extract_type, name, source) is None
+
+def test_include_guard_is_not_a_conditional(tmp_path):
+    path = tmp_path / "a.h"
+    path.write_text("#ifndef A_H\n#define A_H\nint a;\n#endif\n#ifdef X\n#endif\n")
+    # Um bloco condicional depois do #endif: não é um include guard
+    assert lexical_locator.locate("variable", "a", str(path)) is None
+    path.write_text("#ifndef A_H\n#define A_H\nint a;\n#endif\n")
+    assert lexical_locator.locate("variable", "a", str(path)) == (3, 3)
+
+def test_macro_specifiers_go_to_the_extractor(tmp_path):
+    path = tmp_path / "regs.h"
+    path.write_text("#define __IO volatile\n__IO uint32_t status;\nAA1\nint b = 2;\nint c = 3;\n")
+    assert lexical_locator.locate("variable", "status", str(path)) is None
+    assert lexical_locator.locate("variable", "b", str(path)) is None
+    assert lexical_locator.locate("variable", "c", str(path)) == (5, 5)
+
+@pytest.mark.parametrize("flags, expected", [
+    ([], (4, 4)),
+    (["-DSIM"], (4, 4)),
+    (["-I/usr/include", "-std=c99"], (4, 4)),
+    (["-DBUF_SIZE=32"], None),
+    (["-D", "BUF_SIZE=32"], None),
+    (["-UBUF_SIZE"], None),
+    (["-U", "BUF_SIZE"], None),
+    (["-Dbuffer=other"], None),
+    (["-include", "config.h"], None),
+    (["-imacros", "config.h"], None),
+])
+def test_command_line_macros(tmp_path, flags, expected):
+    path = tmp_path / "buf.c"
+    path.write_text("#ifndef BUF_SIZE\n#define BUF_SIZE 16\n#endif\nchar buffer[BUF_SIZE];\n")
+    assert lexical_locator.locate("variable", "buffer", str(path), flags) == expected
+
+def test_resolve_uses_directive_flags(source):
+    assert lexical_locator.resolve(["variable", "counter", source, "lines"]) == (0, "20;20\n")
+    assert lexical_locator.resolve(["variable", "counter", source, "lines", "-Duint32_t=int"]) is None
+    assert lexical_locator.resolve(["variable", "counter", source, "text"]) is None
+
+def test_symbols_follow_file_changes(tmp_path):
+    path = tmp_path / "v.c"
+    path.write_text("int value;\n")
+    assert lexical_locator.locate("variable", "value", str(path)) == (1, 1)
+    path.write_text("\n\nint value;\n")
+    assert lexical_locator.locate("variable", "value", str(path)) == (3, 3)
+
+def clang_extent(cindex, path: str, extract_type: str, name: str):
+    kinds = {"macro": cindex.CursorKind.MACRO_DEFINITION, "typedef": cindex.CursorKind.TYPEDEF_DECL,
+             "variable": cindex.CursorKind.VAR_DECL}
+    tu = cindex.Index.create().parse(path, options=cindex.TranslationUnit.PARSE_DETAILED_PROCESSING_RECORD)
+    for cursor in tu.cursor.get_children():
+        if cursor.kind == kinds[extract_type] and cursor.spelling == name and str(cursor.location.file) == path:
+            return cursor.extent.start.line, cursor.extent.end.line
+    return None
+
+def test_ranges_match_libclang(source):
+    cindex = pytest.importorskip("clang.cindex")
+    try:
+        cindex.Index.create()
+    except Exception as e:
+        pytest.skip(f"libclang not available: {e}")
+    for extract_type, name in [("macro", "REG_BASE"), ("macro", "REG_MASK"), ("typedef", "reg_t"),
+                               ("typedef", "uart_t"), ("typedef", "handler_t"), ("variable", "banner"),
+                               ("variable", "counter"), ("variable", "on_error"), ("variable", "shared")]:
+        assert lexical_locator.locate(extract_type, name, source) == clang_extent(cindex, source, extract_type, name)
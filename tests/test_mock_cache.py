@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+#  Chaves e manifesto do cache de arquivos de mock gerados (mock_cache.py).
+
+import pytest
+
+import mock_cache
+import mock_utils
+
+def cache_key(rel_path, mock_file, original_file):
+    return mock_cache.mock_cache_key(rel_path, mock_file, original_file)[0]
+
+@pytest.fixture
+def mock_files(tmp_path, fake_runtime):
+    mock_file = tmp_path / "__mock__app.c"
+    original_file = tmp_path / "original_app.c"
+    mock_file.write_text("//__MOCK_COPY_FILE_CONTENT__\n")
+    original_file.write_text("int main(void) { return 0; }\n")
+    return str(mock_file), str(original_file)
+
+def test_key_is_stable(mock_files):
+    assert cache_key("src/app.c", *mock_files) == cache_key("src/app.c", *mock_files)
+
+def test_key_changes_with_inputs(tmp_path, mock_files, fake_runtime, monkeypatch):
+    key = cache_key("src/app.c", *mock_files)
+    assert cache_key("src/other.c", *mock_files) != key
+
+    (tmp_path / "original_app.c").write_text("int main(void) { return 1; }\n")
+    changed_original = cache_key("src/app.c", *mock_files)
+    assert changed_original != key
+
+    fake_runtime.USER_CONFIGS["extractorCFlags"] = ["-DSIM"]
+    changed_flags = cache_key("src/app.c", *mock_files)
+    assert changed_flags != changed_original
+
+    monkeypatch.setattr(mock_utils, "GENERATOR_VERSION", mock_utils.GENERATOR_VERSION + 1)
+    assert cache_key("src/app.c", *mock_files) != changed_flags
+
+def test_remock_restores_from_cache(tmp_path, mock_files):
+    output = tmp_path / "MOCK_TREE" / "app.c"
+    output.parent.mkdir()
+    output.write_text("generated\n")
+    key = cache_key("app.c", *mock_files)
+
+    entries = {}
+    mock_cache.store_output(entries, "app.c", key, str(output))
+    mock_cache.save_manifest(entries)
+    entries, _ = mock_cache.load_manifest()
+    assert mock_cache.is_up_to_date(entries, "app.c", key, str(output))
+
+    output.unlink()
+    assert mock_cache.is_up_to_date(entries, "app.c", key, str(output))
+    assert output.read_text() == "generated\n"
+    assert not mock_cache.is_up_to_date(entries, "app.c", "other", str(output))
+
+def test_known_original_digest_is_reused(mock_files):
+    _, digest = mock_cache.mock_cache_key("app.c", *mock_files)
+    assert digest == mock_cache.file_digest(mock_files[1])
+    assert mock_cache.mock_cache_key("app.c", *mock_files, digest) == mock_cache.mock_cache_key("app.c", *mock_files)
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+#  Documento em memória usado para gerar os arquivos de mock (mock_document.py).
+
+import os
+
+import pytest
+
+import mock_document
+from mock_document import MockDocument
+
+TEXT = "line 0\nline 1\nline 2\nline 3"
+
+def text_of(document: MockDocument) -> str:
+    return "".join(document.get_lines())
+
+def reference_edit(text: str, edits: list) -> str:
+    """Aplica as edições de baixo para cima sobre readlines(), como o código antigo."""
+    lines = text.splitlines(keepends=True)
+    for start, end, new_lines in sorted(edits, key=lambda e: (e[0], e[1]), reverse=True):
+        lines[start:end] = new_lines
+    return "".join(lines)
+
+def test_lines_follow_readlines(tmp_path):
+    document = MockDocument(str(tmp_path / "out.c"), TEXT.encode())
+    assert document.line_count() == 4
+    assert document.get_lines() == TEXT.splitlines(keepends=True)
+    assert document.get_lines(1, 3) == ["line 1\n", "line 2\n"]
+    assert document.get_lines(-1) == ["line 3"]
+    assert document.get_lines(3, 100) == ["line 3"]
+    assert MockDocument("out.c", b"").get_lines() == []
+
+@pytest.mark.parametrize("edits", [
+    [(0, 1, ["first\n"])],
+    [(1, 1, ["inserted\n"]), (3, 4, [])],
+    [(0, 0, ["top\n"]), (4, 4, ["\nbottom\n"]), (2, 3, ["a\n", "b\n"])],
+    [(-1, 4, ["last\n"])],
+])
+def test_apply_line_edits_matches_list_slicing(edits):
+    document = MockDocument("out.c", TEXT.encode())
+    document.apply_line_edits(edits)
+    assert text_of(document) == reference_edit(TEXT, edits)
+    assert document.line_count() == len(reference_edit(TEXT, edits).splitlines())
+
+def test_unmodified_document_is_a_copy_of_the_source(tmp_path):
+    source = tmp_path / "original.c"
+    source.write_bytes(b"int x;\r\n")
+    os.utime(source, ns=(1_000_000_000, 1_000_000_000))
+    document = MockDocument.from_file(str(source), str(tmp_path / "out.c"))
+    document.save()
+    assert (tmp_path / "out.c").read_bytes() == b"int x;\r\n"
+    assert os.stat(tmp_path / "out.c").st_mtime_ns == 1_000_000_000
+
+def test_materialize_writes_only_after_changes(tmp_path):
+    path = tmp_path / "out.c"
+    document = MockDocument(str(path), TEXT.encode())
+    document.materialize()
+    first = os.stat(path).st_mtime_ns
+    os.utime(path, ns=(first - 10**9, first - 10**9))
+    document.materialize()
+    assert os.stat(path).st_mtime_ns == first - 10**9
+
+    document.replace_lines(0, 1, [])
+    document.materialize()
+    assert path.read_text() == "line 1\nline 2\nline 3"
+    assert not os.path.exists(str(path) + ".tmp")
+
+def chained_replace(text: str, replacements: list) -> tuple:
+    """Referência: str.replace para cada substituição, na ordem, como o código antigo."""
+    counts = []
+    for old, new in replacements:
+        counts.append(text.count(old))
+        text = text.replace(old, new)
+    return text, counts
+
+@pytest.mark.parametrize("text, replacements", [
+    # Independentes: passada única
+    ("uint32_t reg; uint16_t half;", [("uint32_t", "int"), ("uint16_t", "short")]),
+    # Textos procurados que se sobrepõem
+    ("HAL_UART_Init HAL_Init", [("HAL_", "SIM_"), ("HAL_UART", "SIM_UART")]),
+    ("abcabc", [("abc", "x"), ("cab", "y")]),
+    ("aaaa", [("aa", "b"), ("a", "c")]),
+    # O texto inserido forma uma ocorrência de uma substituição posterior
+    ("REAL_DELAY", [("REAL", "FAKE"), ("FAKE_DELAY", "NO_DELAY")]),
+    ("ab", [("a", "x"), ("xb", "y")]),
+    ("a-b", [("-", ""), ("ab", "joined")]),
+    # ... ou de uma anterior (não é substituída de novo)
+    ("xb", [("xb", "a"), ("a", "xb")]),
+    # Sem ocorrências
+    ("int x;", [("float", "double"), ("int", "long")]),
+])
+def test_replace_texts_matches_chained_replace(text, replacements):
+    document = MockDocument("out.c", text.encode())
+    counts = document.replace_texts(replacements)
+    assert (text_of(document), counts) == chained_replace(text, replacements)
+    assert document.modified == any(counts)
+
+def test_replace_texts_random():
+    import random
+    rng = random.Random(23)
+    for _ in range(5000):
+        alphabet = rng.choice(("abc", "abcdefgh"))
+        word = lambda low, high, extra="": "".join(rng.choice(alphabet + extra) for _ in range(rng.randint(low, high)))
+        text = word(0, 40)
+        replacements = [(word(1, 3), word(0, 3, "XY")) for _ in range(rng.randint(1, 4))]
+        document = MockDocument("out.c", text.encode())
+        counts = document.replace_texts(replacements)
+        assert (text_of(document), counts) == chained_replace(text, replacements), (text, replacements)
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    """Blocos e limite do mmap minúsculos, para exercitar a divisão em trechos com arquivos pequenos."""
+    monkeypatch.setattr(mock_document, "CHUNK_SIZE", 8)
+    monkeypatch.setattr(mock_document, "MMAP_THRESHOLD", 0)
+
+def reference_document(text: str, edits: list, replacements: list) -> tuple:
+    """Implementação de referência sobre uma única string: substituições e depois edições de linhas."""
+    text, counts = chained_replace(text, replacements)
+    return reference_edit(text, edits), counts
+
+@pytest.mark.parametrize("text", [
+    "line 0\nline 1\nline 2\nline 3",
+    "#ifndef A_H\n#define A_H\nuint32_t reg;\n\n\nuint16_t half;\n#endif\n",
+    "a very long line without any newline that spans several chunks",
+    "\n\n\n",
+])
+def test_pieces_match_reference(tmp_path, small_chunks, text):
+    source = tmp_path / "original.h"
+    source.write_bytes(text.encode())
+    replacements = [("line", "LINE"), ("uint", "int"), ("n", "N")]
+    count = len(text.splitlines())
+    edits = [(0, 0, ["top\n"]), (count - 1, count, ["replaced\n", "twice\n"]), (count, count, ["end\n"])]
+    with MockDocument.from_file(str(source), str(tmp_path / "out.h")) as document:
+        counts = document.replace_texts(replacements)
+        document.apply_line_edits(edits)
+        # As edições seguintes trabalham sobre um documento já dividido em vários trechos
+        document.insert_lines(1, ["after top\n"])
+        expected, expected_counts = reference_document(text, edits, replacements)
+        expected = reference_edit(expected, [(1, 1, ["after top\n"])])
+        assert counts == expected_counts
+        assert text_of(document) == expected
+        assert document.line_count() == len(expected.splitlines())
+        assert [document.get_lines(i, i + 1) for i in range(document.line_count())] == \
+            [[line] for line in expected.splitlines(keepends=True)]
+        document.save()
+    assert (tmp_path / "out.h").read_bytes() == expected.encode()
+
+def test_first_define_and_last_endif_across_chunks(tmp_path, small_chunks):
+    source = tmp_path / "guard.h"
+    source.write_bytes(b"/* a long header comment */\n#ifndef G_H\n  #define G_H\nint x;\n#endif\n/* #endif */\n")
+    with MockDocument.from_file(str(source), str(tmp_path / "out.h")) as document:
+        assert document.first_define_line() == 2
+        assert document.last_endif_line() == 5
+        document.replace_lines(5, 6, [])
+        assert document.last_endif_line() == 4
+
+def test_utf8_content_is_kept_byte_exact(tmp_path, small_chunks):
+    # Caracteres de vários bytes: as posições são contadas em bytes e o conteúdo nunca é recodificado
+    original = "/* Configuração — µC */\nconst char *nome = \"São Paulo ✓\";\nint ü;\n".encode("utf-8")
+    source = tmp_path / "utf8.c"
+    source.write_bytes(original)
+    with MockDocument.from_file(str(source), str(tmp_path / "out.c")) as document:
+        assert document.line_count() == 3
+        assert document.get_lines(1, 2) == [original.split(b"\n")[1].decode("latin-1") + "\n"]
+        # O texto procurado vem de um __mock__ lido como latin-1: os mesmos bytes em UTF-8
+        assert document.replace_text("São Paulo".encode("utf-8").decode("latin-1"), "Recife") == 1
+        document.insert_lines(2, ["/* ✓ */\n".encode("utf-8").decode("latin-1")])
+        document.save()
+    assert (tmp_path / "out.c").read_bytes() == original.replace("São Paulo".encode(), b"Recife").replace(
+        b"int \xc3\xbc;", "/* ✓ */\nint ü;".encode("utf-8"))
+
+@pytest.mark.parametrize("threshold", [0, 1024])
+def test_empty_file(tmp_path, monkeypatch, threshold):
+    monkeypatch.setattr(mock_document, "MMAP_THRESHOLD", threshold)
+    source = tmp_path / "empty.c"
+    source.write_bytes(b"")
+    with MockDocument.from_file(str(source), str(tmp_path / "out.c")) as document:
+        assert document.line_count() == 0
+        assert document.get_lines() == []
+        assert document.first_define_line() is None
+        assert document.replace_text("x", "y") == 0
+        document.insert_lines(0, ["int x;\n"])
+        document.save()
+    assert (tmp_path / "out.c").read_bytes() == b"int x;\n"
+
+def test_write_replaces_the_file_atomically(tmp_path):
+    path = tmp_path / "out.c"
+    path.write_bytes(b"old content\n")
+    with open(path, "rb") as reader:
+        document = MockDocument(str(path), b"int x;\n")
+        document.insert_lines(0, ["int y;\n"])
+        document.save()
+        # O arquivo antigo não é reescrito: o novo conteúdo entra com um rename
+        assert reader.read() == b"old content\n"
+    assert path.read_bytes() == b"int y;\nint x;\n"
+    assert os.listdir(tmp_path) == ["out.c"]
+
+def test_failed_write_keeps_the_previous_file(tmp_path, monkeypatch):
+    path = tmp_path / "out.c"
+    path.write_bytes(b"old content\n")
+    document = MockDocument(str(path), b"int x;\n")
+    document.insert_lines(0, ["int y;\n"])
+
+    def fail(*args):
+        raise OSError("disk full")
+    monkeypatch.setattr(mock_document, "write_piece", fail)
+    with pytest.raises(OSError):
+        document.save()
+    assert path.read_bytes() == b"old content\n"
+    assert os.listdir(tmp_path) == ["out.c"]
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+#  Análise dos arquivos __mock__ (mock_ir.py) e cache da IR.
+
+import json
+import os
+
+import pytest
+
+import mock_ir
+
+MOCK = """\
+//__MOCK_COPY_FILE_CONTENT__
+//__MOCK_REPLACE_TEXT_LINE: HAL_Delay(10);
+sim_delay(10);
+//__MOCK_REPLACE_TEXT_START: #include "hal.h"
+#include "sim_hal.h"
+#include "sim_io.h"
+//__MOCK_REPLACE_TEXT_END
+//__MOCK_REMOVE: function init_clock
+//__MOCK_REMOVE: variable regs -DSIM
+//__MOCK_REPLACE_CODE_LINE: macro READ_REG
+#define READ_REG(x) sim_read(x)
+//__MOCK_REPLACE_CODE_START: function main
+int main(void)
+{
+    return 0;
+}
+//__MOCK_REPLACE_CODE_END
+//__MOCK_TOP_START
+#include <stdio.h>
+//__MOCK_TOP_END
+//__MOCK_BOTTOM_START
+int sim_calls;
+//__MOCK_BOTTOM_END
+//__MOCK_ADD_BEFORE_LINE: function main
+static int before_main;
+//__MOCK_ADD_AFTER_START: function main
+//__MOCK_REMOVE: function inside_add
+int after_main;
+//__MOCK_ADD_AFTER_END
+"""
+
+def parse(text: str, mock_file: str = "__mock__app.c") -> mock_ir.MockIR:
+    return mock_ir.parse_mock_lines(text.splitlines(keepends=True), mock_file)
+
+def test_parses_every_directive_type():
+    ir = parse(MOCK)
+    assert ir.mock_mode == "copy"
+
+    text = ir.of_kind(mock_ir.REPLACE_TEXT)
+    assert [(d.mode, d.old_text, d.new_text) for d in text] == [
+        ("LINE", "HAL_Delay(10);", "sim_delay(10);"),
+        ("START", '#include "hal.h"', '#include "sim_hal.h"\n#include "sim_io.h"')]
+
+    remove = ir.of_kind(mock_ir.REMOVE)
+    assert [(d.line, d.extract_type, d.extract_name, d.extra_args.strip()) for d in remove] == [
+        (8, "function", "init_clock", ""), (9, "variable", "regs", "-DSIM"), (27, "function", "inside_add", "")]
+    assert remove[0].content == ("//__MOCK_REMOVE: function init_clock\n",)
+
+    code = ir.of_kind(mock_ir.REPLACE_CODE)
+    assert [(d.mode, d.extract_type, d.extract_name, d.line, d.end_line) for d in code] == [
+        ("LINE", "macro", "READ_REG", 10, 11), ("START", "function", "main", 12, 17)]
+    assert code[0].content == ("//__MOCK_REPLACE_CODE_LINE: macro READ_REG\n", "#define READ_REG(x) sim_read(x)\n")
+    assert code[1].content[-1] == "//__MOCK_REPLACE_CODE_END\n"
+
+    top_bottom = ir.of_kind(mock_ir.TOP_BOTTOM)
+    assert [(d.position, d.content) for d in top_bottom] == [
+        ("TOP", ("//__MOCK_TOP_START\n", "#include <stdio.h>\n", "//__MOCK_TOP_END\n")),
+        ("BOTTOM", ("//__MOCK_BOTTOM_START\n", "int sim_calls;\n", "//__MOCK_BOTTOM_END\n"))]
+
+    add = ir.of_kind(mock_ir.ADD)
+    assert [(d.mode, d.position, d.extract_name, len(d.content)) for d in add] == [
+        ("LINE", "BEFORE", "main", 2), ("START", "AFTER", "main", 4)]
+
+def test_discard_mode_has_no_directives():
+    ir = parse("//__MOCK_REMOVE: function main\nint main(void);\n")
+    assert ir.mock_mode == "discard"
+    assert ir.directives == []
+
+def test_last_line_without_newline():
+    ir = parse("//__MOCK_COPY_FILE_CONTENT__\n//__MOCK_BOTTOM_START\nint x;\n//__MOCK_BOTTOM_END")
+    assert ir.of_kind(mock_ir.TOP_BOTTOM)[0].content[-1] == "//__MOCK_BOTTOM_END\n"
+
+@pytest.mark.parametrize("text", [
+    "//__MOCK_COPY_FILE_CONTENT__\n//__MOCK_REPLACE_CODE_START: function a\n//__MOCK_REPLACE_CODE_START: function b\n",
+    "//__MOCK_COPY_FILE_CONTENT__\n//__MOCK_REPLACE_CODE_START: function a\nint a;\n",
+    "//__MOCK_COPY_FILE_CONTENT__\n//__MOCK_REPLACE_CODE_END\n",
+    "//__MOCK_COPY_FILE_CONTENT__\n//__MOCK_TOP_START\n//__MOCK_BOTTOM_END\n",
+    "//__MOCK_COPY_FILE_CONTENT__\n//__MOCK_BOTTOM_START\nint x;\n",
+    "//__MOCK_COPY_FILE_CONTENT__\n//__MOCK_ADD_BEFORE_LINE: function main\n",
+    "//__MOCK_COPY_FILE_CONTENT__\n//__MOCK_ADD_AFTER_START: function main\nint x;\n",
+    "//__MOCK_COPY_FILE_CONTENT__\n//__MOCK_REPLACE_TEXT_END\n",
+])
+def test_syntax_errors_exit(text):
+    with pytest.raises(SystemExit):
+        parse(text)
+
+def test_json_round_trip():
+    ir = parse(MOCK)
+    data = json.loads(json.dumps(ir.to_json()))
+    restored = mock_ir.MockIR.from_json(ir.mock_file, data)
+    assert restored.mock_mode == ir.mock_mode
+    assert restored.directives == ir.directives
+
+@pytest.fixture
+def mock_file(tmp_path, fake_runtime):
+    path = tmp_path / "__mock__app.c"
+    path.write_text(MOCK)
+    return path
+
+def cached_files():
+    return sorted(os.listdir(mock_ir.get_ir_cache_dir()))
+
+def test_cache_is_reused(mock_file, monkeypatch):
+    ir = mock_ir.load_mock_ir(str(mock_file))
+    assert len(cached_files()) == 1
+    assert cached_files()[0].endswith(f".v{mock_ir.MOCK_IR_VERSION}.json")
+
+    def fail(*args):
+        raise AssertionError("unchanged __mock__ parsed again")
+    monkeypatch.setattr(mock_ir, "parse_mock_lines", fail)
+    assert mock_ir.load_mock_ir(str(mock_file)).directives == ir.directives
+
+def test_changed_mock_is_parsed_again(mock_file):
+    mock_ir.load_mock_ir(str(mock_file))
+    mock_file.write_text(MOCK + "//__MOCK_REMOVE: function extra\n")
+    ir = mock_ir.load_mock_ir(str(mock_file))
+    assert ir.of_kind(mock_ir.REMOVE)[-1].extract_name == "extra"
+    assert len(cached_files()) == 2
+
+def test_other_format_version_is_ignored_and_pruned(mock_file, monkeypatch):
+    mock_ir.load_mock_ir(str(mock_file))
+    old_files = cached_files()
+    monkeypatch.setattr(mock_ir, "MOCK_IR_VERSION", mock_ir.MOCK_IR_VERSION + 1)
+    mock_ir.load_mock_ir(str(mock_file))
+    assert len(cached_files()) == 2
+
+    digest = old_files[0].split(".")[0]
+    mock_ir.prune_cache({digest})
+    assert cached_files() == [f"{digest}.v{mock_ir.MOCK_IR_VERSION}.json"]
+    mock_ir.prune_cache(set())
+    assert cached_files() == []
+
+def test_corrupt_cache_entry_is_parsed_again(mock_file):
+    mock_ir.load_mock_ir(str(mock_file))
+    path = os.path.join(mock_ir.get_ir_cache_dir(), cached_files()[0])
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{")
+    assert len(mock_ir.load_mock_ir(str(mock_file)).directives) == len(parse(MOCK).directives)
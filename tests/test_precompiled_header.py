@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+#  Header pré-compilado do prefixo comum de includes (extractor_worker.PrecompiledHeader).
+#  Precisa da libclang.
+
+import os
+
+import pytest
+
+import extractor_worker
+
+cindex = pytest.importorskip("clang.cindex")
+
+@pytest.fixture
+def project(tmp_path):
+    include_dir = tmp_path / "inc"
+    include_dir.mkdir()
+    (include_dir / "vendor.h").write_text("#define REG_BASE 0x40000000u\ntypedef unsigned int reg_t;\n")
+    (include_dir / "hal.h").write_text('#include "vendor.h"\nreg_t hal_read(reg_t addr);\n')
+    (tmp_path / "main.c").write_text('/* main */\n#include "vendor.h"\n#include "hal.h"\n\n'
+                                     "int main(void) { return (int)hal_read(REG_BASE); }\n")
+    return tmp_path
+
+def make_pch(project, flags=()):
+    try:
+        cindex.Index.create()
+    except Exception as e:
+        pytest.skip(f"libclang not available: {e}")
+    return extractor_worker.PrecompiledHeader(["vendor.h", "hal.h"], str(project / "pch"), cindex,
+                                              cindex.TranslationUnit.from_source.__func__, list(flags))
+
+def args_for(project):
+    return (f"-I{project / 'inc'}",)
+
+def test_build_and_reuse(project):
+    pch = make_pch(project)
+    assert pch.applies_to(str(project / "main.c"))
+    pch_path, includes = pch.get(args_for(project))
+    assert os.path.isfile(pch_path)
+    assert {os.path.basename(path) for path in includes} == {"hal.h", "vendor.h"}
+
+    tu = cindex.TranslationUnit.from_source(str(project / "main.c"), list(args_for(project)) + ["-include-pch", pch_path])
+    assert not pch.rejected(tu)
+    assert not [d for d in tu.diagnostics if d.severity >= cindex.Diagnostic.Error]
+
+    # Outra instância (outra execução) reaproveita o .pch gravado
+    assert make_pch(project).load(pch.key(args_for(project))) == (pch_path, includes)
+
+def test_flags_are_part_of_the_key(project):
+    args = args_for(project)
+    assert make_pch(project).key(args) != make_pch(project, ["-DSIM"]).key(args)
+
+def test_touch_without_change_keeps_pch(project):
+    pch = make_pch(project)
+    key = pch.key(args_for(project))
+    pch.get(args_for(project))
+    header = project / "inc" / "vendor.h"
+    st = header.stat()
+    os.utime(header, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert make_pch(project).load(key) is not None
+
+def test_content_change_rebuilds_pch(project):
+    pch = make_pch(project)
+    key = pch.key(args_for(project))
+    pch.get(args_for(project))
+    header = project / "inc" / "vendor.h"
+    st = header.stat()
+    # Mesmo tamanho e mesmo mtime: só o conteúdo denuncia a mudança
+    header.write_text(header.read_text().replace("0x40000000u", "0x50000000u"))
+    os.utime(header, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert pch.load(key) is None
+    assert make_pch(project).load(key) is None
+
+def test_prefix_that_does_not_compile_is_skipped(project):
+    (project / "inc" / "hal.h").write_text("reg_t hal_read(reg_t addr);\n")
+    (project / "inc" / "vendor.h").write_text("#error vendor header needs a target\n")
+    pch = make_pch(project)
+    assert pch.get(args_for(project)) is None
+    assert pch.key(args_for(project)) in pch.failed
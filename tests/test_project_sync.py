@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+#  Sincronização incremental do TEMP_PROJECT (project_sync.sync_tree()).
+
+import os
+import shutil
+import subprocess
+
+import pytest
+
+import project_sync
+
+@pytest.fixture
+def trees(tmp_path):
+    src = tmp_path / "original"
+    dest = tmp_path / "TEMP_PROJECT"
+    (src / "src").mkdir(parents=True)
+    (src / "inc").mkdir()
+    (src / "src" / "main.c").write_text("int main(void) { return 0; }\n")
+    (src / "src" / "util.c").write_text("int util(void) { return 1; }\n")
+    (src / "inc" / "util.h").write_text("int util(void);\n")
+    return src, dest
+
+def rewrite(path, text):
+    """Reescreve o arquivo garantindo um mtime diferente, mesmo com tamanho igual."""
+    st = path.stat()
+    path.write_text(text)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+def sync(src, dest, entries=None, exclude_items=(), skip_paths=frozenset()):
+    stats = project_sync.SyncStats()
+    entries = project_sync.sync_tree(str(src), str(dest), entries or {}, list(exclude_items), shutil.copy2,
+                                     skip_paths, stats)
+    return entries, stats
+
+def test_initial_sync_copies_everything(trees):
+    src, dest = trees
+    entries, stats = sync(src, dest)
+    assert sorted(entries) == ["inc/util.h", "src/main.c", "src/util.c"]
+    assert stats.copied == 3
+    assert (dest / "src" / "main.c").read_text() == (src / "src" / "main.c").read_text()
+
+def test_unchanged_tree_copies_nothing(trees):
+    src, dest = trees
+    entries, _ = sync(src, dest)
+    entries, stats = sync(src, dest, entries)
+    assert stats.files == 3
+    assert stats.copied == 0
+    assert stats.deleted == 0
+
+def test_modified_file_is_copied(trees):
+    src, dest = trees
+    entries, _ = sync(src, dest)
+    rewrite(src / "src" / "util.c", "int util(void) { return 2; }\n")
+    entries, stats = sync(src, dest, entries)
+    assert stats.copied == 1
+    assert (dest / "src" / "util.c").read_text() == "int util(void) { return 2; }\n"
+
+def test_externally_modified_destination_is_restored(trees):
+    src, dest = trees
+    entries, _ = sync(src, dest)
+    (dest / "src" / "main.c").write_text("edited inside TEMP_PROJECT\n")
+    entries, stats = sync(src, dest, entries)
+    assert stats.copied == 1
+    assert (dest / "src" / "main.c").read_text() == (src / "src" / "main.c").read_text()
+
+def test_deleted_file_and_emptied_directory_are_removed(trees):
+    src, dest = trees
+    entries, _ = sync(src, dest)
+    shutil.rmtree(src / "inc")
+    (src / "src" / "util.c").unlink()
+    entries, stats = sync(src, dest, entries)
+    assert stats.deleted == 2
+    assert sorted(entries) == ["src/main.c"]
+    assert not (dest / "src" / "util.c").exists()
+    assert not (dest / "inc").exists()
+    assert (dest / "src").is_dir()
+
+def test_renamed_file(trees):
+    src, dest = trees
+    entries, _ = sync(src, dest)
+    (src / "src").rename(src / "source")
+    entries, stats = sync(src, dest, entries)
+    assert sorted(entries) == ["inc/util.h", "source/main.c", "source/util.c"]
+    assert stats.copied == 2
+    assert stats.deleted == 2
+    assert not (dest / "src").exists()
+    assert (dest / "source" / "util.c").read_text() == "int util(void) { return 1; }\n"
+
+def test_excluded_items_and_git_dirs_are_not_copied(trees):
+    src, dest = trees
+    (src / ".git").mkdir()
+    (src / ".git" / "HEAD").write_text("ref: refs/heads/main\n")
+    entries, _ = sync(src, dest)
+    assert not (dest / ".git").exists()
+
+    # Um item que passa a ser excluído é removido do destino
+    entries, stats = sync(src, dest, entries, exclude_items=["inc/util.h"])
+    assert "inc/util.h" not in entries
+    assert not (dest / "inc" / "util.h").exists()
+    assert stats.deleted == 1
+
+def test_mocked_file_is_kept_and_restored_when_unmocked(trees):
+    src, dest = trees
+    entries, _ = sync(src, dest)
+    (dest / "src" / "util.c").write_text("mock\n")
+    rewrite(src / "src" / "util.c", "int util(void) { return 2; }\n")
+
+    entries, stats = sync(src, dest, entries, skip_paths={"src/util.c"})
+    assert stats.copied == 0
+    assert (dest / "src" / "util.c").read_text() == "mock\n"
+
+    # Sem o __mock__, o arquivo volta a ser o original
+    entries, stats = sync(src, dest, entries)
+    assert stats.copied == 1
+    assert (dest / "src" / "util.c").read_text() == "int util(void) { return 2; }\n"
+
+def test_manifest_round_trip(fake_runtime):
+    trees = {"TEMP_PROJECT": {"src/main.c": [10, 1, 2, 10, 1]}}
+    project_sync.save_sync_manifest(trees)
+    assert project_sync.load_sync_manifest() == trees
+    with open(project_sync.get_sync_manifest_path(), "w", encoding="utf-8") as f:
+        f.write("not json")
+    assert project_sync.load_sync_manifest() == {}
+
+def test_parse_git_status_renames():
+    status = " M src/main.c\0R  src/new.c\0src/old.c\0?? notes.txt\0!! build/\0"
+    assert project_sync.parse_git_status(status) == ["src/main.c", "src/new.c", "src/old.c", "notes.txt", "build/"]
+    assert project_sync.parse_git_status("") == []
+
+def test_strip_git_prefix():
+    paths = ["fw/src/main.c", "fw/build/", "other/file.c", "fw/"]
+    assert project_sync.strip_git_prefix(paths, "fw/") == {"src/main.c", "build"}
+
+def test_dest_identity_changes_when_recreated(tmp_path):
+    dest = tmp_path / "TEMP_PROJECT"
+    assert project_sync.dest_identity(str(dest)) is None
+    dest.mkdir()
+    identity = project_sync.dest_identity(str(dest))
+    # Mantém um inode ocupado para que o diretório recriado não reaproveite o mesmo
+    (tmp_path / "placeholder").mkdir()
+    dest.rename(tmp_path / "old")
+    dest.mkdir()
+    assert project_sync.dest_identity(str(dest)) != identity
+
+def git(repo, *args):
+    subprocess.run(["git", "-C", str(repo)] + list(args), check=True, capture_output=True)
+
+@pytest.fixture
+def git_trees(trees, fake_runtime):
+    if shutil.which("git") is None:
+        pytest.skip("git not available")
+    src, dest = trees
+    git(src, "init", "-q")
+    git(src, "add", "-A")
+    git(src, "-c", "user.name=test", "-c", "user.email=test@test", "commit", "-q", "-m", "initial")
+    project_sync.forget_git_snapshots()
+    yield src, dest
+    project_sync.forget_git_snapshots()
+
+def sync_project(src, dest, previous=None, exclude_items=()):
+    project_sync.forget_git_snapshots()
+    return project_sync.sync_project_tree(str(src), str(dest), previous, list(exclude_items), shutil.copy2,
+                                          set(), ["copy"])
+
+def test_git_snapshot_reports_both_paths_of_a_rename(git_trees):
+    src, _ = git_trees
+    git(src, "mv", "src/util.c", "src/helpers.c")
+    snapshot = project_sync.git_snapshot(str(src))
+    assert {"src/util.c", "src/helpers.c"} <= set(snapshot["dirty"])
+
+def test_git_sync_visits_only_changed_paths(git_trees):
+    src, dest = git_trees
+    record, changed = sync_project(src, dest)
+    assert changed is None
+
+    git(src, "mv", "src/util.c", "src/helpers.c")
+    (src / "inc" / "util.h").unlink()
+    record, changed = sync_project(src, dest, record)
+    assert changed == {"src/util.c", "src/helpers.c", "inc/util.h"}
+    assert sorted(record["entries"]) == ["src/helpers.c", "src/main.c"]
+    assert (dest / "src" / "helpers.c").is_file()
+    assert not (dest / "src" / "util.c").exists()
+    assert not (dest / "inc").exists()
+
+    # Após o commit, a próxima sincronização usa o diff entre os commits
+    git(src, "add", "-A")
+    git(src, "-c", "user.name=test", "-c", "user.email=test@test", "commit", "-q", "-m", "rename")
+    record, changed = sync_project(src, dest, record)
+    assert changed == {"src/util.c", "src/helpers.c", "inc/util.h"}
+    assert sorted(record["entries"]) == ["src/helpers.c", "src/main.c"]
+
+@pytest.mark.parametrize("recreate", [False, True])
+def test_removed_temp_project_forces_full_sync(git_trees, recreate):
+    src, dest = git_trees
+    record, _ = sync_project(src, dest)
+    shutil.rmtree(dest)
+    if recreate:
+        (dest / "src").mkdir(parents=True)
+
+    record, changed = sync_project(src, dest, record)
+    assert changed is None
+    assert (dest / "src" / "main.c").is_file()
+    assert (dest / "inc" / "util.h").is_file()
+
+def test_config_change_forces_full_sync(git_trees):
+    src, dest = git_trees
+    record, _ = sync_project(src, dest)
+    project_sync.forget_git_snapshots()
+    _, changed = project_sync.sync_project_tree(str(src), str(dest), record, [], shutil.copy2, set(), ["hardlink"])
+    assert changed is None
+
+def test_sync_paths_directory_is_synced_as_subtree(trees):
+    src, dest = trees
+    entries, _ = sync(src, dest)
+    (src / "inc" / "extra").mkdir()
+    (src / "inc" / "extra" / "more.h").write_text("#define MORE 1\n")
+    (src / "inc" / "util.h").unlink()
+    stats = project_sync.SyncStats()
+    entries = project_sync.sync_paths(str(src), str(dest), entries, {"inc"}, [], shutil.copy2, stats=stats)
+    assert sorted(entries) == ["inc/extra/more.h", "src/main.c", "src/util.c"]
+    assert stats.copied == 1
+    assert stats.deleted == 1
+    assert not (dest / "inc" / "util.h").exists()
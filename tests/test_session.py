@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+#  API Python do mockshadow (mockshadow_session.py).
+
+import json
+import os
+
+import pytest
+
+from mockshadow_session import MockShadowError, MockShadowSession
+
+MOCK = """\
+//__MOCK_COPY_FILE_CONTENT__
+//__MOCK_TOP_START
+#define SIMULATION 1
+//__MOCK_TOP_END
+//__MOCK_REPLACE_TEXT_LINE: return 1;
+    return 2;
+"""
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    original = tmp_path / "orig"
+    (original / "src").mkdir(parents=True)
+    (original / "src" / "app.c").write_text("int value(void)\n{\n    return 1;\n}\n")
+    project = tmp_path / "shadow"
+    (project / ".mockshadow").mkdir(parents=True)
+    (project / ".mockshadow" / "env.json").write_text(json.dumps({"originalProject": "../orig"}))
+    (project / ".mockshadow" / "config.json").write_text(json.dumps({"extractorWorker": False}))
+    (project / "MOCK_TREE" / "src").mkdir(parents=True)
+    (project / "MOCK_TREE" / "src" / "__mock__app.c").write_text(MOCK)
+    # A sessão não depende do diretório atual
+    elsewhere = tmp_path / "elsewhere"
+    elsewhere.mkdir()
+    monkeypatch.chdir(elsewhere)
+    return tmp_path
+
+def test_relative_original_project(workspace):
+    with MockShadowSession(str(workspace / "shadow")) as session:
+        assert session.list() == [os.path.join("MOCK_TREE", "src", "__mock__app.c")]
+        session.clone()
+        session.mock()
+    temp_project = workspace / "shadow" / "TEMP_PROJECT"
+    generated = (temp_project / "src" / "app.c").read_text()
+    assert "#define SIMULATION 1\n" in generated
+    assert "    return 2;\n" in generated and "return 1;" not in generated
+    assert os.getcwd() == str(workspace / "elsewhere")
+
+def test_missing_original_project_raises(workspace):
+    (workspace / "shadow" / ".mockshadow" / "env.json").write_text(json.dumps({"originalProject": "../missing"}))
+    with MockShadowSession(str(workspace / "shadow")) as session:
+        with pytest.raises(MockShadowError) as error:
+            session.clone()
+    assert error.value.status == 1
+    assert "originalProject" in str(error.value)
+
+def test_not_a_project(tmp_path):
+    with pytest.raises(MockShadowError):
+        MockShadowSession(str(tmp_path))
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+#  Rastreamento de tempo das fases do mockshadow ('--profile' / '--trace arquivo.json').
+#
+#  Quando ativado, cada span (fase, arquivo de mock, chamada ao extractor, escrita de arquivo...)
+#  é registrado como um evento "complete" do formato Chrome Trace, que pode ser aberto em
+#  chrome://tracing ou no Perfetto (ui.perfetto.dev). Desativado, span() não registra nada.
+#  Os processos do pool de geração devolvem os seus eventos ao processo principal (take_events()).
+
+import atexit
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+# Quantidade de itens em cada lista do resumo
+TOP_N = 10
+
+# Categorias usadas no resumo
+CATEGORY_PHASE = "phase"
+CATEGORY_FILE = "file"
+CATEGORY_EXTRACTOR = "extractor"
+CATEGORY_WRITE = "write"
+
+# Eventos registrados no processo atual (None: rastreamento desativado)
+_events = None
+_main_pid = None
+
+def enabled() -> bool:
+    return _events is not None
+
+def now_us() -> int:
+    # perf_counter usa um relógio monotônico do sistema, comum a todos os processos
+    return time.perf_counter_ns() // 1000
+
+def enable(trace_path: str):
+    """Ativa o rastreamento; ao final do processo grava 'trace_path' e exibe o resumo."""
+    global _events, _main_pid
+    _events = []
+    _main_pid = os.getpid()
+    atexit.register(finish, trace_path)
+
+def reset(enable_events: bool):
+    """Estado de um processo do pool: não herda os eventos do processo principal."""
+    global _events
+    _events = [] if enable_events else None
+
+@contextlib.contextmanager
+def span(name: str, category: str, /, **args):
+    """Registra a duração do bloco como um evento de nome 'name'."""
+    if _events is None:
+        yield
+        return
+    start = now_us()
+    try:
+        yield
+    finally:
+        _events.append({"name": name, "cat": category, "ph": "X", "ts": start, "dur": now_us() - start,
+                        "pid": os.getpid(), "tid": threading.get_native_id(), "args": args})
+
+def traced(name: str, category: str = CATEGORY_PHASE):
+    """Decorador: registra cada chamada da função como um span."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _events is None:
+                return function(*args, **kwargs)
+            with span(name, category):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def take_events() -> list:
+    """Retorna e descarta os eventos registrados (usado pelos processos do pool)."""
+    global _events
+    if _events is None:
+        return []
+    events, _events = _events, []
+    return events
+
+def add_events(events: list):
+    if _events is not None:
+        _events.extend(events)
+
+def write_trace(trace_path: str):
+    pids = sorted({event["pid"] for event in _events})
+    metadata = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+                 "args": {"name": "mockshadow" if pid == _main_pid else f"mock worker {pid}"}} for pid in pids]
+    trace_dir = os.path.dirname(trace_path)
+    if trace_dir:
+        os.makedirs(trace_dir, exist_ok=True)
+    with open(trace_path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": metadata + _events, "displayTimeUnit": "ms"}, f)
+
+def print_summary(top_n: int = TOP_N):
+    """Tempo total de cada fase e os arquivos de mock e chamadas ao extractor mais lentos."""
+    phases = {}
+    for event in _events:
+        if event["cat"] == CATEGORY_PHASE:
+            phases[event["name"]] = phases.get(event["name"], 0) + event["dur"]
+    if phases:
+        print("  Phases:")
+        for name, dur in phases.items():
+            print(f"    {dur / 1e6:9.3f} s  {name}")
+
+    def slowest(category, title, describe):
+        events = sorted((e for e in _events if e["cat"] == category), key=lambda e: e["dur"], reverse=True)
+        if events:
+            total = sum(e["dur"] for e in events)
+            print(f"  Slowest {title} ({len(events)} total, {total / 1e6:.3f} s):")
+            for event in events[:top_n]:
+                print(f"    {event['dur'] / 1e6:9.3f} s  {describe(event)}")
+
+    slowest(CATEGORY_FILE, "mock files", lambda e: e["name"])
+    slowest(CATEGORY_EXTRACTOR, "extractor calls",
+            lambda e: f"{e['name']}  ({os.path.relpath(e['args'].get('file', ''))})")
+    slowest(CATEGORY_WRITE, "file writes", lambda e: os.path.relpath(e["args"].get("file", "")))
+
+def finish(trace_path: str):
+    """Grava o trace e exibe o resumo (somente no processo que ativou o rastreamento)."""
+    if _events is None or os.getpid() != _main_pid:
+        return
+    write_trace(trace_path)
+    print(f"Profile (trace written to {trace_path}, open it in chrome://tracing or ui.perfetto.dev):")
+    print_summary()
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+#  Modo "watch": mantém o TEMP_PROJECT atualizado enquanto os mocks e o projeto original são editados.
+#
+#  Após um 'mock' completo, observa MOCK_TREE e o projeto original (inotify no Linux; nos demais
+#  sistemas, ou se o inotify não estiver disponível, varredura periódica). Cada rajada de eventos
+#  é agrupada (debounce) e somente os arquivos afetados são processados:
+#    - __mock__ alterado ou criado: gera novamente o mock e o copia para o TEMP_PROJECT;
+#    - __mock__ removido: remove o mock gerado e restaura o arquivo original no TEMP_PROJECT;
+#    - __additional__ alterado ou removido: copia (ou remove) o arquivo no TEMP_PROJECT;
+#    - arquivo original com __mock__: gera o mock novamente;
+#    - demais arquivos originais: sincroniza com o TEMP_PROJECT (como o 'mock' faria).
+#  O worker do extractor e os caches ficam ativos entre as edições.
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+import extractor_service
+import mock_cache
+import mock_utils
+import project_sync
+
+# Intervalo sem eventos, em milissegundos, que encerra uma rajada ("watchDebounceMs" no config.json)
+DEFAULT_DEBOUNCE_MS = 50
+# Intervalo entre varreduras quando o inotify não está disponível
+POLL_INTERVAL = 1.0
+
+# Constantes de <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT_HEADER = struct.Struct("iIII")
+
+class InotifyWatcher:
+    """
+    Observa recursivamente diretórios com inotify (Linux). Diretórios para os quais
+    'skip_dir(caminho)' retorna True não são observados.
+    """
+    def __init__(self, roots: list, skip_dir):
+        self.skip_dir = skip_dir
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1: {os.strerror(err)}")
+        self.dirs = {}
+        try:
+            for root in roots:
+                self.add_tree(root)
+        except OSError:
+            self.close()
+            raise
+
+    def add_watch(self, path: str):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err in (errno.ENOENT, errno.ENOTDIR):
+                return
+            raise OSError(err, f"cannot watch '{path}': {os.strerror(err)}")
+        self.dirs[wd] = path
+
+    def add_tree(self, root: str) -> set:
+        """Observa 'root' e seus subdiretórios. Retorna os arquivos encontrados."""
+        files = set()
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if not self.skip_dir(os.path.join(dirpath, d))]
+            self.add_watch(dirpath)
+            files.update(os.path.join(dirpath, f) for f in filenames)
+        return files
+
+    def forget_tree(self, root: str):
+        """Deixa de observar 'root' (diretório movido para outro lugar)."""
+        prefix = root + os.sep
+        for wd, path in list(self.dirs.items()):
+            if path == root or path.startswith(prefix):
+                self.libc.inotify_rm_watch(self.fd, wd)
+                del self.dirs[wd]
+
+    def read_changes(self, timeout):
+        """
+        Aguarda até 'timeout' segundos (None: indefinidamente) e retorna os caminhos alterados,
+        ou None se eventos foram perdidos (fila do inotify cheia).
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        changes = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, name_len = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + name_len].rstrip(b"\0"))
+                offset += name_len
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                if mask & IN_IGNORED:
+                    self.dirs.pop(wd, None)
+                    continue
+                directory = self.dirs.get(wd)
+                if directory is None:
+                    continue
+                path = os.path.join(directory, name) if name else directory
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        if self.skip_dir(path):
+                            continue
+                        # Arquivos criados antes do diretório passar a ser observado
+                        changes |= self.add_tree(path)
+                    elif mask & IN_MOVED_FROM:
+                        self.forget_tree(path)
+                changes.add(path)
+        return changes
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+class PollingWatcher:
+    """Alternativa ao inotify: compara tamanho e mtime de todos os arquivos a cada POLL_INTERVAL."""
+    def __init__(self, roots: list, skip_dir, interval: float = POLL_INTERVAL):
+        self.roots = roots
+        self.skip_dir = skip_dir
+        self.interval = interval
+        self.state = self.scan()
+        self.next_scan = time.monotonic() + interval
+
+    def scan(self) -> dict:
+        state = {}
+        for root in self.roots:
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames[:] = [d for d in dirnames if not self.skip_dir(os.path.join(dirpath, d))]
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    state[path] = (st.st_size, st.st_mtime_ns)
+        return state
+
+    def read_changes(self, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            now = time.monotonic()
+            if now >= self.next_scan:
+                state = self.scan()
+                self.next_scan = time.monotonic() + self.interval
+                changes = {p for p in state.keys() | self.state.keys() if state.get(p) != self.state.get(p)}
+                self.state = state
+                if changes:
+                    return changes
+            if deadline is not None and now >= deadline:
+                return set()
+            wake = self.next_scan if deadline is None else min(self.next_scan, deadline)
+            time.sleep(max(0.0, wake - time.monotonic()))
+
+    def close(self):
+        pass
+
+def make_watcher(roots: list, skip_dir):
+    """inotify quando disponível, varredura periódica caso contrário."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(roots, skip_dir)
+        except OSError as e:
+            print(f"Warning: {e}. Falling back to polling every {POLL_INTERVAL:g}s.")
+    return PollingWatcher(roots, skip_dir)
+
+def get_debounce() -> float:
+    import runtime
+    debounce_ms = runtime.USER_CONFIGS.get("watchDebounceMs", DEFAULT_DEBOUNCE_MS)
+    if not isinstance(debounce_ms, (int, float)) or debounce_ms < 0:
+        sys.exit(f"fatal: invalid 'watchDebounceMs' in .mockshadow/config.json: {debounce_ms}")
+    return debounce_ms / 1000.0
+
+def is_inside(path: str, directory: str) -> bool:
+    return path == directory or path.startswith(directory + os.sep)
+
+def make_skip_dir():
+    """Diretórios que não são observados: '.git', itens de 'excludeFromCopy' e o próprio projeto mockshadow."""
+    import runtime
+    original_project = runtime.USER_ENV.get("originalProject")
+    exclude_items = set(mock_utils.get_exclude_items())
+
+    def skip_dir(path):
+        if os.path.basename(path) == ".git":
+            return True
+        if is_inside(path, original_project):
+            if is_inside(path, runtime.DIR_MOCK_SHADOW_PROJECT):
+                return True
+            rel = os.path.relpath(path, original_project).replace("\\", "/")
+            return project_sync.is_excluded(rel, exclude_items)
+        return False
+
+    return skip_dir
+
+def classify_changes(paths: set) -> tuple:
+    """
+    Separa os caminhos alterados em (arquivos __mock__, arquivos __additional__, caminhos do
+    projeto original relativos a ele). Os arquivos gerados pelo próprio mockshadow são ignorados.
+    """
+    import runtime
+    original_project = runtime.USER_ENV.get("originalProject")
+    mock_files = set()
+    additional_files = set()
+    original_paths = set()
+    for path in paths:
+        if is_inside(path, runtime.DIR_SHADOW_MOCKS):
+            filename = os.path.basename(path)
+            if not (filename.endswith(".c") or filename.endswith(".h")):
+                continue
+            if filename.startswith("__mock__"):
+                mock_files.add(path)
+            elif filename.startswith("__additional__"):
+                additional_files.add(path)
+        elif is_inside(path, original_project) and not is_inside(path, runtime.DIR_MOCK_SHADOW_PROJECT):
+            rel = os.path.relpath(path, original_project)
+            # Um original alterado que tenha __mock__ gera o mock novamente
+            mock_file = os.path.join(runtime.DIR_SHADOW_MOCKS, os.path.dirname(rel),
+                                     "__mock__" + os.path.basename(rel))
+            if os.path.isfile(mock_file):
+                mock_files.add(mock_file)
+            else:
+                original_paths.add(rel.replace("\\", "/"))
+    return mock_files, additional_files, original_paths
+
+def dependent_mock_files(changed_paths: set) -> set:
+    """
+    Arquivos __mock__ cuja última geração incluiu algum dos arquivos 'changed_paths',
+    direta ou indiretamente (inclusive por meio de outro mock que será gerado novamente).
+    """
+    import runtime
+    cache_entries, _ = mock_cache.load_manifest()
+    paths = {os.path.abspath(path) for path in changed_paths}
+    found = set()
+    dependents = mock_cache.dependent_entries(cache_entries, paths)
+    while dependents - found:
+        found |= dependents
+        paths |= {os.path.join(runtime.DIR_SHADOW_MOCKS, rel_path) for rel_path in dependents}
+        dependents = mock_cache.dependent_entries(cache_entries, paths)
+    return {mock_file for mock_file in map(mock_utils.mock_file_of, found) if os.path.isfile(mock_file)}
+
+def update_mocks(mock_files: set, show_details: bool) -> int:
+    """
+    Gera novamente os mocks dos arquivos __mock__ alterados (no próprio processo, com o worker
+    do extractor já ativo) e os copia para o TEMP_PROJECT. Retorna quantos falharam.
+    """
+    cache_entries, git_state = mock_cache.load_manifest()
+    mock_files = sorted(mock_files)
+    entries, tasks, failed, _ = mock_utils.generate_mock_files(mock_files, cache_entries, show_details, jobs=1)
+    cache_entries.update(entries)
+    mock_cache.save_manifest(cache_entries, git_state)
+
+    failed_mocks = {task[0] for task, status in failed}
+    for mock_file in mock_files:
+        if mock_file not in failed_mocks:
+            mock_utils.install_mock_file(mock_utils.mock_file_targets(mock_file)[0])
+    return len(failed)
+
+def remove_mocks(mock_files: set) -> set:
+    """
+    Remove os mocks gerados a partir de arquivos __mock__ que não existem mais.
+    Retorna os caminhos (relativos ao projeto original) a serem restaurados no TEMP_PROJECT.
+    """
+    cache_entries, git_state = mock_cache.load_manifest()
+    restore = set()
+    for mock_file in mock_files:
+        mock_file_to_create, _, rel_path = mock_utils.mock_file_targets(mock_file)
+        if os.path.isfile(mock_file_to_create):
+            os.remove(mock_file_to_create)
+        cache_entries.pop(rel_path, None)
+        print(f"  Unmocked {rel_path}")
+        restore.add(rel_path)
+    mock_cache.save_manifest(cache_entries, git_state)
+    return restore
+
+def update_additional_files(additional_files: set):
+    import runtime
+    for additional_file in sorted(additional_files):
+        if os.path.isfile(additional_file):
+            mock_utils.install_mock_file(additional_file)
+        else:
+            rel = os.path.relpath(additional_file, runtime.DIR_SHADOW_MOCKS)
+            dest = os.path.join(runtime.DIR_TEMP_PROJECT, rel)
+            if os.path.lexists(dest):
+                os.remove(dest)
+                print(f"  Removed {os.path.join(os.path.basename(runtime.DIR_TEMP_PROJECT), rel)}")
+
+def sync_original_paths(rel_paths: set) -> project_sync.SyncStats:
+    """Sincroniza com o TEMP_PROJECT os caminhos alterados do projeto original, atualizando o manifesto."""
+    import runtime
+    stats = project_sync.SyncStats()
+    trees = project_sync.load_sync_manifest()
+    tree_key = os.path.relpath(runtime.DIR_TEMP_PROJECT, runtime.DIR_MOCK_SHADOW_PROJECT).replace("\\", "/")
+    record = trees.get(tree_key, {})
+    entries = record.get("entries", {})
+
+    # Um diretório removido (ou movido) leva junto todos os arquivos registrados dentro dele
+    original_project = runtime.USER_ENV.get("originalProject")
+    expanded = set(rel_paths)
+    for rel in rel_paths:
+        if not os.path.lexists(os.path.join(original_project, rel)):
+            prefix = rel + "/"
+            expanded.update(k for k in entries if k.startswith(prefix))
+
+    mocked_paths = project_sync.get_mocked_paths()
+    copy_function = project_sync.make_clone_function(runtime.DIR_TEMP_PROJECT)
+    record["entries"] = project_sync.sync_paths(original_project, runtime.DIR_TEMP_PROJECT, entries, expanded,
+                                                mock_utils.get_exclude_items(), copy_function, mocked_paths, stats)
+    record["mocked"] = sorted(mocked_paths)
+    trees[tree_key] = record
+    project_sync.save_sync_manifest(trees)
+    return stats
+
+def apply_changes(paths: set, show_details: bool):
+    """
+    Processa uma rajada de alterações. Retorna quantos mocks falharam, ou None se nenhum
+    caminho relevante mudou (ex.: somente os mocks gerados pelo próprio mockshadow).
+    """
+    mock_files, additional_files, original_paths = classify_changes(paths)
+    if not (mock_files or additional_files or original_paths):
+        return None
+    removed_mocks = {m for m in mock_files if not os.path.isfile(m)}
+    mock_files -= removed_mocks
+    # Mocks cujo parse incluiu um header alterado (ou um mock que será gerado novamente ou removido)
+    changed_outputs = {mock_utils.mock_file_targets(mock_file)[0] for mock_file in mock_files | removed_mocks}
+    mock_files |= dependent_mock_files(paths | changed_outputs) - removed_mocks
+
+    failed = 0
+    if removed_mocks:
+        original_paths |= remove_mocks(removed_mocks)
+    if mock_files:
+        failed = update_mocks(mock_files, show_details)
+    if additional_files:
+        update_additional_files(additional_files)
+    if original_paths:
+        stats = sync_original_paths(original_paths)
+        if stats.copied or stats.deleted:
+            print(f"  Synchronized {stats.copied} copied, {stats.deleted} removed")
+    return failed
+
+def warm_up_extractor():
+    """Inicia o worker do extractor antes da primeira edição."""
+    if extractor_service.worker_enabled():
+        extractor_service.get_worker()
+
+def full_update(show_details: bool, jobs: int):
+    """'mock' completo, usado no início e quando eventos foram perdidos."""
+    project_sync.forget_git_snapshots()
+    mock_args = ["details"] if show_details else []
+    try:
+        mock_utils.mock_project(*mock_args, jobs=jobs, keep_extractor=True)
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            print("Warning: mock failed, waiting for changes ...")
+    warm_up_extractor()
+
+def watch_project(show_details: bool = False, jobs: int = None):
+    import runtime
+    debounce = get_debounce()
+    full_update(show_details, jobs)
+
+    roots = [runtime.DIR_SHADOW_MOCKS, runtime.USER_ENV.get("originalProject")]
+    watcher = make_watcher(roots, make_skip_dir())
+    print(f"Watching {os.path.basename(runtime.DIR_SHADOW_MOCKS)} and {roots[1]} (Ctrl+C to stop) ...")
+    try:
+        while True:
+            changes = watcher.read_changes(None)
+            started = time.monotonic()
+            # Agrupa a rajada de eventos: espera até não haver eventos por 'debounce' segundos
+            while changes is not None:
+                more = watcher.read_changes(debounce)
+                if more is None:
+                    changes = None
+                elif more:
+                    changes |= more
+                else:
+                    break
+
+            if changes is None:
+                print("Warning: file system events were lost, running a full mock ...")
+                full_update(show_details, jobs)
+                continue
+            try:
+                failed = apply_changes(changes, show_details)
+            except SystemExit as e:
+                # As funções de geração encerram com sys.exit() em caso de erro: continua observando
+                failed = 1 if e.code not in (None, 0) else 0
+            if failed is None:
+                continue
+            elapsed_ms = (time.monotonic() - started) * 1000
+            status = f"{failed} failed, " if failed else ""
+            print(f"Updated ({status}{elapsed_ms:.0f} ms)")
+    except KeyboardInterrupt:
+        print("Watch stopped.")
+    finally:
+        watcher.close()
+        extractor_service.stop_extractor()